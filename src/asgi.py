@@ -0,0 +1,4 @@
+from main import create_app
+from views.async_api import create_asgi_app
+
+app = create_asgi_app(create_app())
@@ -0,0 +1,14 @@
+import os
+
+BENCH_DATABASE_NAME = "transference-bench"
+
+os.environ["MONGO_DATABASE_NAME"] = BENCH_DATABASE_NAME
+
+from settings import settings
+
+
+def ensure_bench_database():
+    if settings.MONGO_DATABASE_NAME != BENCH_DATABASE_NAME:
+        raise SystemExit(
+            f"Benchmarks só rodam no banco {BENCH_DATABASE_NAME}; banco configurado: {settings.MONGO_DATABASE_NAME}"
+        )
@@ -0,0 +1,60 @@
+import argparse
+import json
+import sys
+
+from benchmarks.suite import CASES, compare, run_all
+
+
+def print_results(results):
+    print(f"{'case':<48} {'per op (us)':>12}")
+    for name, result in results.items():
+        print(f"{name:<48} {result['per_op_us']:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks dos caminhos executados por requisição")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="executa os benchmarks")
+    run_parser.add_argument("--only", nargs="+", choices=sorted(CASES), help="casos a executar")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--save", help="arquivo para salvar os resultados como baseline")
+
+    compare_parser = subparsers.add_parser("compare", help="compara com uma baseline e falha em caso de regressão")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("--only", nargs="+", choices=sorted(CASES), help="casos a executar")
+    compare_parser.add_argument("--repeat", type=int, default=5)
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="regressão máxima aceita (0.15 = 15%%)")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run_all(args.only, args.repeat)
+        print_results(results)
+        if args.save:
+            with open(args.save, "w") as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    results = run_all(args.only or [name for name in CASES if name in baseline], args.repeat)
+
+    regressions = 0
+    print(f"{'case':<48} {'baseline (us)':>14} {'current (us)':>13} {'change':>8}")
+    for name, before, after, change, regressed in compare(baseline, results, args.threshold):
+        if change is None:
+            print(f"{name:<48} {'-':>14} {after:>13.2f} {'new':>8}")
+            continue
+        regressions += regressed
+        flag = "  REGRESSÃO" if regressed else ""
+        print(f"{name:<48} {before:>14.2f} {after:>13.2f} {change:>+8.1%}{flag}")
+
+    if regressions:
+        print(f"{regressions} caso(s) acima do limite de {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import argparse
+import time
+from unittest import mock
+
+from benchmarks import ensure_bench_database
+from controllers.transference_controller import TransferenceController
+from database.models import db
+from main import create_app
+
+SENDER_ID = "665dff9c183ce834954a2f42"
+RECEIVER_ID = "665e0069183ce834954a2f44"
+CELLPHONE = "11999888155"
+BENCH_USERS = {"$regex": f"^({SENDER_ID}|{RECEIVER_ID}-[0-9]+)$"}
+BENCH_KEYS = {"$regex": r"^bench-[0-9]+@swiftpix\.com$"}
+
+
+def upstream_stubs(latency):
+    def get_user_balance(user_id):
+        time.sleep(latency)
+        return {"balance": 1_000_000_000.0, "currency": "BRL"}
+
+    def updated_balance(user_id, balance, operation=None):
+        time.sleep(latency)
+        return "OK"
+
+    def get_user_by_id(user_id):
+        time.sleep(latency)
+        return {"_id": user_id, "name": f"Usuário {user_id}", "cellphone": CELLPHONE}
+
+    return [
+        mock.patch.object(TransferenceController, "get_user_balance", side_effect=get_user_balance),
+        mock.patch.object(TransferenceController, "updated_balance", side_effect=updated_balance),
+        mock.patch.object(TransferenceController, "get_user_by_id", side_effect=get_user_by_id),
+    ]
+
+
+def clear():
+    ensure_bench_database()
+    db.transactions.delete_many({"user_id": BENCH_USERS})
+    db.statement_rollups.delete_many({"user_id": BENCH_USERS})
+    db.notifications.delete_many({"number": CELLPHONE})
+    db.keys.delete_many({"key": BENCH_KEYS})
+    db.balances.delete_many({"_id": BENCH_USERS})
+
+
+def reset(receivers):
+    clear()
+    db.keys.insert_many([
+        {"type": "email", "key": f"bench-{i}@swiftpix.com", "user_id": f"{RECEIVER_ID}-{i}"} for i in range(receivers)
+    ])
+
+
+def transferences(size, receivers):
+    return [
+        {"sender_id": SENDER_ID, "receiver_key": f"bench-{i % receivers}@swiftpix.com", "currency": "BRL", "value": 1.0}
+        for i in range(size)
+    ]
+
+
+def run_single(client, items):
+    start = time.perf_counter()
+    for item in items:
+        response = client.post("/transference", json=item)
+        assert response.status_code == 200, response.json
+    return time.perf_counter() - start
+
+
+def run_batch(client, items):
+    start = time.perf_counter()
+    response = client.post("/transferences/batch", json={"transferences": items})
+    assert response.status_code == 200, response.json
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transferências em lote contra N chamadas individuais")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--receivers", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="latência simulada de cada chamada ao serviço de usuário")
+    args = parser.parse_args()
+
+    client = create_app().test_client()
+    patches = upstream_stubs(args.latency_ms / 1000)
+    for patch in patches:
+        patch.start()
+
+    print(f"{'size':>6} {'single (s)':>11} {'batch (s)':>10} {'speedup':>8}")
+    try:
+        for size in args.sizes:
+            items = transferences(size, args.receivers)
+            reset(args.receivers)
+            single = run_single(client, items)
+            reset(args.receivers)
+            batch = run_batch(client, items)
+            print(f"{size:>6} {single:>11.3f} {batch:>10.3f} {single / batch:>7.1f}x")
+    finally:
+        for patch in patches:
+            patch.stop()
+        clear()
+
+
+if __name__ == "__main__":
+    main()
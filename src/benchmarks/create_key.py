@@ -0,0 +1,75 @@
+import argparse
+import statistics
+import time
+import uuid
+
+from benchmarks import ensure_bench_database
+from controllers.transference_controller import TransferenceController
+from database.models import create_indexes, db
+from utils.exceptions import KeyAlreadyExistsException
+from utils.index import default_datetime
+
+SEED_BATCH_SIZE = 10_000
+
+
+def seed_keys(total):
+    ensure_bench_database()
+    db.keys.drop()
+    create_indexes()
+    now = default_datetime()
+    for start in range(0, total, SEED_BATCH_SIZE):
+        batch = [
+            {
+                "type": "aleatoria",
+                "key": str(uuid.uuid4()),
+                "user_id": f"bench-{i}",
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(start, min(start + SEED_BATCH_SIZE, total))
+        ]
+        db.keys.insert_many(batch, ordered=False)
+
+
+def measure(samples):
+    latencies = []
+    for i in range(samples):
+        key = {"type": "email", "key": f"bench-{uuid.uuid4()}@swiftpix.com", "user_id": f"bench-new-{i}"}
+        start = time.perf_counter()
+        TransferenceController.create_key(key)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    duplicated = {"type": "email", "key": key["key"], "user_id": "bench-dup"}
+    start = time.perf_counter()
+    try:
+        TransferenceController.create_key(duplicated)
+    except KeyAlreadyExistsException:
+        pass
+    conflict_latency = (time.perf_counter() - start) * 1000
+
+    latencies.sort()
+    return {
+        "median_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "conflict_ms": conflict_latency,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência do create_key por volume de chaves cadastradas")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+    ensure_bench_database()
+
+    print(f"{'keys':>10} {'median (ms)':>12} {'p95 (ms)':>10} {'conflict (ms)':>14}")
+    for size in args.sizes:
+        seed_keys(size)
+        result = measure(args.samples)
+        print(f"{size:>10} {result['median_ms']:>12.3f} {result['p95_ms']:>10.3f} {result['conflict_ms']:>14.3f}")
+
+    db.keys.drop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import timeit
+import tracemalloc
+from datetime import timedelta
+
+from bson.objectid import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from utils.index import default_datetime
+from utils.json_provider import OrjsonProvider
+
+SENDER_ID = "665dff9c183ce834954a2f42"
+
+
+def transactions(size):
+    now = default_datetime()
+    return [
+        {
+            "_id": ObjectId(),
+            "user_id": SENDER_ID,
+            "sender": "Bench",
+            "receiver_key": "bench-receiver@swiftpix.com",
+            "currency": "BRL",
+            "value": float(i),
+            "type": "sended",
+            "created_at": now - timedelta(seconds=i),
+            "updated_at": now - timedelta(seconds=i),
+        }
+        for i in range(size)
+    ]
+
+
+def stringify_ids(documents):
+    documents = [dict(document) for document in documents]
+    for document in documents:
+        document["_id"] = str(document["_id"])
+    return documents
+
+
+def encoders():
+    app = Flask(__name__)
+    default = DefaultJSONProvider(app)
+    fast = OrjsonProvider(app)
+    return {
+        "default": lambda documents: default.dumps({"result": stringify_ids(documents), "next_cursor": None}),
+        "orjson": lambda documents: fast.dumps({"result": documents, "next_cursor": None}),
+    }
+
+
+def measure(encode, documents, repeat):
+    number = max(1, 10_000 // len(documents))
+    seconds = min(timeit.Timer(lambda: encode(documents)).repeat(repeat=repeat, number=number)) / number
+    tracemalloc.start()
+    encode(documents)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo de serializar respostas com muitos documentos")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'items':>8} {'encoder':>8} {'time (ms)':>10} {'peak (KiB)':>11}")
+    for size in args.sizes:
+        documents = transactions(size)
+        for name, encode in encoders().items():
+            milliseconds, peak = measure(encode, documents, args.repeat)
+            print(f"{size:>8} {name:>8} {milliseconds:>10.2f} {peak:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
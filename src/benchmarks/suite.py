@@ -0,0 +1,244 @@
+import os
+import timeit
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from benchmarks import ensure_bench_database
+from bson.objectid import ObjectId
+from controllers.conversion_controller import ConversionController
+from controllers.transference_controller import TransferenceController
+from database.models import create_indexes, db
+from schemas import BatchTransactionSchema, ConvertBalanceSchema, PaginationSchema, PixKeySchema, TransactionSchema
+from settings import settings
+from utils.index import default_datetime, encode_cursor, transaction_to_payload
+
+SENDER_ID = "665dff9c183ce834954a2f42"
+RECEIVER_ID = "665e0069183ce834954a2f44"
+RECEIVER_KEY = "bench-receiver@swiftpix.com"
+CELLPHONE = "11999888156"
+HISTORY_SIZE = int(os.getenv("BENCH_HISTORY_SIZE", 100_000))
+
+CASES = {}
+
+
+def case(name, number):
+    def register(setup):
+        CASES[name] = (setup, number)
+        return setup
+    return register
+
+
+def user_profile(user_id):
+    return {
+        "_id": user_id,
+        "name": f"Usuário {user_id}",
+        "cpf": "785.188.920-07",
+        "institution": "001",
+        "agency": "0001",
+        "account": "000",
+        "cellphone": CELLPHONE,
+    }
+
+
+def seed_history(user_id, size):
+    db.transactions.delete_many({"user_id": user_id})
+    start = default_datetime() - timedelta(seconds=size)
+    for offset in range(0, size, 10_000):
+        db.transactions.insert_many([
+            {
+                "user_id": user_id,
+                "sender": "Bench",
+                "receiver_key": RECEIVER_KEY,
+                "currency": "BRL",
+                "value": 1.0,
+                "type": "sended",
+                "created_at": start + timedelta(seconds=i),
+                "updated_at": start + timedelta(seconds=i),
+            }
+            for i in range(offset, min(offset + 10_000, size))
+        ])
+
+
+@case("controller.transaction", number=200)
+def transaction():
+    db.keys.delete_many({"key": RECEIVER_KEY})
+    db.keys.insert_one({"type": "email", "key": RECEIVER_KEY, "user_id": RECEIVER_ID})
+    patches = [
+        mock.patch.object(TransferenceController, "get_user_balance", return_value={"balance": 1e12, "currency": "BRL"}),
+        mock.patch.object(TransferenceController, "updated_balance", return_value="OK"),
+        mock.patch.object(TransferenceController, "get_user_by_id", side_effect=user_profile),
+    ]
+    for patch in patches:
+        patch.start()
+    payload = {"sender_id": SENDER_ID, "receiver_key": RECEIVER_KEY, "currency": "BRL", "value": 1.0}
+
+    def run():
+        TransferenceController.transaction(payload)
+
+    def teardown():
+        for patch in patches:
+            patch.stop()
+        db.transactions.delete_many({"receiver_key": RECEIVER_KEY})
+        db.notifications.delete_many({"number": CELLPHONE})
+        db.balances.delete_many({"_id": {"$in": [SENDER_ID, RECEIVER_ID]}})
+
+    return run, teardown
+
+
+@case("controller.create_key", number=200)
+def create_key():
+    def run():
+        TransferenceController.create_key({"type": "email", "key": f"bench-{uuid.uuid4()}@swiftpix.com", "user_id": SENDER_ID})
+
+    def teardown():
+        db.keys.delete_many({"user_id": SENDER_ID})
+
+    return run, teardown
+
+
+@case("controller.get_user_transactions.first_page", number=200)
+def get_user_transactions_first_page():
+    seed_history(SENDER_ID, HISTORY_SIZE)
+
+    def run():
+        TransferenceController.get_user_transactions(SENDER_ID, settings.PAGE_SIZE)
+
+    return run, None
+
+
+@case("controller.get_user_transactions.deep_page", number=200)
+def get_user_transactions_deep_page():
+    if db.transactions.count_documents({"user_id": SENDER_ID}) != HISTORY_SIZE:
+        seed_history(SENDER_ID, HISTORY_SIZE)
+    oldest = db.transactions.find({"user_id": SENDER_ID}).sort([("created_at", 1), ("_id", 1)]).skip(settings.PAGE_SIZE).limit(1)
+    cursor = encode_cursor(next(oldest))
+
+    def run():
+        TransferenceController.get_user_transactions(SENDER_ID, settings.PAGE_SIZE, cursor)
+
+    def teardown():
+        db.transactions.delete_many({"user_id": SENDER_ID})
+
+    return run, teardown
+
+
+@case("utils.transaction_to_payload", number=50_000)
+def payload():
+    now = default_datetime()
+    transaction = {"_id": ObjectId(), "value": 15.0, "currency": "BRL", "created_at": now, "updated_at": now}
+    sender = user_profile(SENDER_ID)
+    receiver = user_profile(RECEIVER_ID)
+
+    def run():
+        transaction_to_payload(dict(transaction), sender, receiver)
+
+    return run, None
+
+
+def json_case(encoder, size):
+    @case(f"json.{encoder}.{size // 1000}k", number=max(1, 20_000 // size))
+    def encode():
+        from benchmarks.json_encoding import encoders, transactions
+
+        documents = transactions(size)
+        run_encoder = encoders()[encoder]
+
+        def run():
+            run_encoder(documents)
+
+        return run, None
+
+
+for size in (1_000, 10_000):
+    json_case("default", size)
+    json_case("orjson", size)
+
+
+def conversion_case(name, size):
+    @case(f"conversion.{name}.{size}", number=max(1, 20_000 // size))
+    def convert():
+        rates = {("BRL", "USD"): 0.1908, ("USD", "BRL"): 5.24}
+        patch = mock.patch.object(
+            TransferenceController, "fetch_conversion_rate", side_effect=lambda sender, receiver: rates.get((sender, receiver), 1.0)
+        )
+        patch.start()
+        conversions = [
+            {"currency": ("BRL", "USD")[i % 2], "wanted_currency": ("USD", "BRL")[i % 3 % 2], "value": float(i)}
+            for i in range(size)
+        ]
+
+        if name == "matrix":
+            def run():
+                ConversionController.convert_batch(conversions)
+        else:
+            def run():
+                for conversion in conversions:
+                    TransferenceController.get_conversion(conversion["currency"], conversion["wanted_currency"], conversion["value"])
+
+        return run, patch.stop
+
+
+for size in (100, 1000):
+    conversion_case("matrix", size)
+    conversion_case("per_value", size)
+
+
+def schema_case(name, schema_class, payload, number=20_000):
+    @case(f"schemas.{name}", number=number)
+    def load():
+        def run():
+            schema_class().load(payload)
+
+        return run, None
+
+    @case(f"schemas.{name}.reused", number=number)
+    def load_reused():
+        schema = schema_class()
+
+        def run():
+            schema.load(payload)
+
+        return run, None
+
+
+schema_case("pix_key", PixKeySchema, {"type": "telefone", "key": "11999888156", "user_id": SENDER_ID})
+schema_case("transaction", TransactionSchema, {"sender_id": SENDER_ID, "receiver_key": RECEIVER_KEY, "currency": "BRL", "value": 15.0})
+schema_case("pagination", PaginationSchema, {"limit": "50", "cursor": "abc"})
+schema_case("convert_balance", ConvertBalanceSchema, {"currency": "BRL", "wanted_currency": "USD", "value": 15.0})
+for size in (10, 100, 1000):
+    schema_case(
+        f"batch_transaction_{size}",
+        BatchTransactionSchema,
+        {"transferences": [{"sender_id": SENDER_ID, "receiver_key": RECEIVER_KEY, "currency": "BRL", "value": 1.0}] * size},
+        number=50_000 // size,
+    )
+
+
+def run_case(name, repeat):
+    setup, number = CASES[name]
+    ensure_bench_database()
+    create_indexes()
+    run, teardown = setup()
+    try:
+        run()
+        timings = timeit.Timer(run).repeat(repeat=repeat, number=number)
+    finally:
+        if teardown:
+            teardown()
+    return {"per_op_us": min(timings) / number * 1e6, "number": number, "repeat": repeat}
+
+
+def run_all(names=None, repeat=5):
+    return {name: run_case(name, repeat) for name in (names or CASES)}
+
+
+def compare(baseline, current, threshold):
+    rows = []
+    for name, result in current.items():
+        if name not in baseline:
+            rows.append((name, None, result["per_op_us"], None, False))
+            continue
+        change = result["per_op_us"] / baseline[name]["per_op_us"] - 1
+        rows.append((name, baseline[name]["per_op_us"], result["per_op_us"], change, change > threshold))
+    return rows
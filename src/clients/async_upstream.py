@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import time
+
+import httpx
+from settings import settings
+from utils.circuit_breaker import breakers
+from utils.exceptions import GeoLocServiceError, UserServiceError
+from utils.metrics import upstream_errors, upstream_latency, upstream_requests, upstream_short_circuits, upstream_timeouts
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+RETRY_STATUSES = (502, 503, 504)
+
+
+class AsyncUpstreamClient:
+    def __init__(self, base_url, error, error_message):
+        self.base_url = base_url
+        self.error = error
+        self.error_message = error_message
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers={"Content-Type": "application/json"},
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_POOL_MAXSIZE,
+                    max_keepalive_connections=settings.HTTP_POOL_MAXSIZE,
+                ),
+                timeout=httpx.Timeout(settings.HTTP_READ_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+            )
+        return self._client
+
+    async def request(self, method, path, name, **kwargs):
+        breaker = breakers.get(name)
+        if not breaker.allow():
+            upstream_short_circuits.inc(name)
+            raise self.error(self.error_message)
+        start = time.perf_counter()
+        try:
+            response = await self.send(method, path, name, **kwargs)
+        except self.error:
+            breaker.record(time.perf_counter() - start, True)
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record(time.perf_counter() - start, response.status_code >= 500)
+        return response
+
+    async def send(self, method, path, name, **kwargs):
+        attempts = settings.HTTP_RETRIES + 1 if method == "GET" else 1
+        for attempt in range(attempts):
+            retry = attempt + 1 < attempts
+            start = time.perf_counter()
+            try:
+                response = await self.client.request(method, f"{self.base_url}{path}", **kwargs)
+            except httpx.HTTPError as e:
+                upstream_latency.observe(time.perf_counter() - start, name)
+                upstream_errors.inc(name)
+                if isinstance(e, httpx.TimeoutException):
+                    upstream_timeouts.inc(name)
+                if retry:
+                    await asyncio.sleep(settings.HTTP_BACKOFF_FACTOR * 2 ** attempt)
+                    continue
+                logger.error(f"Falha na chamada {method} {self.base_url}{path}: {e}")
+                raise self.error(self.error_message)
+            upstream_latency.observe(time.perf_counter() - start, name)
+            upstream_requests.inc(name, response.status_code)
+            if response.status_code >= 400:
+                upstream_errors.inc(name)
+            if retry and response.status_code in RETRY_STATUSES:
+                await asyncio.sleep(settings.HTTP_BACKOFF_FACTOR * 2 ** attempt)
+                continue
+            return response
+
+    async def get(self, path, name, **kwargs):
+        return await self.request("GET", path, name, **kwargs)
+
+    async def post(self, path, name, **kwargs):
+        return await self.request("POST", path, name, **kwargs)
+
+    async def patch(self, path, name, **kwargs):
+        return await self.request("PATCH", path, name, **kwargs)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+user_client = AsyncUpstreamClient(settings.USER_API, UserServiceError, "Serviço de usuário indisponível")
+geoloc_client = AsyncUpstreamClient(settings.GEOLOC_API, GeoLocServiceError, "Serviço de geolocalização indisponível")
@@ -0,0 +1,113 @@
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import TimeoutError as PoolTimeoutError
+from urllib3.util.retry import Retry
+from settings import settings
+from utils.circuit_breaker import breakers
+from utils.exceptions import GeoLocServiceError, UserServiceError
+from utils.metrics import upstream_errors, upstream_latency, upstream_requests, upstream_short_circuits, upstream_timeouts
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def is_timeout(error):
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(error, requests.Timeout) or isinstance(reason, PoolTimeoutError)
+
+
+class UpstreamClient:
+    def __init__(self, base_url, error, error_message):
+        self.base_url = base_url
+        self.error = error
+        self.error_message = error_message
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    self._session = self._build_session()
+                    self._pid = os.getpid()
+        return self._session
+
+    def _build_session(self):
+        retry = Retry(
+            total=settings.HTTP_RETRIES,
+            backoff_factor=settings.HTTP_BACKOFF_FACTOR,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=settings.HTTP_POOL_CONNECTIONS,
+            pool_maxsize=settings.HTTP_POOL_MAXSIZE,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"Content-Type": "application/json"})
+        return session
+
+    def request(self, method, path, name, **kwargs):
+        breaker = breakers.get(name)
+        if not breaker.allow():
+            upstream_short_circuits.inc(name)
+            raise self.error(self.error_message)
+        start = time.perf_counter()
+        try:
+            response = self.send(method, path, name, **kwargs)
+        except self.error:
+            breaker.record(time.perf_counter() - start, True)
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record(time.perf_counter() - start, response.status_code >= 500)
+        return response
+
+    def send(self, method, path, name, **kwargs):
+        kwargs.setdefault("timeout", (settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT))
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except requests.RequestException as e:
+            upstream_latency.observe(time.perf_counter() - start, name)
+            upstream_errors.inc(name)
+            if is_timeout(e):
+                upstream_timeouts.inc(name)
+            logger.error(f"Falha na chamada {method} {self.base_url}{path}: {e}")
+            raise self.error(self.error_message)
+        upstream_latency.observe(time.perf_counter() - start, name)
+        upstream_requests.inc(name, response.status_code)
+        if response.status_code >= 400:
+            upstream_errors.inc(name)
+        return response
+
+    def get(self, path, name, **kwargs):
+        return self.request("GET", path, name, **kwargs)
+
+    def post(self, path, name, **kwargs):
+        return self.request("POST", path, name, **kwargs)
+
+    def patch(self, path, name, **kwargs):
+        return self.request("PATCH", path, name, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+user_client = UpstreamClient(settings.USER_API, UserServiceError, "Serviço de usuário indisponível")
+geoloc_client = UpstreamClient(settings.GEOLOC_API, GeoLocServiceError, "Serviço de geolocalização indisponível")
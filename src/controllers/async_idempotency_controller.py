@@ -0,0 +1,49 @@
+import asyncio
+import logging
+import time
+
+from controllers.idempotency_controller import in_progress, replay
+from database import async_models
+from settings import settings
+from utils.index import request_fingerprint
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class AsyncIdempotencyController:
+    @staticmethod
+    async def execute(key, payload, handler):
+        fingerprint = request_fingerprint(payload)
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        while True:
+            if await async_models.IdempotencyKey.acquire(key, fingerprint, settings.IDEMPOTENCY_LEASE_SECONDS):
+                return await AsyncIdempotencyController.run(key, payload, handler)
+            record = await async_models.IdempotencyKey.find(key)
+            if record is None:
+                continue
+            response = replay(record, fingerprint)
+            if response:
+                logger.info(f"Resposta reaproveitada para chave de idempotência {key}")
+                return response
+            if await async_models.IdempotencyKey.take_over(key, settings.IDEMPOTENCY_LEASE_SECONDS):
+                return await AsyncIdempotencyController.run(key, payload, handler)
+            if time.monotonic() >= deadline:
+                return in_progress()
+            await asyncio.sleep(settings.IDEMPOTENCY_POLL_INTERVAL)
+
+    @staticmethod
+    async def run(key, payload, handler):
+        try:
+            response, status_code = await handler(payload, key)
+        except Exception:
+            await async_models.IdempotencyKey.release(key)
+            raise
+        if status_code != 200:
+            await async_models.IdempotencyKey.release(key)
+            return response, status_code
+        try:
+            await async_models.IdempotencyKey.complete(key, response, status_code)
+        except Exception as e:
+            logger.error(f"Não foi possível registrar a resposta da chave de idempotência {key}. {e}")
+        return response, status_code
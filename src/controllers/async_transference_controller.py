@@ -0,0 +1,359 @@
+import asyncio
+import logging
+from contextlib import contextmanager
+
+from pymongo.errors import DuplicateKeyError
+from clients.async_upstream import geoloc_client, user_client
+from controllers.push_controller import PushController
+from controllers.transference_common import (
+    balance_errors,
+    batch_receivers,
+    batch_legs,
+    batch_results,
+    batch_transactions,
+    build_pix_key,
+    cache_found_keys,
+    cache_key_lookup,
+    cache_profile,
+    cached_keys,
+    cached_profile,
+    cached_tax,
+    claim_refresh,
+    conversion_fallback,
+    refresh_failed,
+    refreshed_rate,
+    release_refresh,
+    geoloc_response,
+    key_cache,
+    pending_transferences,
+    rate_cache,
+    receiver_profiles,
+    resolved_keys,
+    tax_cache,
+    tax_payload,
+    transactions_page,
+    user_response,
+)
+from database import async_models
+from database.models import Notification, Transaction
+from utils.exceptions import BalanceInsuficient, BalanceNotFound, ConversionNotFound, GeoLocServiceError, KeyAlreadyExistsException, KeyNotFound, TaxNotFound, TransactionNotFound, UserNotFound
+from settings import settings
+from utils.cache import HIT, STALE
+from utils.index import apply_conversion, conversion_plan, decode_cursor, transaction_to_payload
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+background_tasks = set()
+tax_requests = {}
+
+
+@contextmanager
+def cancel_on_error(*tasks):
+    try:
+        yield
+    except Exception:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+async def enqueue_sms(messages):
+    notifications = [Notification(number, message) for number, message in messages]
+    await async_models.Notification.save_many(notifications)
+
+
+class AsyncTransferenceController:
+    @staticmethod
+    async def create_key(key):
+        new_key = build_pix_key(key)
+
+        try:
+            key_id = await async_models.PixKey.save(new_key)
+        except DuplicateKeyError:
+            raise KeyAlreadyExistsException("Chave já está em uso")
+
+        key_cache.invalidate(new_key.key)
+        return key_id
+
+    @staticmethod
+    async def get_user_keys(user_id):
+        keys = await async_models.PixKey.find_by_user_id(user_id)
+        if not keys:
+            raise KeyNotFound("Chave não encontrada")
+        return keys
+
+    @staticmethod
+    async def get_key_by_id(key_id):
+        key = await async_models.PixKey.find_by_id(key_id)
+
+        if not key:
+            raise KeyNotFound("Chave não encontrada")
+        return key
+
+    @staticmethod
+    async def get_user_by_key(key):
+        user, state = key_cache.lookup(key)
+        if state != HIT:
+            user = cache_key_lookup(key, await async_models.PixKey.find_by_key(key))
+        if not user:
+            raise UserNotFound(f"Usuário não encontrado para chave {key}")
+        return dict(user)
+
+    @staticmethod
+    async def resolve_keys(keys):
+        users, missing = cached_keys(keys)
+        if missing:
+            cache_found_keys(users, missing, await async_models.PixKey.find_by_keys(missing))
+        return resolved_keys(keys, users)
+
+    @staticmethod
+    async def transaction(transference, idempotency_key=None):
+
+        receiver_user_key = transference.get("receiver_key")
+        sender_id = transference.get("sender_id")
+        sended_value = transference.get("value")
+        transference_currency = transference.get("currency")
+
+        receiver_user = await AsyncTransferenceController.get_user_by_key(receiver_user_key)
+        receiver_user_id = receiver_user.get("user_id")
+
+        user_tasks = {
+            user_id: asyncio.create_task(AsyncTransferenceController.get_user_by_id(user_id))
+            for user_id in dict.fromkeys((receiver_user_id, sender_id))
+        }
+        receiver_user_task = user_tasks[receiver_user_id]
+        sender_user_task = user_tasks[sender_id]
+
+        with cancel_on_error(*user_tasks.values()):
+            balances = await AsyncTransferenceController.get_ledger_balances([receiver_user_id, sender_id])
+            receiver_user_balance = balances[receiver_user_id]
+            sender_user_balance = balances[sender_id]
+
+            receiver_user_currency = receiver_user_balance["currency"]
+            sender_user_currency = sender_user_balance["currency"]
+
+            sended_value_to_sender, sended_value_to_receiver = await AsyncTransferenceController.converted_values(
+                transference_currency, sender_user_currency, receiver_user_currency, sended_value
+            )
+
+            if sender_user_balance["balance"] - sended_value_to_sender < 0:
+                raise BalanceInsuficient("Usuário não possui saldo suficiente")
+
+            receiver_user = await receiver_user_task
+            sender_user = await sender_user_task
+
+        legs = Transaction.transfer_legs(
+            sender_id, receiver_user_id, receiver_user_key, sender_user.get("name"),
+            sender_user_currency, receiver_user_currency, sended_value_to_sender, sended_value_to_receiver
+        )
+        documents = await async_models.Balance.transfer(
+            sender_id, sended_value_to_sender, {receiver_user_id: sended_value_to_receiver}, legs,
+            idempotency_key, lambda documents: transaction_to_payload(documents[0], sender_user, receiver_user)
+        )
+        if documents is None:
+            raise BalanceInsuficient("Usuário não possui saldo suficiente")
+        transaction = documents[0]
+
+        try:
+            await enqueue_sms(PushController.transfer_messages(
+                receiver_user, sender_user, receiver_user_key, sended_value_to_receiver, sended_value_to_sender
+            ))
+        except Exception as e:
+            logger.error(f"Não foi possível registrar mensagem. {e}")
+
+        return transaction_to_payload(transaction, sender_user, receiver_user)
+
+    @staticmethod
+    async def converted_values(transference_currency, sender_currency, receiver_currency, value):
+        plan = conversion_plan(transference_currency, sender_currency, receiver_currency)
+        if plan is None:
+            return value, value
+        source_currency, target_currency, _, _ = plan
+        conversion = await AsyncTransferenceController.get_conversion(source_currency, target_currency, value)
+        return apply_conversion(plan, value, conversion["result"])
+
+    @staticmethod
+    async def batch_transaction(transferences):
+        sender_id = transferences[0].get("sender_id")
+        receiver_keys = list(dict.fromkeys(transference.get("receiver_key") for transference in transferences))
+
+        sender_user_task = asyncio.create_task(AsyncTransferenceController.get_user_by_id(sender_id))
+
+        with cancel_on_error(sender_user_task):
+            users, missing = cached_keys(receiver_keys)
+            if missing:
+                cache_found_keys(users, missing, await async_models.PixKey.find_by_keys(missing))
+        receiver_ids, errors = batch_receivers(users)
+
+        distinct_receiver_ids = list(dict.fromkeys(receiver_ids.values()))
+        receiver_user_tasks = {
+            user_id: sender_user_task if user_id == sender_id else asyncio.create_task(AsyncTransferenceController.get_user_by_id(user_id))
+            for user_id in distinct_receiver_ids
+        }
+
+        with cancel_on_error(sender_user_task, *receiver_user_tasks.values()):
+            balances = await AsyncTransferenceController.get_ledger_balances([sender_id, *distinct_receiver_ids], skip_missing=True)
+            if sender_id not in balances:
+                raise BalanceNotFound("Saldo indisponível")
+            sender_balance = balances[sender_id]
+            balance_errors(errors, receiver_ids, balances)
+            results = [errors.get(transference.get("receiver_key")) for transference in transferences]
+
+            conversions = {}
+            for index, transference in pending_transferences(transferences, results):
+                try:
+                    conversions[index] = await AsyncTransferenceController.converted_values(
+                        transference.get("currency"), sender_balance["currency"],
+                        balances[receiver_ids[transference.get("receiver_key")]]["currency"], transference.get("value")
+                    )
+                except ConversionNotFound as e:
+                    results[index] = {"status": 404, "message": str(e)}
+
+            pending = pending_transferences(transferences, results)
+            profiles = await asyncio.gather(*receiver_user_tasks.values(), return_exceptions=True)
+            receiver_users = receiver_profiles(results, pending, receiver_ids, dict(zip(receiver_user_tasks, profiles)))
+
+            legs, debit, credits = batch_legs(pending_transferences(transferences, results), receiver_ids, balances, conversions)
+
+            if sender_balance["balance"] - debit < 0:
+                raise BalanceInsuficient("Usuário não possui saldo suficiente")
+
+            if not legs:
+                sender_user_task.cancel()
+                for task in receiver_user_tasks.values():
+                    task.cancel()
+                return results
+
+            sender_user = await sender_user_task
+
+        documents = await async_models.Balance.transfer(
+            sender_id, debit, credits, batch_transactions(sender_id, sender_user, sender_balance, legs)
+        )
+        if documents is None:
+            raise BalanceInsuficient("Usuário não possui saldo suficiente")
+
+        try:
+            await enqueue_sms(PushController.batch_messages(receiver_users, sender_user, legs, debit))
+        except Exception as e:
+            logger.error(f"Não foi possível registrar mensagem. {e}")
+
+        return batch_results(results, legs, documents, sender_user, receiver_users)
+
+    @staticmethod
+    async def get_ledger_balances(user_ids, skip_missing=False):
+        balances = await async_models.Balance.find_many(user_ids)
+        missing = [user_id for user_id in dict.fromkeys(user_ids) if user_id not in balances]
+        results = await asyncio.gather(
+            *(AsyncTransferenceController.get_user_balance(user_id) for user_id in missing), return_exceptions=True
+        )
+        for user_id, balance in zip(missing, results):
+            if isinstance(balance, BalanceNotFound) and skip_missing:
+                continue
+            if isinstance(balance, BaseException):
+                raise balance
+            balances[user_id] = await async_models.Balance.seed(user_id, balance["balance"], balance["currency"])
+        return balances
+
+    @staticmethod
+    async def get_user_transactions(user_id, limit=settings.PAGE_SIZE, cursor=None):
+        after = decode_cursor(cursor) if cursor else None
+        transactions = await async_models.Transaction.find_page_by_user_id(user_id, limit + 1, after)
+
+        if not transactions and not cursor:
+            raise TransactionNotFound("Sem nenhuma transação realizada")
+
+        return transactions_page(transactions, limit)
+
+    @staticmethod
+    async def get_transaction_by_id(transaction_id):
+        transaction = await async_models.Transaction.find_by_id(transaction_id)
+
+        if not transaction:
+            raise TransactionNotFound("Sem nenhuma transação realizada")
+        return transaction
+
+    @staticmethod
+    async def get_user_balance(user_id):
+        response = await user_client.get(f"/balance/{user_id}", "user_balance_get")
+        return user_response(response, BalanceNotFound("Saldo indisponível"))
+
+    @staticmethod
+    async def get_user_by_id(user_id):
+        version = await async_models.ProfileInvalidation.version(user_id)
+        profile = cached_profile(user_id, version)
+        if profile:
+            return profile
+        response = await user_client.get(f"/user/{user_id}", "user_profile")
+        return cache_profile(user_id, user_response(response, UserNotFound("Usuário não encontrado")), version)
+
+    @staticmethod
+    async def get_tax(latitude, longitude, sender_currency):
+        cell, tax = cached_tax(latitude, longitude, sender_currency)
+        if tax is None:
+            task = tax_requests.get(cell)
+            if task is None:
+                task = asyncio.ensure_future(AsyncTransferenceController.fetch_tax(cell))
+                tax_requests[cell] = task
+                task.add_done_callback(lambda _: tax_requests.pop(cell, None))
+            tax = dict(await asyncio.shield(task))
+        return tax
+
+    @staticmethod
+    async def fetch_tax(cell):
+        response = await geoloc_client.post("/tax_coords", "geoloc_tax", json=tax_payload(cell))
+        tax = geoloc_response(response, TaxNotFound("Taxa de conversão não encontrada"))
+        tax_cache.set(cell, tax)
+        return tax
+
+    @staticmethod
+    async def get_conversion(sender_currency, receiver_currency, value):
+        rate = await AsyncTransferenceController.get_conversion_rate(sender_currency, receiver_currency)
+        return {"result": value * rate}
+
+    @staticmethod
+    async def get_conversion_rate(sender_currency, receiver_currency):
+        pair = (sender_currency, receiver_currency)
+        rate, state = rate_cache.lookup(pair)
+        if state == HIT:
+            return rate
+        if state == STALE:
+            AsyncTransferenceController.refresh_conversion_rate(sender_currency, receiver_currency)
+            return rate
+        try:
+            rate = await AsyncTransferenceController.fetch_conversion_rate(sender_currency, receiver_currency)
+        except (GeoLocServiceError, ConversionNotFound):
+            rate = conversion_fallback(sender_currency, receiver_currency)
+            if rate is None:
+                raise
+            return rate
+        rate_cache.set(pair, rate)
+        return rate
+
+    @staticmethod
+    def refresh_conversion_rate(sender_currency, receiver_currency):
+        pair = (sender_currency, receiver_currency)
+        if not claim_refresh(pair):
+            return
+
+        async def refresh():
+            try:
+                refreshed_rate(pair, await AsyncTransferenceController.fetch_conversion_rate(sender_currency, receiver_currency))
+            except Exception as e:
+                refresh_failed(pair, e)
+            finally:
+                release_refresh(pair)
+
+        task = asyncio.create_task(refresh())
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+    @staticmethod
+    async def fetch_conversion_rate(sender_currency, receiver_currency):
+        payload = {
+            "sender_currency": sender_currency,
+            "receiver_currency": receiver_currency,
+            "value": 1
+        }
+        response = await geoloc_client.post("/conversion", "geoloc_conversion", json=payload)
+        return geoloc_response(response, ConversionNotFound("Conversão não encontrada"))["result"]
@@ -0,0 +1,77 @@
+import logging
+import math
+import threading
+
+import numpy as np
+from controllers import mock_tax
+from controllers.transference_controller import TransferenceController, executor
+from utils.cache import HIT, TTLCache
+from utils.exceptions import ConversionNotFound, GeoLocServiceError
+from utils.rate_matrix import RateMatrix
+from settings import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+matrix_cache = TTLCache(ttl=settings.RATE_CACHE_TTL)
+matrix_lock = threading.Lock()
+
+
+def pair_rate(sender_currency, receiver_currency):
+    try:
+        return TransferenceController.get_conversion_rate(sender_currency, receiver_currency)
+    except (GeoLocServiceError, ConversionNotFound) as e:
+        logger.error(f"Sem taxa de conversão para {sender_currency} -> {receiver_currency}: {e}")
+        return math.nan
+
+
+class ConversionController:
+    @staticmethod
+    def rate_matrix():
+        matrix, state = matrix_cache.lookup("matrix")
+        if state == HIT:
+            return matrix
+        with matrix_lock:
+            matrix, state = matrix_cache.lookup("matrix")
+            if state != HIT:
+                matrix = ConversionController.build_rate_matrix()
+                if not np.isnan(matrix.rates).any():
+                    matrix_cache.set("matrix", matrix)
+        return matrix
+
+    @staticmethod
+    def build_rate_matrix():
+        codes = mock_tax.codes
+        rates = np.eye(len(codes))
+        futures = {
+            (sender, receiver): executor.submit(pair_rate, codes[sender], codes[receiver])
+            for sender in range(len(codes))
+            for receiver in range(len(codes))
+            if sender != receiver
+        }
+        for pair, future in futures.items():
+            rates[pair] = future.result()
+        return RateMatrix(codes, rates, dict(zip(mock_tax.currencies, codes)))
+
+    @staticmethod
+    def convert_values(conversions):
+        matrix = ConversionController.rate_matrix()
+        return matrix.convert(
+            [conversion["value"] for conversion in conversions],
+            [conversion["currency"] for conversion in conversions],
+            [conversion["wanted_currency"] for conversion in conversions],
+        )
+
+    @staticmethod
+    def convert(conversion):
+        value = ConversionController.convert_values([conversion])[0]
+        if math.isnan(value):
+            raise ConversionNotFound("Conversão não encontrada")
+        return {"result": float(value)}
+
+    @staticmethod
+    def convert_batch(conversions):
+        return [
+            {"status": 404, "message": "Conversão não encontrada"} if math.isnan(value) else {"status": 200, "result": value}
+            for value in ConversionController.convert_values(conversions).tolist()
+        ]
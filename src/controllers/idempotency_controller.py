@@ -0,0 +1,59 @@
+import logging
+import time
+
+from database.models import IdempotencyKey
+from settings import settings
+from utils.index import request_fingerprint
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def replay(record, fingerprint):
+    if record["fingerprint"] != fingerprint:
+        return {"status": 422, "message": "Chave de idempotência já usada em outra requisição"}, 422
+    if record["status"] == IdempotencyKey.DONE:
+        return record["response"], record["status_code"]
+    return None
+
+
+def in_progress():
+    return {"status": 409, "message": "Requisição com a mesma chave de idempotência em andamento"}, 409
+
+
+class IdempotencyController:
+    @staticmethod
+    def execute(key, payload, handler):
+        fingerprint = request_fingerprint(payload)
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        while True:
+            if IdempotencyKey.acquire(key, fingerprint, settings.IDEMPOTENCY_LEASE_SECONDS):
+                return IdempotencyController.run(key, payload, handler)
+            record = IdempotencyKey.find(key)
+            if record is None:
+                continue
+            response = replay(record, fingerprint)
+            if response:
+                logger.info(f"Resposta reaproveitada para chave de idempotência {key}")
+                return response
+            if IdempotencyKey.take_over(key, settings.IDEMPOTENCY_LEASE_SECONDS):
+                return IdempotencyController.run(key, payload, handler)
+            if time.monotonic() >= deadline:
+                return in_progress()
+            time.sleep(settings.IDEMPOTENCY_POLL_INTERVAL)
+
+    @staticmethod
+    def run(key, payload, handler):
+        try:
+            response, status_code = handler(payload, key)
+        except Exception:
+            IdempotencyKey.release(key)
+            raise
+        if status_code != 200:
+            IdempotencyKey.release(key)
+            return response, status_code
+        try:
+            IdempotencyKey.complete(key, response, status_code)
+        except Exception as e:
+            logger.error(f"Não foi possível registrar a resposta da chave de idempotência {key}. {e}")
+        return response, status_code
@@ -1,2 +1,3 @@
 currencies = ["real", "dolar americano"]
-taxes = [5.24, 0.1908]
+codes = ["BRL", "USD"]
+taxes = {("USD", "BRL"): 5.24, ("BRL", "USD"): 0.1908}
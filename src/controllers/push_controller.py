@@ -1,20 +1,88 @@
-from twilio.rest import Client
 import logging
+import threading
+import time
+
+from twilio.rest import Client
+from database.models import Notification
 from settings import settings
+from utils.metrics import upstream_errors, upstream_latency, upstream_requests
 
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
-class PushController:
-    def send_sms(self, number, message):
-
-        client = Client(settings.ACCOUNT_SID, settings.AUTH_TOKEN)
+class TwilioTransport:
+    def __init__(self):
+        self.client = Client(settings.ACCOUNT_SID, settings.AUTH_TOKEN)
 
-        message = client.messages.create(
+    def send(self, number, message):
+        message = self.client.messages.create(
             from_="+13613101634",
             body=message,
             to=f"+55{number}"
         )
-        logger.info(f"Mensagem por SMS: {message.sid}")
+        return message.sid
+
+
+class LocalTransport:
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, number, message):
+        with self._lock:
+            self.sent.append({"number": number, "message": message})
+            return f"local-{len(self.sent)}"
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def default_transport():
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = LocalTransport() if settings.SMS_TRANSPORT == "local" else TwilioTransport()
+    return _transport
+
+
+class PushController:
+    def __init__(self, transport=None):
+        self.transport = transport or default_transport()
+
+    def send_sms(self, number, message):
+        start = time.perf_counter()
+        try:
+            sid = self.transport.send(number, message)
+        except Exception:
+            upstream_latency.observe(time.perf_counter() - start, "sms")
+            upstream_errors.inc("sms")
+            raise
+        upstream_latency.observe(time.perf_counter() - start, "sms")
+        upstream_requests.inc("sms", "sent")
+        logger.info(f"Mensagem por SMS: {sid}")
+        return sid
+
+    @staticmethod
+    def transfer_messages(receiver_user, sender_user, receiver_key, value_to_receiver, value_to_sender):
+        return [
+            (receiver_user.get("cellphone"), f"Transferência recebida! No valor de {value_to_receiver}."),
+            (sender_user.get("cellphone"), f"Transferência realizada! No valor de {value_to_sender} para {receiver_key}."),
+        ]
+
+    @staticmethod
+    def batch_messages(receiver_users, sender_user, legs, debit):
+        messages = [
+            (receiver_users[leg["receiver_id"]].get("cellphone"), f"Transferência recebida! No valor de {leg['value_to_receiver']}.")
+            for leg in legs
+        ]
+        messages.append((sender_user.get("cellphone"), f"Transferências realizadas! {len(legs)} no valor total de {debit}."))
+        return messages
+
+    @staticmethod
+    def enqueue_sms(messages):
+        notifications = [Notification(number, message) for number, message in messages]
+        return Notification.save_many(notifications)
@@ -0,0 +1,285 @@
+import logging
+import threading
+import uuid
+
+from controllers import mock_tax
+from database.models import PixKey, Transaction
+from settings import settings
+from utils.cache import HIT, TTLCache
+from utils.exceptions import GeoLocServiceError, UserNotFound, UserServiceError
+from utils.index import encode_cursor, transaction_to_payload
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+rate_cache = TTLCache(ttl=settings.RATE_CACHE_TTL, stale_ttl=settings.RATE_CACHE_STALE_TTL)
+refreshing_rates = set()
+refreshing_rates_lock = threading.Lock()
+
+key_cache = TTLCache(ttl=settings.KEY_CACHE_TTL, maxsize=settings.KEY_CACHE_MAXSIZE)
+
+PROFILE_FIELDS = ("_id", "name", "cpf", "institution", "agency", "account", "cellphone")
+profile_cache = TTLCache(ttl=settings.PROFILE_CACHE_TTL, maxsize=settings.PROFILE_CACHE_MAXSIZE)
+
+tax_cache = TTLCache(ttl=settings.TAX_CACHE_TTL, maxsize=settings.TAX_CACHE_MAXSIZE)
+tax_cell_caches = {
+    precision: TTLCache(ttl=settings.TAX_CACHE_TTL, maxsize=settings.TAX_CACHE_MAXSIZE)
+    for precision in settings.TAX_CACHE_TRACKED_PRECISIONS
+}
+
+
+FALLBACK_CODES = dict(zip(mock_tax.currencies, mock_tax.codes))
+FALLBACK_CODES.update({code: code for code in mock_tax.codes})
+
+
+def fallback_conversion_rate(sender_currency, receiver_currency):
+    if sender_currency == receiver_currency:
+        return 1.0
+    return mock_tax.taxes.get((FALLBACK_CODES.get(sender_currency), FALLBACK_CODES.get(receiver_currency)))
+
+
+def conversion_fallback(sender_currency, receiver_currency):
+    rate = fallback_conversion_rate(sender_currency, receiver_currency)
+    if rate is not None:
+        rate_cache.count("fallbacks")
+        logger.error(f"Usando taxa de conversão local para {sender_currency} -> {receiver_currency}")
+    return rate
+
+
+def claim_refresh(pair):
+    with refreshing_rates_lock:
+        if pair in refreshing_rates:
+            return False
+        refreshing_rates.add(pair)
+        return True
+
+
+def refreshed_rate(pair, rate):
+    rate_cache.set(pair, rate)
+    rate_cache.count("refreshes")
+
+
+def refresh_failed(pair, error):
+    rate_cache.count("refresh_errors")
+    logger.error(f"Não foi possível atualizar taxa de conversão {pair[0]} -> {pair[1]}: {error}")
+
+
+def release_refresh(pair):
+    with refreshing_rates_lock:
+        refreshing_rates.discard(pair)
+
+
+def user_response(response, not_found):
+    logger.info(f"Resposta do servidor de usuário: {response.status_code}")
+    if response.status_code != 200:
+        logger.error(f"Erro no servidor de usuário: {response.text}")
+        raise UserServiceError("Serviço de usuário indisponível")
+    response = response.json()
+    if not response:
+        raise not_found
+    return response
+
+
+def geoloc_response(response, not_found):
+    logger.info(f"Resposta do servidor de geolocalização: {response.status_code}")
+    if response.status_code != 200:
+        logger.error(f"Erro no servidor de geolocalização: {response.text}")
+        raise GeoLocServiceError("Serviço de geolocalização indisponível")
+    response = response.json()
+    if not response:
+        raise not_found
+    return response
+
+
+def build_pix_key(key):
+    type = key.get("type")
+
+    if type == "aleatoria":
+        key["key"] = str(uuid.uuid4())
+
+    return PixKey(
+        type=type,
+        key=key.get("key"),
+        user_id=key.get("user_id")
+    )
+
+
+def cache_key_lookup(key, user):
+    if user:
+        key_cache.set(key, user)
+    else:
+        key_cache.set(key, None, ttl=settings.KEY_CACHE_NEGATIVE_TTL)
+    return user
+
+
+def cached_keys(keys):
+    users = {}
+    missing = []
+    for key in dict.fromkeys(keys):
+        user, state = key_cache.lookup(key)
+        if state == HIT:
+            users[key] = user
+        else:
+            missing.append(key)
+    return users, missing
+
+
+def cache_found_keys(users, missing, pix_keys):
+    found = {pix_key["key"]: pix_key for pix_key in pix_keys}
+    for key in missing:
+        users[key] = cache_key_lookup(key, found.get(key))
+    return users
+
+
+def batch_receivers(users):
+    receiver_ids = {}
+    errors = {}
+    for key, user in users.items():
+        if user:
+            receiver_ids[key] = user.get("user_id")
+        else:
+            errors[key] = {"status": 404, "message": f"Usuário não encontrado para chave {key}"}
+    return receiver_ids, errors
+
+
+def resolved_keys(keys, users):
+    return [
+        {"status": 200, **users[key]} if users[key] else {"status": 404, "message": f"Usuário não encontrado para chave {key}"}
+        for key in keys
+    ]
+
+
+def cached_profile(user_id, version):
+    entry, state = profile_cache.lookup(user_id)
+    if state != HIT:
+        return None
+    profile, cached_version = entry
+    if cached_version != version:
+        profile_cache.invalidate(user_id)
+        return None
+    return dict(profile)
+
+
+def cache_profile(user_id, user, version):
+    profile = {field: user[field] for field in PROFILE_FIELDS if field in user}
+    profile_cache.set(user_id, (profile, version))
+    return dict(profile)
+
+
+def tax_cell(latitude, longitude, sender_currency, precision):
+    return (precision, round(latitude, precision), round(longitude, precision), sender_currency)
+
+
+def track_tax_cells(latitude, longitude, sender_currency):
+    for precision, cache in tax_cell_caches.items():
+        cell = tax_cell(latitude, longitude, sender_currency, precision)
+        _, state = cache.lookup(cell)
+        if state != HIT:
+            cache.set(cell, True)
+
+
+def cached_tax(latitude, longitude, sender_currency):
+    track_tax_cells(latitude, longitude, sender_currency)
+    cell = tax_cell(latitude, longitude, sender_currency, settings.TAX_CACHE_PRECISION)
+    tax, state = tax_cache.lookup(cell)
+    return cell, dict(tax) if state == HIT else None
+
+
+def tax_payload(cell):
+    _, latitude, longitude, sender_currency = cell
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "sender_currency": sender_currency
+    }
+
+
+def transactions_page(transactions, limit):
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        return transactions, encode_cursor(transactions[-1])
+    return transactions, None
+
+
+def pending_transferences(transferences, results):
+    return [(index, transference) for index, transference in enumerate(transferences) if results[index] is None]
+
+
+def balance_errors(errors, receiver_ids, balances):
+    for key, receiver_id in receiver_ids.items():
+        if receiver_id not in balances:
+            errors[key] = {"status": 404, "message": "Saldo indisponível"}
+    return errors
+
+
+def receiver_profiles(results, pending, receiver_ids, profiles):
+    receiver_users = {}
+    for index, transference in pending:
+        receiver_id = receiver_ids[transference.get("receiver_key")]
+        profile = profiles[receiver_id]
+        if isinstance(profile, UserNotFound):
+            results[index] = {"status": 404, "message": str(profile)}
+        elif isinstance(profile, BaseException):
+            raise profile
+        else:
+            receiver_users[receiver_id] = profile
+    return receiver_users
+
+
+def batch_legs(pending, receiver_ids, balances, conversions):
+    legs = []
+    debit = 0
+    credits = {}
+    for index, transference in pending:
+        value_to_sender, value_to_receiver = conversions[index]
+        receiver_key = transference.get("receiver_key")
+        receiver_id = receiver_ids[receiver_key]
+        debit += value_to_sender
+        credits[receiver_id] = credits.get(receiver_id, 0) + value_to_receiver
+        legs.append({
+            "index": index,
+            "receiver_key": receiver_key,
+            "receiver_id": receiver_id,
+            "receiver_currency": balances[receiver_id]["currency"],
+            "value_to_sender": value_to_sender,
+            "value_to_receiver": value_to_receiver,
+        })
+    return legs, debit, credits
+
+
+def batch_transactions(sender_id, sender_user, sender_balance, legs):
+    transactions = []
+    for leg in legs:
+        transactions.extend(Transaction.transfer_legs(
+            sender_id, leg["receiver_id"], leg["receiver_key"], sender_user.get("name"),
+            sender_balance["currency"], leg["receiver_currency"], leg["value_to_sender"], leg["value_to_receiver"]
+        ))
+    return transactions
+
+
+def batch_results(results, legs, documents, sender_user, receiver_users):
+    for position, leg in enumerate(legs):
+        payload = transaction_to_payload(documents[position * 2], sender_user, receiver_users[leg["receiver_id"]])
+        results[leg["index"]] = {"status": 200, **payload}
+    return results
+
+
+def monthly_statement(rollups):
+    months = {}
+    for rollup in rollups:
+        key = (rollup["day"].strftime("%Y-%m"), rollup["currency"])
+        if key not in months:
+            months[key] = {"month": key[0], "currency": key[1], "sended": 0.0, "received": 0.0, "count": 0}
+        months[key][rollup["type"]] += rollup["total"]
+        months[key]["count"] += rollup["count"]
+    return [months[key] for key in sorted(months)]
+
+
+def cache_stats():
+    return {
+        "conversion_rates": rate_cache.stats(),
+        "pix_keys": key_cache.stats(),
+        "user_profiles": profile_cache.stats(),
+        "tax": tax_cache.stats(),
+        **{f"tax_cells_p{precision}": cache.stats() for precision, cache in tax_cell_caches.items()},
+    }
@@ -1,53 +1,113 @@
 import logging
-import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
 
-import requests
+from pymongo.errors import DuplicateKeyError
+from clients.upstream import geoloc_client, user_client
+from controllers import transference_common
 from controllers.push_controller import PushController
-from database.models import PixKey, Transaction
-from utils.exceptions import BalanceInsuficient, BalanceNotFound, ConversionNotFound, GeoLocServiceError, KeyAlreadyExistsException, KeyNotFound, TaxNotFound, TransactionNotFound, UserNotFound, UserServiceError
+from controllers.transference_common import (
+    balance_errors,
+    batch_receivers,
+    batch_legs,
+    batch_results,
+    batch_transactions,
+    build_pix_key,
+    cache_found_keys,
+    cache_key_lookup,
+    cache_profile,
+    cached_keys,
+    cached_profile,
+    cached_tax,
+    claim_refresh,
+    conversion_fallback,
+    refresh_failed,
+    refreshed_rate,
+    release_refresh,
+    geoloc_response,
+    key_cache,
+    monthly_statement,
+    pending_transferences,
+    profile_cache,
+    rate_cache,
+    receiver_profiles,
+    resolved_keys,
+    tax_cache,
+    tax_payload,
+    transactions_page,
+    user_response,
+)
+from database.models import Balance, PixKey, ProfileInvalidation, StatementRollup, Transaction
+from utils.exceptions import BalanceInsuficient, BalanceNotFound, ConversionNotFound, GeoLocServiceError, KeyAlreadyExistsException, KeyNotFound, TaxNotFound, TransactionNotFound, UserNotFound
 from settings import settings
-from utils.index import transaction_to_payload
+from utils import json_provider
+from utils.cache import HIT, STALE
+from utils.single_flight import SingleFlight
+from utils.index import apply_conversion, conversion_plan, decode_cursor, transaction_to_payload
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-headers = {
-    "Content-Type": "application/json"
-}
+executor = ThreadPoolExecutor(max_workers=settings.UPSTREAM_MAX_WORKERS, thread_name_prefix="upstream")
 
-class TransferenceController:
-    @staticmethod
-    def create_key(key):
-        type = key.get("type")
-        pix_key = key.get("key")
+tax_requests = SingleFlight()
 
-        keys = PixKey.find()
 
-        if type == "aleatoria":
-            key["key"] = str(uuid.uuid4())
+def export_batches(cursor, batch, batch_size):
+    try:
+        while batch:
+            yield b"".join(json_provider.dumps(transaction) + b"\n" for transaction in batch)
+            batch = list(islice(cursor, batch_size))
+    finally:
+        cursor.close()
 
-        for existent_key in keys:
-            if existent_key.get("type") == type and existent_key.get("key") == pix_key:
-                raise KeyAlreadyExistsException("Chave já está em uso")
 
-        new_key = PixKey(
-            type=type,
-            key=key.get("key"),
-            user_id=key.get("user_id")
-        )
+@contextmanager
+def cancel_on_error(*futures):
+    try:
+        yield
+    except Exception:
+        for future in futures:
+            future.cancel()
+        raise
+
+
+class TransferenceController:
+    @staticmethod
+    def create_key(key):
+        new_key = build_pix_key(key)
 
-        key_id = new_key.save()
+        try:
+            key_id = new_key.save()
+        except DuplicateKeyError:
+            raise KeyAlreadyExistsException("Chave já está em uso")
 
+        key_cache.invalidate(new_key.key)
         return key_id
 
+    @staticmethod
+    def create_keys(keys):
+        documents, errors = PixKey.save_many([build_pix_key(key) for key in keys])
+
+        results = []
+        for index, document in enumerate(documents):
+            error = errors.get(index)
+            if not error:
+                key_cache.invalidate(document["key"])
+                results.append({"status": 200, "_id": document["_id"], "type": document["type"], "key": document["key"]})
+            elif error["code"] == 11000:
+                results.append({"status": 409, "message": "Chave já está em uso"})
+            else:
+                results.append({"status": 400, "message": error["errmsg"]})
+        return results
+
     @staticmethod
     def get_user_keys(user_id):
         keys = PixKey.find_by_user_id(user_id)
         keys = list(keys)
         if not keys:
             raise KeyNotFound("Chave não encontrada")
-        for key in keys:
-            key["_id"] = str(key["_id"])
         return keys
     
     @staticmethod
@@ -56,19 +116,26 @@ class TransferenceController:
 
         if not key:
             raise KeyNotFound("Chave não encontrada")
-        key["_id"] = str(key["_id"])
         return key
     
     @staticmethod
     def get_user_by_key(key):
-        user = PixKey.find_by_key(key)
+        user, state = key_cache.lookup(key)
+        if state != HIT:
+            user = cache_key_lookup(key, PixKey.find_by_key(key))
         if not user:
             raise UserNotFound(f"Usuário não encontrado para chave {key}")
-        user["_id"] = str(user["_id"])
-        return user
+        return dict(user)
+
+    @staticmethod
+    def resolve_keys(keys):
+        users, missing = cached_keys(keys)
+        if missing:
+            cache_found_keys(users, missing, PixKey.find_by_keys(missing))
+        return resolved_keys(keys, users)
     
     @staticmethod
-    def transaction(transference):
+    def transaction(transference, idempotency_key=None):
 
         receiver_user_key = transference.get("receiver_key")
         sender_id = transference.get("sender_id")
@@ -78,174 +145,274 @@ class TransferenceController:
         receiver_user = TransferenceController.get_user_by_key(receiver_user_key)
         receiver_user_id = receiver_user.get("user_id")
 
-        receiver_user_balance = TransferenceController.get_user_balance(receiver_user_id)
-        sender_user_balance = TransferenceController.get_user_balance(sender_id)
-
-        receiver_user_currency = receiver_user_balance["currency"]
-        sender_user_currency = sender_user_balance["currency"]
-
-        if receiver_user_currency == sender_user_currency and transference_currency == sender_user_currency:
-            sended_value_to_receiver = sended_value
-            sended_value_to_sender = sended_value
-        elif receiver_user_currency == sender_user_currency and transference_currency != sender_user_currency:
-            conversion = TransferenceController.get_conversion(transference_currency, sender_user_currency, sended_value)
-            sended_value_to_receiver = conversion["result"]
-            sended_value_to_sender = conversion["result"]
-        elif transference_currency == receiver_user_currency:
-            conversion = TransferenceController.get_conversion(transference_currency, sender_user_currency, sended_value)
-            sended_value_to_receiver = sended_value
-            sended_value_to_sender = conversion["result"]
-        elif transference_currency == sender_user_currency:
-            conversion = TransferenceController.get_conversion(transference_currency, receiver_user_currency, sended_value)
-            sended_value_to_receiver = conversion["result"]
-            sended_value_to_sender = sended_value
-
-        new_sender_user_balance = sender_user_balance["balance"] - sended_value_to_sender
-
-        if new_sender_user_balance < 0:
-            raise BalanceInsuficient("Usuário não possui saldo suficiente")
+        user_futures = {
+            user_id: executor.submit(TransferenceController.get_user_by_id, user_id)
+            for user_id in dict.fromkeys((receiver_user_id, sender_id))
+        }
+        receiver_user_future = user_futures[receiver_user_id]
+        sender_user_future = user_futures[sender_id]
 
-        new_receiver_balance = receiver_user_balance["balance"] + sended_value_to_receiver
+        with cancel_on_error(*user_futures.values()):
+            balances = TransferenceController.get_ledger_balances([receiver_user_id, sender_id])
+            receiver_user_balance = balances[receiver_user_id]
+            sender_user_balance = balances[sender_id]
 
-        TransferenceController.updated_balance(receiver_user_id, new_receiver_balance)
-        TransferenceController.updated_balance(sender_id, new_sender_user_balance)
+            receiver_user_currency = receiver_user_balance["currency"]
+            sender_user_currency = sender_user_balance["currency"]
 
-        receiver_user = TransferenceController.get_user_by_id(receiver_user_id)
+            sended_value_to_sender, sended_value_to_receiver = TransferenceController.converted_values(
+                transference_currency, sender_user_currency, receiver_user_currency, sended_value
+            )
 
-        sender_user = TransferenceController.get_user_by_id(sender_id)
+            if sender_user_balance["balance"] - sended_value_to_sender < 0:
+                raise BalanceInsuficient("Usuário não possui saldo suficiente")
 
-        new_transaction = Transaction(
-            user_id = sender_id,
-            receiver_key = receiver_user_key,
-            sender = sender_user.get("name"),
-            currency = sender_user_currency,
-            value = sended_value_to_sender,
-            type = "sended"
-        )
+        receiver_user = receiver_user_future.result()
+        sender_user = sender_user_future.result()
 
-        new_transaction_to_receiver = Transaction(
-            user_id = receiver_user_id,
-            receiver_key = receiver_user_key,
-            sender = sender_user.get("name"),
-            currency = receiver_user_currency,
-            value = sended_value_to_receiver,
-            type = "received"
+        legs = Transaction.transfer_legs(
+            sender_id, receiver_user_id, receiver_user_key, sender_user.get("name"),
+            sender_user_currency, receiver_user_currency, sended_value_to_sender, sended_value_to_receiver
         )
-
-        transaction_id = new_transaction.save()
-        
-        new_transaction_to_receiver.save()
+        documents = Balance.transfer(
+            sender_id, sended_value_to_sender, {receiver_user_id: sended_value_to_receiver}, legs,
+            idempotency_key, lambda documents: transaction_to_payload(documents[0], sender_user, receiver_user)
+        )
+        if documents is None:
+            raise BalanceInsuficient("Usuário não possui saldo suficiente")
+        transaction = documents[0]
 
         try:
-            receiver_number = receiver_user.get("cellphone")
-            sender_number = sender_user.get("cellphone")
-            message_receiver = f"Transferência recebida! No valor de {sended_value_to_receiver}."
-            message_sender = f"Transferência realizada! No valor de {sended_value_to_sender} para {receiver_user_key}."
-            PushController().send_sms(receiver_number, message_receiver)
-            PushController().send_sms(sender_number, message_sender)
+            PushController.enqueue_sms(PushController.transfer_messages(
+                receiver_user, sender_user, receiver_user_key, sended_value_to_receiver, sended_value_to_sender
+            ))
         except Exception as e:
-            logger.error(f"Não foi possível enviar mensagem. {e}")
-
-        transaction = Transaction.find_by_id(transaction_id)
+            logger.error(f"Não foi possível registrar mensagem. {e}")
 
         transaction = transaction_to_payload(transaction, sender_user, receiver_user)
         
         return transaction
     
     @staticmethod
-    def get_user_transactions(user_id):
-        transactions = Transaction.find_by_user_id(user_id)
+    def converted_values(transference_currency, sender_currency, receiver_currency, value):
+        plan = conversion_plan(transference_currency, sender_currency, receiver_currency)
+        if plan is None:
+            return value, value
+        source_currency, target_currency, _, _ = plan
+        conversion = TransferenceController.get_conversion(source_currency, target_currency, value)
+        return apply_conversion(plan, value, conversion["result"])
+
+    @staticmethod
+    def batch_transaction(transferences):
+        sender_id = transferences[0].get("sender_id")
+        receiver_keys = list(dict.fromkeys(transference.get("receiver_key") for transference in transferences))
+
+        sender_user_future = executor.submit(TransferenceController.get_user_by_id, sender_id)
+
+        with cancel_on_error(sender_user_future):
+            users, missing = cached_keys(receiver_keys)
+            if missing:
+                cache_found_keys(users, missing, PixKey.find_by_keys(missing))
+        receiver_ids, errors = batch_receivers(users)
+
+        distinct_receiver_ids = list(dict.fromkeys(receiver_ids.values()))
+        receiver_user_futures = {
+            user_id: sender_user_future if user_id == sender_id else executor.submit(TransferenceController.get_user_by_id, user_id)
+            for user_id in distinct_receiver_ids
+        }
+
+        with cancel_on_error(sender_user_future, *receiver_user_futures.values()):
+            balances = TransferenceController.get_ledger_balances([sender_id, *distinct_receiver_ids], skip_missing=True)
+            if sender_id not in balances:
+                raise BalanceNotFound("Saldo indisponível")
+            sender_balance = balances[sender_id]
+            balance_errors(errors, receiver_ids, balances)
+            results = [errors.get(transference.get("receiver_key")) for transference in transferences]
+
+            conversions = {}
+            for index, transference in pending_transferences(transferences, results):
+                try:
+                    conversions[index] = TransferenceController.converted_values(
+                        transference.get("currency"), sender_balance["currency"],
+                        balances[receiver_ids[transference.get("receiver_key")]]["currency"], transference.get("value")
+                    )
+                except ConversionNotFound as e:
+                    results[index] = {"status": 404, "message": str(e)}
+
+            pending = pending_transferences(transferences, results)
+            profiles = {}
+            for user_id, future in receiver_user_futures.items():
+                try:
+                    profiles[user_id] = future.result()
+                except Exception as e:
+                    profiles[user_id] = e
+            receiver_users = receiver_profiles(results, pending, receiver_ids, profiles)
+
+            legs, debit, credits = batch_legs(pending_transferences(transferences, results), receiver_ids, balances, conversions)
+
+            if sender_balance["balance"] - debit < 0:
+                raise BalanceInsuficient("Usuário não possui saldo suficiente")
+
+        if not legs:
+            return results
+
+        sender_user = sender_user_future.result()
+
+        documents = Balance.transfer(sender_id, debit, credits, batch_transactions(sender_id, sender_user, sender_balance, legs))
+        if documents is None:
+            raise BalanceInsuficient("Usuário não possui saldo suficiente")
+
+        try:
+            PushController.enqueue_sms(PushController.batch_messages(receiver_users, sender_user, legs, debit))
+        except Exception as e:
+            logger.error(f"Não foi possível registrar mensagem. {e}")
+
+        return batch_results(results, legs, documents, sender_user, receiver_users)
+
+    @staticmethod
+    def get_ledger_balances(user_ids, skip_missing=False):
+        balances = Balance.find_many(user_ids)
+        futures = {
+            user_id: executor.submit(TransferenceController.get_user_balance, user_id)
+            for user_id in dict.fromkeys(user_ids) if user_id not in balances
+        }
+        with cancel_on_error(*futures.values()):
+            for user_id, future in futures.items():
+                try:
+                    balance = future.result()
+                except BalanceNotFound:
+                    if not skip_missing:
+                        raise
+                    continue
+                balances[user_id] = Balance.seed(user_id, balance["balance"], balance["currency"])
+        return balances
+
+    @staticmethod
+    def get_user_transactions(user_id, limit=settings.PAGE_SIZE, cursor=None):
+        after = decode_cursor(cursor) if cursor else None
+        transactions = Transaction.find_page_by_user_id(user_id, limit + 1, after)
         transactions = list(transactions)
 
-        if not transactions:
+        if not transactions and not cursor:
             raise TransactionNotFound("Sem nenhuma transação realizada")
-        for transaction in transactions:
-            transaction["_id"] = str(transaction["_id"])
-        return transactions
+
+        return transactions_page(transactions, limit)
+
+    @staticmethod
+    def export_user_transactions(user_id, start=None, end=None, projection=None, batch_size=settings.EXPORT_BATCH_SIZE):
+        cursor = Transaction.export_cursor(user_id, start, end, projection, batch_size)
+        try:
+            first = list(islice(cursor, batch_size))
+        except Exception:
+            cursor.close()
+            raise
+        return export_batches(cursor, first, batch_size)
     
+    @staticmethod
+    def get_statement(user_id, start=None, end=None):
+        return monthly_statement(StatementRollup.find_range(user_id, start, end))
+
     @staticmethod
     def get_transaction_by_id(transaction_id):
         transaction = Transaction.find_by_id(transaction_id)
 
         if not transaction:
             raise TransactionNotFound("Sem nenhuma transação realizada")
-        transaction["_id"] = str(transaction["_id"])
         return transaction
     
     @staticmethod
     def get_user_balance(user_id):
-        url = f"{settings.USER_API}/balance/{user_id}"
-        response = requests.get(url)
-        logger.info(f"Resposta do servidor de usuário: {response.status_code}")
-        if response.status_code != 200:
-            logger.error(f"Erro no servidor de usuário: {response.text}")
-            raise UserServiceError("Serviço de usuário indisponível")
-        response = response.json()
-        if not response:
-            raise BalanceNotFound("Saldo indisponível")
-        return response
+        response = user_client.get(f"/balance/{user_id}", "user_balance_get")
+        return user_response(response, BalanceNotFound("Saldo indisponível"))
     
     @staticmethod
-    def updated_balance(user_id, balance):
-        url = f"{settings.USER_API}/balance/{user_id}"
+    def updated_balance(user_id, balance, operation=None):
         payload = {
             "balance": balance
         }
-        response = requests.patch(url, json=payload, headers=headers)
-        logger.info(f"Resposta do servidor de usuário: {response.status_code}")
-        if response.status_code != 200:
-            logger.error(f"Erro no servidor de usuário: {response.text}")
-            raise UserServiceError("Serviço de usuário indisponível")
-        response = response.json()
-        if not response:
-            raise BalanceNotFound("Saldo indisponível")
-        return response
+        if operation:
+            payload["sync_operation"] = operation
+        response = user_client.patch(f"/balance/{user_id}", "user_balance_patch", json=payload)
+        return user_response(response, BalanceNotFound("Saldo indisponível"))
     
     @staticmethod
     def get_user_by_id(user_id):
-        url = f"{settings.USER_API}/user/{user_id}"
-        response = requests.get(url)
-        logger.info(f"Resposta do servidor de usuário: {response.status_code}")
-        if response.status_code != 200:
-            logger.error(f"Erro no servidor de usuário: {response.text}")
-            raise UserServiceError("Serviço de usuário indisponível")
-        response = response.json()
-        if not response:
-            raise UserNotFound("Usuário não encontrado")
-        return response
+        version = ProfileInvalidation.version(user_id)
+        profile = cached_profile(user_id, version)
+        if profile:
+            return profile
+        response = user_client.get(f"/user/{user_id}", "user_profile")
+        return cache_profile(user_id, user_response(response, UserNotFound("Usuário não encontrado")), version)
+
+    @staticmethod
+    def invalidate_user(user_id):
+        ProfileInvalidation.bump(user_id)
+        profile_cache.invalidate(user_id)
     
     @staticmethod
     def get_tax(latitude, longitude, sender_currency):
-        url = f"{settings.GEOLOC_API}/tax_coords"
-        payload = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "sender_currency": sender_currency
-        }
-        response = requests.post(url, json=payload, headers=headers)
-        logger.info(f"Resposta do servidor de geolocalização: {response.status_code}")
-        if response.status_code != 200:
-            logger.error(f"Erro no servidor de geolocalização: {response.text}")
-            raise GeoLocServiceError("Serviço de geolocalização indisponível")
-        response = response.json()
-        if not response:
-            raise TaxNotFound("Taxa de conversão não encontrada")
-        return response
+        cell, tax = cached_tax(latitude, longitude, sender_currency)
+        if tax is None:
+            tax = dict(tax_requests.do(cell, lambda: TransferenceController.fetch_tax(cell)))
+        return tax
+
+    @staticmethod
+    def fetch_tax(cell):
+        response = geoloc_client.post("/tax_coords", "geoloc_tax", json=tax_payload(cell))
+        tax = geoloc_response(response, TaxNotFound("Taxa de conversão não encontrada"))
+        tax_cache.set(cell, tax)
+        return tax
     
     @staticmethod
     def get_conversion(sender_currency, receiver_currency, value):
-        url = f"{settings.GEOLOC_API}/conversion"
+        rate = TransferenceController.get_conversion_rate(sender_currency, receiver_currency)
+        return {"result": value * rate}
+
+    @staticmethod
+    def get_conversion_rate(sender_currency, receiver_currency):
+        pair = (sender_currency, receiver_currency)
+        rate, state = rate_cache.lookup(pair)
+        if state == HIT:
+            return rate
+        if state == STALE:
+            TransferenceController.refresh_conversion_rate(sender_currency, receiver_currency)
+            return rate
+        try:
+            rate = TransferenceController.fetch_conversion_rate(sender_currency, receiver_currency)
+        except (GeoLocServiceError, ConversionNotFound):
+            rate = conversion_fallback(sender_currency, receiver_currency)
+            if rate is None:
+                raise
+            return rate
+        rate_cache.set(pair, rate)
+        return rate
+
+    @staticmethod
+    def refresh_conversion_rate(sender_currency, receiver_currency):
+        pair = (sender_currency, receiver_currency)
+        if not claim_refresh(pair):
+            return
+
+        def refresh():
+            try:
+                refreshed_rate(pair, TransferenceController.fetch_conversion_rate(sender_currency, receiver_currency))
+            except Exception as e:
+                refresh_failed(pair, e)
+            finally:
+                release_refresh(pair)
+
+        executor.submit(refresh)
+
+    @staticmethod
+    def fetch_conversion_rate(sender_currency, receiver_currency):
         payload = {
             "sender_currency": sender_currency,
             "receiver_currency": receiver_currency,
-            "value": value
+            "value": 1
         }
-        response = requests.post(url, json=payload, headers=headers)
-        logger.info(f"Resposta do servidor de geolocalização: {response.status_code}")
-        if response.status_code != 200:
-            logger.error(f"Erro no servidor de geolocalização: {response.text}")
-            raise GeoLocServiceError("Serviço de geolocalização indisponível")
-        response = response.json()
-        if not response:
-            raise ConversionNotFound("Conversão não encontrada")
-        return response
\ No newline at end of file
+        response = geoloc_client.post("/conversion", "geoloc_conversion", json=payload)
+        return geoloc_response(response, ConversionNotFound("Conversão não encontrada"))["result"]
+
+    @staticmethod
+    def cache_stats():
+        return transference_common.cache_stats()
@@ -0,0 +1,144 @@
+from datetime import timedelta
+
+from bson.objectid import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
+from database import models
+from database.db import client_options
+from settings import settings
+from utils.exceptions import IdempotencyConflict
+from utils.index import default_datetime
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(settings.MONGO_DATABASE_URI, **client_options())
+    return _client
+
+
+def get_db():
+    return get_client().get_database(settings.MONGO_DATABASE_NAME)
+
+
+def close():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+class PixKey:
+    async def save(pix_key):
+        result = await get_db().keys.insert_one(pix_key.to_document(default_datetime()))
+        return result.inserted_id
+
+    async def find_by_user_id(user_id):
+        result = await get_db().keys.find({"user_id": user_id}).to_list(None)
+        return result
+
+    async def find_by_id(key_id):
+        key = await get_db().keys.find_one({"_id": ObjectId(key_id)})
+        return key
+
+    async def find_by_key(key):
+        key = await get_db().keys.find_one({"key": key})
+        return key
+
+    async def find_by_keys(keys):
+        result = await get_db().keys.find({"key": {"$in": keys}}).to_list(None)
+        return result
+
+
+class Transaction:
+    async def find_by_id(transaction_id):
+        transaction = await get_db().transactions.find_one({"_id": ObjectId(transaction_id)})
+        return transaction
+
+    async def find_page_by_user_id(user_id, limit, after=None):
+        query = models.Transaction.page_query(user_id, after)
+        result = await get_db().transactions.find(query).sort(models.Transaction.PAGE_SORT).limit(limit).to_list(limit)
+        return result
+
+
+class Balance:
+    async def find_many(user_ids):
+        result = await get_db().balances.find({"_id": {"$in": list(user_ids)}}).to_list(None)
+        return {balance["_id"]: balance for balance in result}
+
+    async def seed(user_id, balance, currency):
+        try:
+            await get_db().balances.insert_one(models.Balance.to_document(user_id, balance, currency, default_datetime()))
+        except DuplicateKeyError:
+            pass
+        return await get_db().balances.find_one({"_id": user_id})
+
+    async def transfer(sender_id, debit, credits, transactions, idempotency_key=None, response=None):
+        now = default_datetime()
+        documents = [transaction.to_document(now) for transaction in transactions]
+        db = get_db()
+
+        async def apply(session):
+            result = await db.balances.update_one(
+                models.Balance.debit_filter(sender_id, debit), models.Balance.change(-debit, now), session=session
+            )
+            if not result.modified_count:
+                return None
+            for user_id, credit in credits.items():
+                await db.balances.update_one({"_id": user_id}, models.Balance.change(credit, now), session=session)
+            await db.transactions.insert_many(documents, session=session)
+            await db.statement_rollups.bulk_write(models.StatementRollup.increments(documents), ordered=False, session=session)
+            if idempotency_key and not await IdempotencyKey.complete(idempotency_key, response(documents), 200, session=session):
+                raise IdempotencyConflict("Requisição com a mesma chave de idempotência já concluída")
+            return documents
+
+        async with await get_client().start_session() as session:
+            return await session.with_transaction(apply)
+
+
+class IdempotencyKey:
+    async def acquire(key, fingerprint, lease_seconds):
+        try:
+            await get_db().idempotency_keys.insert_one(
+                models.IdempotencyKey.to_document(key, fingerprint, lease_seconds, default_datetime())
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def find(key):
+        return await get_db().idempotency_keys.find_one({"_id": key})
+
+    async def take_over(key, lease_seconds):
+        now = default_datetime()
+        result = await get_db().idempotency_keys.find_one_and_update(
+            {"_id": key, "status": models.IdempotencyKey.PROCESSING, "locked_until": {"$lte": now}},
+            {"$set": {"locked_until": now + timedelta(seconds=lease_seconds)}},
+        )
+        return result is not None
+
+    async def complete(key, response, status_code, session=None):
+        result = await get_db().idempotency_keys.update_one(
+            {"_id": key, "status": models.IdempotencyKey.PROCESSING},
+            {"$set": {"status": models.IdempotencyKey.DONE, "response": response, "status_code": status_code}},
+            session=session,
+        )
+        return result.modified_count > 0
+
+    async def release(key):
+        await get_db().idempotency_keys.delete_one({"_id": key, "status": models.IdempotencyKey.PROCESSING})
+
+
+class ProfileInvalidation:
+    async def version(user_id):
+        invalidation = await get_db().profile_invalidations.find_one({"_id": user_id})
+        return invalidation["version"] if invalidation else 0
+
+
+class Notification:
+    async def save_many(notifications):
+        now = default_datetime()
+        result = await get_db().notifications.insert_many([notification.to_document(now) for notification in notifications])
+        return result.inserted_ids
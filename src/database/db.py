@@ -1,31 +1,77 @@
+import logging
+import os
+import threading
+
 from pymongo import MongoClient
-from pymongo.collection import Collection
+from database.monitoring import CommandTimer
+from settings import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def client_options():
+    return {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "event_listeners": [CommandTimer()],
+    }
 
 
 class MongoDBManager:
-    CONNECTIONS = {}
-    CONNECTION_COUNT = 0
-
-    def __init__(
-        self,
-        mongodb_uri: str,
-        db_name: str,
-        collection_name: str,
-        soft_delete: bool = True,
-        **kwargs,
-    ):
-        if mongodb_uri not in MongoDBManager.CONNECTIONS:
-            MongoDBManager.CONNECTIONS[mongodb_uri] = MongoClient(mongodb_uri, **kwargs)
-            MongoDBManager.CONNECTION_COUNT += 1
-        self.client = MongoDBManager.CONNECTIONS[mongodb_uri]
-        self._check_duplicated_db_name(db_name)
-        self.db = self.client.get_database(db_name)
-        self.collection: Collection = self.db.get_collection(collection_name)
-        self.soft_delete = soft_delete
-
-    def _check_duplicated_db_name(self, db_name):
-        dbs = {o.lower(): o for o in self.client.list_database_names()}
+    def __init__(self, mongodb_uri, **kwargs):
+        self.mongodb_uri = mongodb_uri
+        self.kwargs = kwargs
+        self._client = None
+        self._pid = None
+        self._checked = set()
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    self._client = MongoClient(self.mongodb_uri, connect=False, **client_options(), **self.kwargs)
+                    self._pid = os.getpid()
+                    self._checked = set()
+        return self._client
+
+    def get_database(self, db_name=None):
+        db_name = db_name or settings.MONGO_DATABASE_NAME
+        client = self.client
+        if db_name not in self._checked:
+            self._check_duplicated_db_name(client, db_name)
+            self._checked.add(db_name)
+        return client.get_database(db_name)
+
+    def _check_duplicated_db_name(self, client, db_name):
+        dbs = {o.lower(): o for o in client.list_database_names()}
         if db_name.lower() in dbs and dbs[db_name.lower()] != db_name:
             raise Exception(
                 f"""Current DB_NAME <{db_name}> duplicated with already existed DB_NAME: <{dbs[db_name.lower()]}>"""
-            )
\ No newline at end of file
+            )
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._pid = None
+
+
+class LazyDatabase:
+    def __init__(self, manager, db_name=None):
+        self.manager = manager
+        self.db_name = db_name
+
+    def __getattr__(self, name):
+        return getattr(self.manager.get_database(self.db_name), name)
+
+    def __getitem__(self, name):
+        return self.manager.get_database(self.db_name)[name]
+
+
+mongo = MongoDBManager(settings.MONGO_DATABASE_URI)
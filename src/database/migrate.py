@@ -0,0 +1,32 @@
+import argparse
+import logging
+
+from database.models import PixKey, create_indexes
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def migrate(dry_run=False):
+    duplicates = PixKey.find_duplicates()
+    for duplicate in duplicates:
+        logger.warning(f"Chave {duplicate['_id']['type']} {duplicate['_id']['key']} cadastrada {duplicate['count']} vezes; mantendo {duplicate['ids'][0]}")
+    if dry_run:
+        return 0
+    removed = PixKey.remove_duplicates(duplicates)
+    create_indexes()
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove chaves Pix duplicadas e cria os índices do banco")
+    parser.add_argument("--dry-run", action="store_true", help="apenas lista as chaves duplicadas, sem remover nem criar índices")
+    args = parser.parse_args()
+
+    removed = migrate(args.dry_run)
+    logger.info(f"{removed} chaves duplicadas removidas")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,11 +1,48 @@
+from datetime import datetime, time, timedelta
+from itertools import islice
+
 import pymongo
 
 from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from database.db import LazyDatabase, mongo
 from settings import settings
+from utils.exceptions import IdempotencyConflict
 from utils.index import default_datetime
 
-db_client = pymongo.MongoClient(settings.MONGO_DATABASE_URI)
-db = db_client.get_database(settings.MONGO_DATABASE_NAME)
+db = LazyDatabase(mongo)
+
+
+def create_indexes():
+    db.keys.create_index(
+        [("type", pymongo.ASCENDING), ("key", pymongo.ASCENDING)],
+        unique=True,
+        name="type_key_unique",
+    )
+    db.keys.create_index("key", name="key")
+    db.transactions.create_index(
+        [("user_id", pymongo.ASCENDING), ("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)],
+        name="user_created_at",
+    )
+    db.balances.create_index(
+        [("dirty", pymongo.ASCENDING), ("sync_lease_until", pymongo.ASCENDING)],
+        name="dirty_sync_lease",
+    )
+    db.balances.create_index("synced_at", name="synced_at")
+    db.idempotency_keys.create_index(
+        "created_at",
+        expireAfterSeconds=settings.IDEMPOTENCY_TTL,
+        name="created_at_ttl",
+    )
+    db.statement_rollups.create_index(
+        [("user_id", pymongo.ASCENDING), ("day", pymongo.ASCENDING), ("currency", pymongo.ASCENDING), ("type", pymongo.ASCENDING)],
+        unique=True,
+        name="user_day_currency_type_unique",
+    )
+    db.notifications.create_index(
+        [("status", pymongo.ASCENDING), ("next_attempt_at", pymongo.ASCENDING)],
+        name="status_next_attempt",
+    )
 
 class PixKey:
     def __init__(self, type, key, user_id):
@@ -13,16 +50,28 @@ class PixKey:
         self.key = key
         self.user_id = user_id
 
-    def save(self):
-        pix_key = {
+    def to_document(self, now):
+        return {
             "type": self.type,
             "key": self.key,
             "user_id": self.user_id,
-            "created_at": default_datetime(),
-            "updated_at": default_datetime(),
+            "created_at": now,
+            "updated_at": now,
         }
+
+    def save(self):
+        pix_key = self.to_document(default_datetime())
         result = db.keys.insert_one(pix_key)
         return result.inserted_id
+
+    def save_many(pix_keys):
+        now = default_datetime()
+        documents = [pix_key.to_document(now) for pix_key in pix_keys]
+        try:
+            db.keys.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            return documents, {error["index"]: error for error in e.details["writeErrors"]}
+        return documents, {}
     
     def find():
         result = db.keys.find({})
@@ -42,6 +91,25 @@ class PixKey:
         key = next(result, None)
         return key
 
+    def find_by_keys(keys):
+        result = db.keys.find({"key": {"$in": keys}})
+        return result
+
+    def find_duplicates():
+        result = db.keys.aggregate([
+            {"$sort": {"_id": pymongo.ASCENDING}},
+            {"$group": {"_id": {"type": "$type", "key": "$key"}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+        ], allowDiskUse=True)
+        return list(result)
+
+    def remove_duplicates(duplicates):
+        ids = [key_id for duplicate in duplicates for key_id in duplicate["ids"][1:]]
+        if not ids:
+            return 0
+        result = db.keys.delete_many({"_id": {"$in": ids}})
+        return result.deleted_count
+
 class Transaction:
     def __init__(self, user_id, sender ,receiver_key, currency, value, type):
         self.user_id = user_id
@@ -52,19 +120,42 @@ class Transaction:
         self.type = type
 
     def save(self):
-        transaction = {
+        transaction = self.to_document(default_datetime())
+        result = db.transactions.insert_one(transaction)
+        return result.inserted_id
+
+    def to_document(self, now):
+        return {
             "user_id": self.user_id,
             "sender": self.sender,
             "receiver_key": self.receiver_key,
             "currency": self.currency,
             "value": self.value,
             "type": self.type,
-            "created_at": default_datetime(),
-            "updated_at": default_datetime(),
+            "created_at": now,
+            "updated_at": now,
         }
-        result = db.transactions.insert_one(transaction)
-        return result.inserted_id
-    
+
+    def transfer_legs(sender_id, receiver_id, receiver_key, sender_name, sender_currency, receiver_currency, value_to_sender, value_to_receiver):
+        return [
+            Transaction(
+                user_id = sender_id,
+                receiver_key = receiver_key,
+                sender = sender_name,
+                currency = sender_currency,
+                value = value_to_sender,
+                type = "sended"
+            ),
+            Transaction(
+                user_id = receiver_id,
+                receiver_key = receiver_key,
+                sender = sender_name,
+                currency = receiver_currency,
+                value = value_to_receiver,
+                type = "received"
+            ),
+        ]
+
     def find():
         result = db.transactions.find({})
         return result
@@ -76,4 +167,336 @@ class Transaction:
     
     def find_by_user_id(user_id):
         result = db.transactions.find({"user_id": user_id})
-        return result
\ No newline at end of file
+        return result
+
+    PAGE_SORT = [("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]
+
+    def page_query(user_id, after=None):
+        query = {"user_id": user_id}
+        if after:
+            created_at, transaction_id = after
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": transaction_id}},
+            ]
+        return query
+
+    def find_page_by_user_id(user_id, limit, after=None):
+        query = Transaction.page_query(user_id, after)
+        result = db.transactions.find(query).sort(Transaction.PAGE_SORT).limit(limit)
+        return result
+
+    EXPORT_SORT = [("created_at", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)]
+
+    def export_query(user_id, start=None, end=None):
+        query = {"user_id": user_id}
+        created_at = {}
+        if start:
+            created_at["$gte"] = start
+        if end:
+            created_at["$lte"] = end
+        if created_at:
+            query["created_at"] = created_at
+        return query
+
+    def export_cursor(user_id, start=None, end=None, projection=None, batch_size=settings.EXPORT_BATCH_SIZE):
+        query = Transaction.export_query(user_id, start, end)
+        if projection:
+            projection = {field: 1 for field in projection}
+            projection.setdefault("_id", 0)
+        result = db.transactions.find(query, projection).sort(Transaction.EXPORT_SORT).batch_size(batch_size)
+        return result
+
+class StatementRollup:
+    def day(created_at):
+        return datetime(created_at.year, created_at.month, created_at.day)
+
+    def increments(documents):
+        totals = {}
+        for document in documents:
+            key = (document["user_id"], StatementRollup.day(document["created_at"]), document["currency"], document["type"])
+            total, count = totals.get(key, (0, 0))
+            totals[key] = (total + document["value"], count + 1)
+        return [
+            pymongo.UpdateOne(
+                {"user_id": user_id, "day": day, "currency": currency, "type": type},
+                {"$inc": {"total": total, "count": count}},
+                upsert=True,
+            )
+            for (user_id, day, currency, type), (total, count) in totals.items()
+        ]
+
+    def apply(documents, session=None):
+        db.statement_rollups.bulk_write(StatementRollup.increments(documents), ordered=False, session=session)
+
+    def range_query(user_id, start=None, end=None):
+        query = {"user_id": user_id}
+        day = {}
+        if start:
+            day["$gte"] = datetime.combine(start, time())
+        if end:
+            day["$lte"] = datetime.combine(end, time())
+        if day:
+            query["day"] = day
+        return query
+
+    def find_range(user_id, start=None, end=None):
+        result = db.statement_rollups.find(StatementRollup.range_query(user_id, start, end)).sort("day", pymongo.ASCENDING)
+        return result
+
+    def pipeline(user_id=None):
+        day = {
+            "$dateFromParts": {
+                "year": {"$year": "$created_at"},
+                "month": {"$month": "$created_at"},
+                "day": {"$dayOfMonth": "$created_at"},
+            }
+        }
+        return [
+            {"$match": {"user_id": user_id} if user_id else {}},
+            {
+                "$group": {
+                    "_id": {"user_id": "$user_id", "day": day, "currency": "$currency", "type": "$type"},
+                    "total": {"$sum": "$value"},
+                    "count": {"$sum": 1},
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "user_id": "$_id.user_id",
+                    "day": "$_id.day",
+                    "currency": "$_id.currency",
+                    "type": "$_id.type",
+                    "total": 1,
+                    "count": 1,
+                }
+            },
+        ]
+
+    def rebuild(user_id=None, batch_size=settings.STATEMENT_REBUILD_BATCH_SIZE):
+        def apply(session):
+            rollups = db.transactions.aggregate(StatementRollup.pipeline(user_id), allowDiskUse=True, session=session)
+            db.statement_rollups.delete_many({"user_id": user_id} if user_id else {}, session=session)
+            count = 0
+            batch = list(islice(rollups, batch_size))
+            while batch:
+                db.statement_rollups.insert_many(batch, session=session)
+                count += len(batch)
+                batch = list(islice(rollups, batch_size))
+            return count
+
+        with mongo.client.start_session() as session:
+            return session.with_transaction(apply)
+
+class Balance:
+    def to_document(user_id, balance, currency, now):
+        return {
+            "_id": user_id,
+            "balance": balance,
+            "synced_balance": balance,
+            "currency": currency,
+            "version": 0,
+            "synced_version": 0,
+            "dirty": False,
+            "sync_lease_until": now,
+            "synced_at": now,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    def debit_filter(user_id, value):
+        return {"_id": user_id, "balance": {"$gte": value}}
+
+    def change(value, now):
+        return {"$inc": {"balance": value, "version": 1}, "$set": {"dirty": True, "updated_at": now}}
+
+    def find_many(user_ids):
+        result = db.balances.find({"_id": {"$in": list(user_ids)}})
+        return {balance["_id"]: balance for balance in result}
+
+    def seed(user_id, balance, currency):
+        try:
+            db.balances.insert_one(Balance.to_document(user_id, balance, currency, default_datetime()))
+        except DuplicateKeyError:
+            pass
+        return db.balances.find_one({"_id": user_id})
+
+    def transfer(sender_id, debit, credits, transactions, idempotency_key=None, response=None):
+        now = default_datetime()
+        documents = [transaction.to_document(now) for transaction in transactions]
+
+        def apply(session):
+            result = db.balances.update_one(Balance.debit_filter(sender_id, debit), Balance.change(-debit, now), session=session)
+            if not result.modified_count:
+                return None
+            for user_id, credit in credits.items():
+                db.balances.update_one({"_id": user_id}, Balance.change(credit, now), session=session)
+            db.transactions.insert_many(documents, session=session)
+            StatementRollup.apply(documents, session=session)
+            if idempotency_key and not IdempotencyKey.complete(idempotency_key, response(documents), 200, session=session):
+                raise IdempotencyConflict("Requisição com a mesma chave de idempotência já concluída")
+            return documents
+
+        with mongo.client.start_session() as session:
+            return session.with_transaction(apply)
+
+    def claim_sync(lease_seconds, reconcile_seconds):
+        now = default_datetime()
+        stale = now - timedelta(seconds=reconcile_seconds)
+        result = db.balances.find_one_and_update(
+            {
+                "sync_lease_until": {"$lte": now},
+                "$or": [{"dirty": True}, {"synced_at": {"$lte": stale}}, {"synced_at": {"$exists": False}}],
+            },
+            {"$set": {"sync_lease_until": now + timedelta(seconds=lease_seconds)}},
+            sort=[("sync_lease_until", pymongo.ASCENDING)],
+            return_document=pymongo.ReturnDocument.AFTER,
+        )
+        return result
+
+    def begin_sync(user_id, target, pushed, pulled, operation):
+        db.balances.update_one(
+            {"_id": user_id},
+            {"$set": {"sync_intent": {"target": target, "pushed": pushed, "pulled": pulled, "operation": operation}}},
+        )
+
+    def mark_synced(user_id, version, pushed, pulled):
+        now = default_datetime()
+        change = {"$inc": {"balance": pulled, "synced_balance": pushed + pulled}, "$unset": {"sync_intent": ""}}
+        if version is not None:
+            result = db.balances.update_one(
+                {"_id": user_id, "version": version},
+                {**change, "$set": {"dirty": False, "synced_version": version, "sync_lease_until": now, "synced_at": now}},
+            )
+            if result.matched_count:
+                return
+        db.balances.update_one({"_id": user_id}, {**change, "$set": {"sync_lease_until": now, "synced_at": now}})
+
+    def mark_failed(user_id, retry_in):
+        retry_at = default_datetime() + timedelta(seconds=retry_in)
+        db.balances.update_one({"_id": user_id}, {"$set": {"sync_lease_until": retry_at}})
+
+class IdempotencyKey:
+    PROCESSING = "processing"
+    DONE = "done"
+
+    def to_document(key, fingerprint, lease_seconds, now):
+        return {
+            "_id": key,
+            "status": IdempotencyKey.PROCESSING,
+            "fingerprint": fingerprint,
+            "locked_until": now + timedelta(seconds=lease_seconds),
+            "created_at": now,
+        }
+
+    def acquire(key, fingerprint, lease_seconds):
+        try:
+            db.idempotency_keys.insert_one(IdempotencyKey.to_document(key, fingerprint, lease_seconds, default_datetime()))
+        except DuplicateKeyError:
+            return False
+        return True
+
+    def find(key):
+        return db.idempotency_keys.find_one({"_id": key})
+
+    def take_over(key, lease_seconds):
+        now = default_datetime()
+        result = db.idempotency_keys.find_one_and_update(
+            {"_id": key, "status": IdempotencyKey.PROCESSING, "locked_until": {"$lte": now}},
+            {"$set": {"locked_until": now + timedelta(seconds=lease_seconds)}},
+        )
+        return result is not None
+
+    def complete(key, response, status_code, session=None):
+        result = db.idempotency_keys.update_one(
+            {"_id": key, "status": IdempotencyKey.PROCESSING},
+            {"$set": {"status": IdempotencyKey.DONE, "response": response, "status_code": status_code}},
+            session=session,
+        )
+        return result.modified_count > 0
+
+    def release(key):
+        db.idempotency_keys.delete_one({"_id": key, "status": IdempotencyKey.PROCESSING})
+
+class ProfileInvalidation:
+    def version(user_id):
+        invalidation = db.profile_invalidations.find_one({"_id": user_id})
+        return invalidation["version"] if invalidation else 0
+
+    def bump(user_id):
+        db.profile_invalidations.update_one(
+            {"_id": user_id},
+            {"$inc": {"version": 1}, "$set": {"updated_at": default_datetime()}},
+            upsert=True,
+        )
+
+class Notification:
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    DEAD = "dead"
+
+    def __init__(self, number, message):
+        self.number = number
+        self.message = message
+
+    def to_document(self, now):
+        return {
+            "number": self.number,
+            "message": self.message,
+            "status": Notification.PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    def save_many(notifications):
+        now = default_datetime()
+        result = db.notifications.insert_many([notification.to_document(now) for notification in notifications])
+        return result.inserted_ids
+
+    def claim(lease_seconds):
+        now = default_datetime()
+        result = db.notifications.find_one_and_update(
+            {
+                "$or": [
+                    {"status": Notification.PENDING, "next_attempt_at": {"$lte": now}},
+                    {"status": Notification.SENDING, "locked_until": {"$lte": now}},
+                ]
+            },
+            {
+                "$set": {
+                    "status": Notification.SENDING,
+                    "locked_until": now + timedelta(seconds=lease_seconds),
+                    "updated_at": now,
+                }
+            },
+            sort=[("next_attempt_at", pymongo.ASCENDING)],
+            return_document=pymongo.ReturnDocument.AFTER,
+        )
+        return result
+
+    def mark_sent(notification_id, sid):
+        db.notifications.update_one(
+            {"_id": notification_id},
+            {"$set": {"status": Notification.SENT, "sid": sid, "updated_at": default_datetime()}, "$unset": {"locked_until": ""}},
+        )
+
+    def mark_failed(notification_id, error, retry_in=None):
+        now = default_datetime()
+        update = {"last_error": error, "updated_at": now}
+        if retry_in is None:
+            update["status"] = Notification.DEAD
+        else:
+            update["status"] = Notification.PENDING
+            update["next_attempt_at"] = now + timedelta(seconds=retry_in)
+        db.notifications.update_one(
+            {"_id": notification_id},
+            {"$set": update, "$inc": {"attempts": 1}, "$unset": {"locked_until": ""}},
+        )
+
+    def find_by_status(status):
+        result = db.notifications.find({"status": status})
+        return result
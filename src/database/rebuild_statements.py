@@ -0,0 +1,22 @@
+import argparse
+import logging
+
+from database.models import StatementRollup, create_indexes
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcula os totais diários do extrato a partir da coleção transactions")
+    parser.add_argument("--user-id", help="recalcula apenas os totais deste usuário")
+    args = parser.parse_args()
+
+    create_indexes()
+    count = StatementRollup.rebuild(args.user_id)
+    logger.info(f"{count} totais diários recalculados")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,24 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from settings import settings
+
+bind = f"0.0.0.0:{settings.PORT}"
+worker_class = "gthread"
+workers = settings.WEB_WORKERS
+threads = settings.WEB_THREADS
+backlog = settings.WEB_BACKLOG
+keepalive = settings.WEB_KEEPALIVE
+timeout = settings.WEB_TIMEOUT
+graceful_timeout = settings.WEB_GRACEFUL_TIMEOUT
+max_requests = settings.WEB_MAX_REQUESTS
+max_requests_jitter = settings.WEB_MAX_REQUESTS_JITTER
+limit_request_line = settings.WEB_LIMIT_REQUEST_LINE
+limit_request_fields = settings.WEB_LIMIT_REQUEST_FIELDS
+limit_request_field_size = settings.WEB_LIMIT_REQUEST_FIELD_SIZE
+
+# Cada worker importa a aplicação depois do fork, então clientes do MongoDB,
+# pools HTTP e threads são criados no próprio processo e nunca compartilhados.
+preload_app = False
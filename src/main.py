@@ -1,18 +1,22 @@
 from flask import Flask
 from flask_cors import CORS
 from views.api import bp as views_bp
+from views.metrics import bp as metrics_bp
 from settings import settings
+from utils.json_provider import OrjsonProvider
 
 def create_app():
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
     
     CORS(app, resources={r"/*": {"origins": "*"}})
 
     app.config.from_object(settings)
     app.register_blueprint(views_bp)
+    app.register_blueprint(metrics_bp)
 
     return app
 
 if __name__ == '__main__':
     app = create_app()
-    app.run(host='0.0.0.0', port=5010)
+    app.run(host='0.0.0.0', port=settings.PORT)
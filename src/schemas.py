@@ -1,4 +1,60 @@
-from marshmallow import Schema, fields, validate
+import math
+
+from marshmallow import Schema, ValidationError, fields, missing, post_load, validate, validates, validates_schema
+from settings import settings
+
+
+def fast_string(value):
+    return value if type(value) is str else missing
+
+def fast_float(value):
+    if type(value) not in (int, float):
+        return missing
+    try:
+        value = float(value)
+    except OverflowError:
+        return missing
+    return value if math.isfinite(value) else missing
+
+FAST_CONVERTERS = {fields.String: fast_string, fields.Float: fast_float}
+
+def compile_loader(schema):
+    converters = {}
+    for name, field in schema.fields.items():
+        converter = FAST_CONVERTERS.get(type(field))
+        if converter is None or not field.required or field.validators or field.data_key:
+            return None
+        converters[name] = converter
+    if any(schema._hooks.values()):
+        return None
+
+    def load(data):
+        if type(data) is not dict or data.keys() != converters.keys():
+            return missing
+        result = {}
+        for name, converter in converters.items():
+            value = converter(data[name])
+            if value is missing:
+                return missing
+            result[name] = value
+        return result
+
+    return load
+
+def validate_date_range(data):
+    if data.get("start") and data.get("end") and data["start"] > data["end"]:
+        raise ValidationError("A data inicial deve ser anterior à data final", "from")
+
+class CompiledNested(fields.Nested):
+    def _deserialize(self, value, attr, data, partial=None, **kwargs):
+        if not hasattr(self, "loader"):
+            self.loader = None if self.many or self.only or self.exclude else compile_loader(self.schema)
+        if self.loader:
+            result = self.loader(value)
+            if result is not missing:
+                return result
+        return super()._deserialize(value, attr, data, partial=partial, **kwargs)
+
 
 
 class PixKeySchema(Schema):
@@ -6,13 +62,101 @@ class PixKeySchema(Schema):
     key = fields.Str(required=False)
     user_id = fields.Str(required=True, error_messages={"required": "O usuário é obrigatório"})
 
+class BulkPixKeySchema(Schema):
+    keys = fields.List(
+        fields.Nested(PixKeySchema),
+        required=True,
+        validate=validate.Length(min=1, max=settings.BATCH_MAX_SIZE),
+        error_messages={"required": "As chaves são obrigatórias"}
+    )
+
+class ResolveKeysSchema(Schema):
+    keys = fields.List(
+        fields.Str(),
+        required=True,
+        validate=validate.Length(min=1, max=settings.BATCH_MAX_SIZE),
+        error_messages={"required": "As chaves são obrigatórias"}
+    )
+
 class TransactionSchema(Schema):
     sender_id = fields.Str(required=True, error_messages={"required": "O usuário é obrigatório"})
     receiver_key = fields.Str(required=True, error_messages={"required": "O receptor é obrigatório"})
     currency = fields.Str(required=True, error_messages={"required": "A moeda desejada é obrigatória"})
     value = fields.Float(required=True, error_messages={"required": "O valor a ser transferido é obrigatório"})
 
+class BatchTransactionSchema(Schema):
+    transferences = fields.List(
+        CompiledNested(TransactionSchema),
+        required=True,
+        validate=validate.Length(min=1, max=settings.BATCH_MAX_SIZE),
+        error_messages={"required": "As transferências são obrigatórias"}
+    )
+
+    @validates_schema
+    def validate_single_sender(self, data, **kwargs):
+        senders = {transference["sender_id"] for transference in data["transferences"]}
+        if len(senders) > 1:
+            raise ValidationError("Todas as transferências devem ter o mesmo remetente", "transferences")
+
 class ConvertBalanceSchema(Schema):
     currency = fields.Str(required=True, error_messages={"required": "A moeda é obrigatória"})
     wanted_currency = fields.Str(required=True, error_messages={"required": "A moeda para conversão é obrigatória"})
-    value = fields.Float(required=True, error_messages={"required": "O valor a ser convertido é obrigatório"})
\ No newline at end of file
+    value = fields.Float(required=True, error_messages={"required": "O valor a ser convertido é obrigatório"})
+
+class ConvertBalanceBatchSchema(Schema):
+    conversions = fields.List(
+        CompiledNested(ConvertBalanceSchema),
+        required=True,
+        validate=validate.Length(min=1, max=settings.BATCH_MAX_SIZE),
+        error_messages={"required": "As conversões são obrigatórias"}
+    )
+
+class PaginationSchema(Schema):
+    limit = fields.Int(load_default=settings.PAGE_SIZE, validate=validate.Range(min=1, max=settings.MAX_PAGE_SIZE))
+    cursor = fields.Str(load_default=None)
+
+EXPORT_FIELDS = ["_id", "user_id", "sender", "receiver_key", "currency", "value", "type", "created_at", "updated_at"]
+
+class ExportSchema(Schema):
+    start = fields.DateTime(data_key="from", load_default=None)
+    end = fields.DateTime(data_key="to", load_default=None)
+    projection = fields.Str(data_key="fields", load_default=None)
+
+    @validates("projection")
+    def validate_projection(self, value, **kwargs):
+        if value is None:
+            return
+        invalid = sorted(set(value.split(",")) - set(EXPORT_FIELDS))
+        if invalid:
+            raise ValidationError(f"Campos inválidos para exportação: {', '.join(invalid)}")
+
+    @validates_schema
+    def validate_range(self, data, **kwargs):
+        validate_date_range(data)
+
+    @post_load
+    def split_projection(self, data, **kwargs):
+        if data["projection"]:
+            data["projection"] = data["projection"].split(",")
+        return data
+
+
+class StatementSchema(Schema):
+    start = fields.Date(data_key="from", load_default=None)
+    end = fields.Date(data_key="to", load_default=None)
+
+    @validates_schema
+    def validate_range(self, data, **kwargs):
+        validate_date_range(data)
+
+
+pix_key_schema = PixKeySchema()
+bulk_pix_key_schema = BulkPixKeySchema()
+resolve_keys_schema = ResolveKeysSchema()
+transaction_schema = TransactionSchema()
+batch_transaction_schema = BatchTransactionSchema()
+convert_balance_schema = ConvertBalanceSchema()
+convert_balance_batch_schema = ConvertBalanceBatchSchema()
+pagination_schema = PaginationSchema()
+export_schema = ExportSchema()
+statement_schema = StatementSchema()
@@ -1,3 +1,4 @@
+import multiprocessing
 import os
 
 class Settings:
@@ -5,9 +6,74 @@ class Settings:
         self.ENVIROMENT = os.getenv("ENVIROMENT", "dev")
         self.MONGO_DATABASE_URI = os.getenv("MONGO_DATABASE_URI", "mongodb://localhost:27017")
         self.MONGO_DATABASE_NAME = os.getenv("MONGO_DATABASE_NAME", "transference-dev")
+        self.MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+        self.MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+        self.MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 2000))
+        self.MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
         self.USER_API = os.getenv("USER_API", "http://0.0.0.0:5000")
         self.GEOLOC_API = os.getenv("GEOLOC_API", "http://0.0.0.0:5000")
         self.ACCOUNT_SID = os.getenv("ACCOUNT_SID", "123")
         self.AUTH_TOKEN = os.getenv("AUTH_TOKEN", "123")
+        self.PORT = int(os.getenv("PORT", 5010))
+        self.MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", 2 * 1024 * 1024))
+        self.WEB_WORKERS = int(os.getenv("WEB_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+        self.WEB_THREADS = int(os.getenv("WEB_THREADS", 4))
+        self.WEB_BACKLOG = int(os.getenv("WEB_BACKLOG", 2048))
+        self.WEB_KEEPALIVE = int(os.getenv("WEB_KEEPALIVE", 5))
+        self.WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", 30))
+        self.WEB_GRACEFUL_TIMEOUT = int(os.getenv("WEB_GRACEFUL_TIMEOUT", 30))
+        self.WEB_MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", 10000))
+        self.WEB_MAX_REQUESTS_JITTER = int(os.getenv("WEB_MAX_REQUESTS_JITTER", 1000))
+        self.WEB_LIMIT_REQUEST_LINE = int(os.getenv("WEB_LIMIT_REQUEST_LINE", 4094))
+        self.WEB_LIMIT_REQUEST_FIELDS = int(os.getenv("WEB_LIMIT_REQUEST_FIELDS", 100))
+        self.WEB_LIMIT_REQUEST_FIELD_SIZE = int(os.getenv("WEB_LIMIT_REQUEST_FIELD_SIZE", 8190))
+        self.PAGE_SIZE = int(os.getenv("PAGE_SIZE", 50))
+        self.MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 500))
+        self.EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+        self.STATEMENT_REBUILD_BATCH_SIZE = int(os.getenv("STATEMENT_REBUILD_BATCH_SIZE", 1000))
+        self.BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", 5000))
+        self.SMS_TRANSPORT = os.getenv("SMS_TRANSPORT", "twilio")
+        self.OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 50))
+        self.OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", 8))
+        self.OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 5))
+        self.OUTBOX_RETRY_BACKOFF = float(os.getenv("OUTBOX_RETRY_BACKOFF", 2.0))
+        self.OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", 60))
+        self.OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", 1.0))
+        self.BALANCE_SYNC_BATCH_SIZE = int(os.getenv("BALANCE_SYNC_BATCH_SIZE", 50))
+        self.BALANCE_SYNC_CONCURRENCY = int(os.getenv("BALANCE_SYNC_CONCURRENCY", 8))
+        self.BALANCE_SYNC_RETRY_BACKOFF = float(os.getenv("BALANCE_SYNC_RETRY_BACKOFF", 2.0))
+        self.BALANCE_SYNC_LEASE_SECONDS = int(os.getenv("BALANCE_SYNC_LEASE_SECONDS", 60))
+        self.BALANCE_SYNC_POLL_INTERVAL = float(os.getenv("BALANCE_SYNC_POLL_INTERVAL", 1.0))
+        self.BALANCE_SYNC_RECONCILE_SECONDS = int(os.getenv("BALANCE_SYNC_RECONCILE_SECONDS", 60))
+        self.WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", 0))
+        self.UPSTREAM_MAX_WORKERS = int(os.getenv("UPSTREAM_MAX_WORKERS", 16))
+        self.RATE_CACHE_TTL = float(os.getenv("RATE_CACHE_TTL", 60))
+        self.RATE_CACHE_STALE_TTL = float(os.getenv("RATE_CACHE_STALE_TTL", 300))
+        self.KEY_CACHE_TTL = float(os.getenv("KEY_CACHE_TTL", 300))
+        self.KEY_CACHE_NEGATIVE_TTL = float(os.getenv("KEY_CACHE_NEGATIVE_TTL", 5))
+        self.KEY_CACHE_MAXSIZE = int(os.getenv("KEY_CACHE_MAXSIZE", 10000))
+        self.PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", 60))
+        self.PROFILE_CACHE_MAXSIZE = int(os.getenv("PROFILE_CACHE_MAXSIZE", 10000))
+        self.TAX_CACHE_PRECISION = int(os.getenv("TAX_CACHE_PRECISION", 3))
+        self.TAX_CACHE_TTL = float(os.getenv("TAX_CACHE_TTL", 300))
+        self.TAX_CACHE_MAXSIZE = int(os.getenv("TAX_CACHE_MAXSIZE", 10000))
+        self.TAX_CACHE_TRACKED_PRECISIONS = [int(precision) for precision in os.getenv("TAX_CACHE_TRACKED_PRECISIONS", "1,2,3,4,5").split(",")]
+        self.IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", 86400))
+        self.IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", 120))
+        self.IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", 10))
+        self.IDEMPOTENCY_POLL_INTERVAL = float(os.getenv("IDEMPOTENCY_POLL_INTERVAL", 0.05))
+        self.HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 4))
+        self.HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 16))
+        self.HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 1.0))
+        self.HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 5.0))
+        self.HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 2))
+        self.HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", 0.1))
+        self.BREAKER_WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", 30))
+        self.BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", 20))
+        self.BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", 0.5))
+        self.BREAKER_SLOW_CALL_SECONDS = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", 2.0))
+        self.BREAKER_SLOW_CALL_RATE = float(os.getenv("BREAKER_SLOW_CALL_RATE", 0.5))
+        self.BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", 10))
+        self.BREAKER_HALF_OPEN_CALLS = int(os.getenv("BREAKER_HALF_OPEN_CALLS", 3))
 
 settings = Settings()
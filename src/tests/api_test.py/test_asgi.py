@@ -0,0 +1,146 @@
+import asyncio
+from copy import deepcopy
+from datetime import datetime, timedelta
+
+from database.models import Balance, Notification, Transaction, db
+from tests.conftest import users_by_id
+from tests.payloads import payload_create_key, payload_transaction, response_transaction
+from utils.metrics import http_requests
+
+CONTROLLER = "controllers.async_transference_controller.AsyncTransferenceController"
+
+USERS = [
+    {
+        "_id": "665e0069183ce834954a2f44",
+        "name": "Teste2",
+        "cpf": "785.188.920-07",
+        "institution": "001",
+        "agency": "0001",
+        "account": "000",
+        "cellphone": "11999888156"
+    },
+    {
+        "_id": "665dff9c183ce834954a2f42",
+        "name": "Teste1",
+        "cpf": "284.438.920-13",
+        "institution": "001",
+        "agency": "0001",
+        "account": "000",
+        "cellphone": "11999888155"
+    }
+]
+
+
+def test_asgi_health(asgi_client):
+    """Testa o health check servido pela aplicação ASGI."""
+    response = asgi_client.get("/health")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok", "message": "Service is healthy"}
+
+
+def test_asgi_create_and_get_keys(asgi_client):
+    """Testa a criação e a consulta de chaves pela aplicação ASGI."""
+    response = asgi_client.post("/create_key", json=payload_create_key)
+    assert response.status_code == 200
+    assert response.json()["status"] == "success"
+
+    response = asgi_client.post("/create_key", json=payload_create_key)
+    assert response.status_code == 409
+    assert response.json()["message"] == "Chave já está em uso"
+
+    response = asgi_client.get(f"/my_keys/{payload_create_key['user_id']}")
+    assert response.status_code == 200
+    assert response.json()["result"][0]["key"] == payload_create_key["key"]
+
+    response = asgi_client.get("/user_keys/99999999")
+    assert response.status_code == 404
+    assert response.json()["message"] == "Usuário não encontrado para chave 99999999"
+
+
+def test_asgi_create_transference(asgi_client, mocker):
+    """Testa a transferencia pela aplicação ASGI com as consultas externas em paralelo."""
+    asgi_client.post("/create_key", json=payload_create_key)
+    barrier = asyncio.Barrier(4)
+    profiles = users_by_id(USERS)
+
+    async def get_user_balance(user_id):
+        await asyncio.wait_for(barrier.wait(), 5)
+        return {"balance": 100.0, "currency": "BRL"}
+
+    async def get_user_by_id(user_id):
+        await asyncio.wait_for(barrier.wait(), 5)
+        return profiles(user_id)
+
+    mocker.patch(f"{CONTROLLER}.get_user_balance", side_effect=get_user_balance)
+    mocker.patch(f"{CONTROLLER}.get_user_by_id", side_effect=get_user_by_id)
+
+    response = asgi_client.post("/transference", json=payload_transaction)
+
+    data = response.json()
+    expected_response = deepcopy(response_transaction)
+    expected_response["_id"] = data["_id"]
+    expected_response["date"] = data["date"]
+    assert response.status_code == 200
+    assert data == expected_response
+    assert Transaction.find_by_id(data["_id"])["value"] == payload_transaction["value"]
+    assert Balance.find_many([USERS[1]["_id"]])[USERS[1]["_id"]]["balance"] == 85.0
+    assert len(list(Notification.find_by_status(Notification.PENDING))) == 2
+
+
+def test_asgi_insuficient_balance(asgi_client, mocker):
+    """Testa a transferencia pela aplicação ASGI sem saldo suficiente."""
+    asgi_client.post("/create_key", json=payload_create_key)
+    mocker.patch(f"{CONTROLLER}.get_user_balance", return_value={"balance": 5.0, "currency": "BRL"})
+    mocker.patch(f"{CONTROLLER}.get_user_by_id", side_effect=users_by_id(USERS))
+
+    response = asgi_client.post("/transference", json=payload_transaction)
+
+    assert response.status_code == 400
+    assert response.json() == {"status": 400, "message": "Usuário não possui saldo suficiente"}
+
+
+def test_asgi_transaction_pagination(asgi_client):
+    """Testa a paginação por cursor das transferencias pela aplicação ASGI."""
+    sender_id = payload_transaction["sender_id"]
+    base = datetime(2024, 1, 1)
+    db.transactions.insert_many([
+        {"user_id": sender_id, "value": float(i), "created_at": base + timedelta(minutes=i)}
+        for i in range(3)
+    ])
+
+    response = asgi_client.get(f"/my_transferences/{sender_id}?limit=2")
+    assert response.status_code == 200
+    assert [transaction["value"] for transaction in response.json()["result"]] == [2.0, 1.0]
+
+    response = asgi_client.get(f"/my_transferences/{sender_id}?limit=2&cursor={response.json()['next_cursor']}")
+    assert [transaction["value"] for transaction in response.json()["result"]] == [0.0]
+    assert response.json()["next_cursor"] is None
+
+    response = asgi_client.get(f"/my_transferences/{sender_id}?cursor=invalido")
+    assert response.status_code == 422
+
+
+def test_asgi_payload_too_large(asgi_client, app):
+    """Testa o limite de tamanho do corpo na aplicação ASGI."""
+    app.config["MAX_CONTENT_LENGTH"] = 64
+    oversized_payload = deepcopy(payload_create_key)
+    oversized_payload["key"] = "1" * 128
+
+    response = asgi_client.post("/create_key", json=oversized_payload)
+
+    assert response.status_code == 413
+    assert response.json() == {"status": 413, "message": "Requisição excede o tamanho máximo permitido"}
+
+
+def test_asgi_metrics_and_fallback(asgi_client):
+    """Testa que as rotas ASGI registram métricas e que o restante cai na aplicação Flask."""
+    before = http_requests.value("GET", "/key/<key_id>", 404)
+
+    asgi_client.get("/key/664e9b2da3835b65a119b35d")
+    response = asgi_client.get("/metrics")
+
+    assert http_requests.value("GET", "/key/<key_id>", 404) == before + 1
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert asgi_client.get("/cache_stats").json()["conversion_rates"]["size"] >= 0
@@ -0,0 +1,68 @@
+from database.models import PixKey
+from tests.conftest import spy_model
+from tests.payloads import payload_create_key
+
+USER_ID = "665e0069183ce834954a2f44"
+
+
+def test_bulk_create_keys(client):
+    """Testa a criação de chaves em lote com chaves aleatórias e conflitos por item."""
+    client.post("/create_key", json=payload_create_key)
+    keys = [{"type": "aleatoria", "user_id": USER_ID}] * 3 + [
+        payload_create_key,
+        {"type": "email", "key": "loja@swiftpix.com", "user_id": USER_ID},
+        {"type": "email", "key": "loja@swiftpix.com", "user_id": USER_ID},
+    ]
+
+    response = client.post("/keys/bulk", json={"keys": keys})
+    results = response.json["result"]
+
+    assert response.status_code == 200
+    assert [result["status"] for result in results] == [200, 200, 200, 409, 200, 409]
+    assert len({result["key"] for result in results[:3]}) == 3
+    assert results[3]["message"] == "Chave já está em uso"
+    assert len(list(PixKey.find_by_user_id(USER_ID))) == 5
+
+
+def test_bulk_create_keys_invalid(client):
+    """Testa a criação de chaves em lote com payload inválido."""
+    response = client.post("/keys/bulk", json={"keys": [{"type": "pix", "user_id": USER_ID}]})
+    assert response.status_code == 422
+
+    response = client.post("/keys/bulk", json={})
+    assert response.status_code == 422
+    assert "As chaves são obrigatórias" in response.json["message"]
+
+
+def test_resolve_keys(client, mocker):
+    """Testa a resolução de várias chaves com uma única consulta e o cache de chaves."""
+    client.post("/create_key", json=payload_create_key)
+    client.post("/create_key", json={"type": "email", "key": "loja@swiftpix.com", "user_id": USER_ID})
+    find_by_keys = spy_model(mocker, "PixKey", "find_by_keys")
+    keys = [payload_create_key["key"], "99999999", "loja@swiftpix.com", payload_create_key["key"]]
+
+    response = client.post("/user_keys/resolve", json={"keys": keys})
+    results = response.json["result"]
+
+    assert response.status_code == 200
+    assert [result["status"] for result in results] == [200, 404, 200, 200]
+    assert results[0]["user_id"] == USER_ID
+    assert results[1]["message"] == "Usuário não encontrado para chave 99999999"
+    find_by_keys.assert_called_once_with([payload_create_key["key"], "99999999", "loja@swiftpix.com"])
+
+    response = client.post("/user_keys/resolve", json={"keys": keys})
+
+    assert response.json["result"] == results
+    find_by_keys.assert_called_once()
+
+    assert client.get("/user_keys/resolve").status_code == 404
+
+
+def test_asgi_resolve_keys(asgi_client):
+    """Testa a resolução de chaves em lote pela aplicação ASGI."""
+    asgi_client.post("/create_key", json=payload_create_key)
+
+    response = asgi_client.post("/user_keys/resolve", json={"keys": [payload_create_key["key"], "99999999"]})
+
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()["result"]] == [200, 404]
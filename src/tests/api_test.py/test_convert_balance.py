@@ -0,0 +1,90 @@
+import pytest
+
+from utils.exceptions import ConversionNotFound, GeoLocServiceError
+from tests.conftest import patch_controller
+
+RATES = {("BRL", "USD"): 0.2, ("USD", "BRL"): 5.0}
+
+
+@pytest.fixture
+def mock_get_conversion_rate(mocker):
+    return patch_controller(
+        mocker, "get_conversion_rate", side_effect=lambda sender_currency, receiver_currency: RATES[(sender_currency, receiver_currency)]
+    )
+
+
+def test_convert_balance(client, mock_get_conversion_rate):
+    """Testa a conversão de um valor pela matriz de taxas, buscada uma vez por par de moedas."""
+    response = client.post("/convert_balance", json={"currency": "BRL", "wanted_currency": "USD", "value": 50.0})
+
+    assert response.status_code == 200
+    assert response.json == {"result": 10.0}
+
+    response = client.post("/convert_balance", json={"currency": "dolar americano", "wanted_currency": "real", "value": 3.0})
+    assert response.json == {"result": 15.0}
+
+    response = client.post("/convert_balance", json={"currency": "BRL", "wanted_currency": "BRL", "value": 7.5})
+    assert response.json == {"result": 7.5}
+
+    assert mock_get_conversion_rate.call_count == 2
+
+
+def test_convert_balance_not_found(client, mock_get_conversion_rate):
+    """Testa a conversão para uma moeda desconhecida e com payload inválido."""
+    response = client.post("/convert_balance", json={"currency": "BRL", "wanted_currency": "EUR", "value": 50.0})
+
+    assert response.status_code == 404
+    assert response.json == {"status": 404, "message": "Conversão não encontrada"}
+
+    response = client.post("/convert_balance", json={"currency": "BRL", "value": 50.0})
+    assert response.status_code == 422
+
+
+def test_convert_balance_unavailable_rate(client, mocker):
+    """Testa que um par sem taxa disponível é reportado como conversão não encontrada."""
+    patch_controller(
+        mocker, "get_conversion_rate", side_effect=ConversionNotFound("Conversão não encontrada")
+    )
+
+    response = client.post("/convert_balance", json={"currency": "BRL", "wanted_currency": "USD", "value": 50.0})
+
+    assert response.status_code == 404
+
+
+def test_convert_balance_recovers_after_upstream_error(client, mocker):
+    """Testa que uma matriz com taxa indisponível não fica em cache depois que o serviço volta."""
+    get_conversion_rate = patch_controller(
+        mocker, "get_conversion_rate", side_effect=GeoLocServiceError("Serviço de geolocalização indisponível")
+    )
+
+    response = client.post("/convert_balance", json={"currency": "BRL", "wanted_currency": "USD", "value": 50.0})
+    assert response.status_code == 404
+
+    get_conversion_rate.side_effect = lambda sender_currency, receiver_currency: RATES[(sender_currency, receiver_currency)]
+    response = client.post("/convert_balance", json={"currency": "BRL", "wanted_currency": "USD", "value": 50.0})
+
+    assert response.status_code == 200
+    assert response.json == {"result": 10.0}
+
+
+def test_convert_balance_batch(client, mock_get_conversion_rate):
+    """Testa a conversão em lote com moedas misturadas e resultado por item."""
+    conversions = [
+        {"currency": "BRL", "wanted_currency": "USD", "value": 10.0},
+        {"currency": "USD", "wanted_currency": "BRL", "value": 2.0},
+        {"currency": "EUR", "wanted_currency": "BRL", "value": 1.0},
+        {"currency": "USD", "wanted_currency": "USD", "value": 4.0},
+    ]
+
+    response = client.post("/convert_balance/batch", json={"conversions": conversions})
+
+    assert response.status_code == 200
+    assert response.json["result"] == [
+        {"status": 200, "result": 2.0},
+        {"status": 200, "result": 10.0},
+        {"status": 404, "message": "Conversão não encontrada"},
+        {"status": 200, "result": 4.0},
+    ]
+
+    response = client.post("/convert_balance/batch", json={"conversions": []})
+    assert response.status_code == 422
@@ -0,0 +1,162 @@
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+import threading
+import time
+
+import pytest
+
+from controllers.transference_controller import TransferenceController
+from database.models import IdempotencyKey, Transaction
+from schemas import TransactionSchema
+from settings import settings
+from tests.conftest import patch_controller
+from tests.payloads import payload_transaction
+from utils.exceptions import IdempotencyConflict
+from utils.index import request_fingerprint
+
+TRANSACTION = {"_id": "66a000000000000000000001", "value": 15.0, "currency": "BRL"}
+
+
+def test_duplicate_request_replays_response(
+        client,
+        mock_get_key_by_user,
+        mock_get_user_balance,
+        mock_get_user_by_id,
+        mock_send_sms
+    ):
+    """Testa que a repetição com a mesma chave devolve a resposta original sem refazer a transferencia."""
+    headers = {"Idempotency-Key": "retry-1"}
+
+    first = client.post("/transference", json=payload_transaction, headers=headers)
+    second = client.post("/transference", json=payload_transaction, headers=headers)
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.json == first.json
+    mock_get_key_by_user.assert_called_once()
+    assert len(list(Transaction.find())) == 2
+
+
+def test_response_is_stored_with_the_transfer(
+        client,
+        mocker,
+        mock_get_key_by_user,
+        mock_get_user_balance,
+        mock_get_user_by_id,
+        mock_send_sms
+    ):
+    """Testa que a resposta é gravada junto com a transferencia e uma falha ao gravá-la depois não vira erro."""
+    complete = IdempotencyKey.complete
+
+    def complete_only_in_transfer(key, response, status_code, session=None):
+        if session is None:
+            raise Exception("Conexão com o banco perdida")
+        return complete(key, response, status_code, session=session)
+
+    mocker.patch.object(IdempotencyKey, "complete", side_effect=complete_only_in_transfer)
+    headers = {"Idempotency-Key": "retry-7"}
+
+    first = client.post("/transference", json=payload_transaction, headers=headers)
+    record = IdempotencyKey.find("retry-7")
+
+    assert first.status_code == 200
+    assert record["status"] == IdempotencyKey.DONE
+    assert str(record["response"]["_id"]) == first.json["_id"]
+    assert client.post("/transference", json=payload_transaction, headers=headers).json == first.json
+    assert len(list(Transaction.find())) == 2
+
+
+def test_transfer_aborts_when_key_already_completed(
+        app,
+        mock_get_key_by_user,
+        mock_get_user_balance,
+        mock_get_user_by_id,
+        mock_send_sms
+    ):
+    """Testa que uma execução que perdeu a chave para outra já concluída não efetiva uma segunda transferencia."""
+    IdempotencyKey.acquire("retry-8", request_fingerprint(payload_transaction), 60)
+    IdempotencyKey.complete("retry-8", TRANSACTION, 200)
+
+    with pytest.raises(IdempotencyConflict):
+        TransferenceController.transaction(TransactionSchema().load(payload_transaction), "retry-8")
+
+    assert IdempotencyKey.find("retry-8")["response"] == TRANSACTION
+
+
+def test_key_reused_with_other_payload(client, mocker):
+    """Testa que a mesma chave com outro payload é rejeitada."""
+    patch_controller(mocker, "transaction", return_value=TRANSACTION)
+    headers = {"Idempotency-Key": "retry-2"}
+    other_payload = deepcopy(payload_transaction)
+    other_payload["value"] = 99.0
+
+    client.post("/transference", json=payload_transaction, headers=headers)
+    response = client.post("/transference", json=other_payload, headers=headers)
+
+    assert response.status_code == 422
+    assert response.json == {"status": 422, "message": "Chave de idempotência já usada em outra requisição"}
+
+
+def test_failed_request_can_be_retried(client, mocker):
+    """Testa que uma falha não é guardada e a repetição executa a transferencia."""
+    transaction = patch_controller(
+        mocker, "transaction", side_effect=[Exception("Serviço de usuário indisponível"), TRANSACTION]
+    )
+    headers = {"Idempotency-Key": "retry-3"}
+
+    first = client.post("/transference", json=payload_transaction, headers=headers)
+    second = client.post("/transference", json=payload_transaction, headers=headers)
+
+    assert first.status_code == 400
+    assert second.status_code == 200
+    assert second.json == TRANSACTION
+    assert transaction.call_count == 2
+
+
+def test_concurrent_duplicates_wait_for_first(app, mocker):
+    """Testa que requisições concorrentes com a mesma chave esperam a primeira em vez de executar de novo."""
+    calls = []
+    lock = threading.Lock()
+
+    def slow_transaction(transference, idempotency_key=None):
+        with lock:
+            calls.append(transference)
+        time.sleep(0.2)
+        return TRANSACTION
+
+    patch_controller(mocker, "transaction", side_effect=slow_transaction)
+
+    def post(_):
+        response = app.test_client().post("/transference", json=payload_transaction, headers={"Idempotency-Key": "retry-4"})
+        return response.status_code, response.json
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        responses = list(executor.map(post, range(4)))
+
+    assert responses == [(200, TRANSACTION)] * 4
+    assert len(calls) == 1
+
+
+def test_in_flight_request_times_out(client, monkeypatch):
+    """Testa que a espera por uma requisição em andamento tem limite de tempo."""
+    monkeypatch.setattr(settings, "IDEMPOTENCY_WAIT_TIMEOUT", 0.1)
+    IdempotencyKey.acquire("retry-5", request_fingerprint(payload_transaction), 60)
+
+    response = client.post("/transference", json=payload_transaction, headers={"Idempotency-Key": "retry-5"})
+
+    assert response.status_code == 409
+    assert response.json["message"] == "Requisição com a mesma chave de idempotência em andamento"
+
+
+def test_asgi_duplicate_request_replays_response(asgi_client, mocker):
+    """Testa a chave de idempotência na aplicação ASGI."""
+    transaction = mocker.patch(
+        "controllers.async_transference_controller.AsyncTransferenceController.transaction", return_value=TRANSACTION
+    )
+    headers = {"Idempotency-Key": "retry-6"}
+
+    first = asgi_client.post("/transference", json=payload_transaction, headers=headers)
+    second = asgi_client.post("/transference", json=payload_transaction, headers=headers)
+
+    assert first.json() == second.json() == TRANSACTION
+    transaction.assert_called_once()
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+from clients.upstream import user_client
+from controllers.transference_controller import TransferenceController
+from database.monitoring import CommandTimer
+from utils.exceptions import UserServiceError
+from utils.metrics import Registry, http_requests, mongo_latency, upstream_errors, upstream_latency, upstream_timeouts
+
+
+def test_metrics_endpoint(client):
+    """Testa que o endpoint de métricas expõe as requisições por rota."""
+    before = http_requests.value("GET", "/health", 200)
+
+    client.get("/health")
+    client.get("/health")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+    assert http_requests.value("GET", "/health", 200) == before + 2
+    body = response.get_data(as_text=True)
+    assert f'http_requests_total{{method="GET",route="/health",status="200"}} {before + 2}' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/health",le="+Inf"}' in body
+    assert 'transference_cache{cache="conversion_rates",stat="hit"}' in body
+
+
+def test_metrics_route_uses_rule(client):
+    """Testa que a rota registrada é o template e não o caminho com parâmetros."""
+    before = http_requests.value("GET", "/key/<key_id>", 404)
+
+    client.get("/key/664e9b2da3835b65a119b35d")
+
+    assert http_requests.value("GET", "/key/<key_id>", 404) == before + 1
+
+
+def test_upstream_metrics(stub_upstream, monkeypatch):
+    """Testa que as chamadas aos serviços externos registram latência, erros e timeouts."""
+    monkeypatch.setattr(user_client, "base_url", stub_upstream.url)
+    monkeypatch.setattr("settings.settings.HTTP_READ_TIMEOUT", 0.2)
+    monkeypatch.setattr("settings.settings.HTTP_RETRIES", 0)
+    user_client.close()
+    calls = upstream_latency.count("user_balance_get")
+    errors = upstream_errors.value("user_balance_get")
+    timeouts = upstream_timeouts.value("user_balance_get")
+
+    stub_upstream.enqueue(200, {"balance": 10.0, "currency": "BRL"})
+    stub_upstream.enqueue(200, {}, delay=1)
+    TransferenceController.get_user_balance("1")
+    try:
+        TransferenceController.get_user_balance("1")
+    except UserServiceError:
+        pass
+    user_client.close()
+
+    assert upstream_latency.count("user_balance_get") == calls + 2
+    assert upstream_errors.value("user_balance_get") == errors + 1
+    assert upstream_timeouts.value("user_balance_get") == timeouts + 1
+
+
+def test_mongo_command_timer():
+    """Testa que os comandos do MongoDB são medidos por coleção."""
+    timer = CommandTimer()
+    before = mongo_latency.count("transactions", "find")
+
+    timer.started(SimpleNamespace(command={"find": "transactions"}, command_name="find", connection_id=1, request_id=7))
+    timer.succeeded(SimpleNamespace(command_name="find", connection_id=1, request_id=7, duration_micros=1500))
+
+    assert mongo_latency.count("transactions", "find") == before + 1
+
+
+def test_histogram_exposition():
+    """Testa o formato de exposição dos histogramas."""
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latência", ("route",), buckets=(0.1, 1.0))
+
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latência",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1.0"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a"} 5.55',
+        'latency_seconds_count{route="/a"} 3',
+    ]
@@ -0,0 +1,108 @@
+from datetime import datetime
+
+from freezegun import freeze_time
+
+from database.models import Balance, StatementRollup, Transaction, db
+from tests.payloads import payload_transaction
+
+SENDER = "665dff9c183ce834954a2f42"
+RECEIVER = "665e0069183ce834954a2f44"
+
+
+def transfer(value, receiver_currency="BRL", value_to_receiver=None):
+    legs = Transaction.transfer_legs(
+        SENDER, RECEIVER, "11999888156", "Teste1", "BRL", receiver_currency, value, value_to_receiver or value
+    )
+    return Balance.transfer(SENDER, value, {RECEIVER: value_to_receiver or value}, legs)
+
+
+def seed_history():
+    Balance.seed(SENDER, 1000.0, "BRL")
+    Balance.seed(RECEIVER, 0.0, "BRL")
+    with freeze_time("2024-01-10 12:00:00"):
+        transfer(10.0)
+        transfer(5.0)
+    with freeze_time("2024-01-31 12:00:00"):
+        transfer(20.0, "USD", 4.0)
+    with freeze_time("2024-02-01 09:00:00"):
+        transfer(1.0)
+
+
+def test_transfers_update_daily_rollups(app):
+    """Testa que cada transferencia incrementa os totais diários do remetente e do destinatário."""
+    seed_history()
+
+    rollups = list(db.statement_rollups.find({"user_id": SENDER, "day": datetime(2024, 1, 10)}))
+
+    assert len(rollups) == 1
+    assert rollups[0]["type"] == "sended"
+    assert rollups[0]["total"] == 15.0
+    assert rollups[0]["count"] == 2
+    assert db.statement_rollups.count_documents({"user_id": RECEIVER}) == 3
+
+
+def test_transference_route_updates_rollups(
+        client,
+        mock_get_key_by_user,
+        mock_get_user_balance,
+        mock_get_user_by_id,
+        mock_send_sms
+    ):
+    """Testa que uma transferencia pela rota /transference atualiza os totais diários das duas pontas."""
+    with freeze_time("2024-01-10 12:00:00"):
+        response = client.post("/transference", json=payload_transaction)
+
+    assert response.status_code == 200
+    response = client.get(f"/statement/{SENDER}")
+    assert response.json["result"] == [{"month": "2024-01", "currency": "BRL", "sended": 15.0, "received": 0.0, "count": 1}]
+    response = client.get(f"/statement/{RECEIVER}")
+    assert response.json["result"] == [{"month": "2024-01", "currency": "BRL", "sended": 0.0, "received": 15.0, "count": 1}]
+
+
+def test_statement_monthly_totals(client):
+    """Testa o extrato com os totais mensais por moeda e o filtro de período."""
+    seed_history()
+
+    response = client.get(f"/statement/{SENDER}")
+
+    assert response.status_code == 200
+    assert response.json["result"] == [
+        {"month": "2024-01", "currency": "BRL", "sended": 35.0, "received": 0.0, "count": 3},
+        {"month": "2024-02", "currency": "BRL", "sended": 1.0, "received": 0.0, "count": 1},
+    ]
+
+    response = client.get(f"/statement/{RECEIVER}?from=2024-01-11&to=2024-01-31")
+
+    assert response.json["result"] == [{"month": "2024-01", "currency": "USD", "sended": 0.0, "received": 4.0, "count": 1}]
+
+
+def test_statement_invalid_period(client):
+    """Testa o extrato com período inválido."""
+    response = client.get(f"/statement/{SENDER}?from=2024-02-01&to=2024-01-01")
+    assert response.status_code == 422
+
+    response = client.get(f"/statement/{SENDER}?from=ontem")
+    assert response.status_code == 422
+
+
+def test_rebuild_matches_incremental_rollups(app):
+    """Testa que a reconstrução pela agregação produz os mesmos totais mantidos incrementalmente."""
+    seed_history()
+    with freeze_time("2024-03-05 10:00:00"):
+        transfer(3.0)
+
+    def rollups():
+        return sorted(
+            (rollup["user_id"], rollup["day"], rollup["currency"], rollup["type"], rollup["total"], rollup["count"])
+            for rollup in db.statement_rollups.find({}, {"_id": 0})
+        )
+
+    incremental = rollups()
+    db.statement_rollups.update_many({}, {"$set": {"total": 0}})
+
+    assert StatementRollup.rebuild(batch_size=2) == len(incremental)
+    assert rollups() == incremental
+
+    db.statement_rollups.delete_many({"user_id": SENDER})
+    assert StatementRollup.rebuild(SENDER) == 4
+    assert rollups() == incremental
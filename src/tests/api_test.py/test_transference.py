@@ -1,17 +1,23 @@
 from copy import deepcopy
+from datetime import datetime, timedelta
 from freezegun import freeze_time
+from pymongo.errors import OperationFailure
 import json
 import re
+import threading
 
-from database.models import PixKey, Transaction
+from controllers.transference_controller import TransferenceController
+from database.models import Balance, Notification, PixKey, Transaction, db
+from tests.conftest import patch_controller, spy_model
 from tests.payloads import (
+    payload_batch_transaction,
     payload_create_key,
     payload_transaction_other_currency,
     payload_transaction,
     response_transaction,
     response_get_key
 )
-from utils.exceptions import BalanceNotFound, UserServiceError
+from utils.exceptions import BalanceNotFound, ConversionNotFound, UserNotFound, UserServiceError
 
 
 def test_create_key_success(client):
@@ -53,8 +59,8 @@ def test_create_key_error_invalid_payload(client):
 def test_create_key_error_other_exeception(client, mocker):
     """Testa o endpoint de criação de chave com payload exceção generica."""
 
-    mocker.patch(
-        "controllers.transference_controller.TransferenceController.create_key", side_effect=Exception("Erro ao criar chave")
+    patch_controller(
+        mocker, "create_key", side_effect=Exception("Erro ao criar chave")
     )
 
     response = client.post("/create_key", json=payload_create_key)
@@ -64,6 +70,38 @@ def test_create_key_error_other_exeception(client, mocker):
     assert data["message"] == "Erro ao criar chave"
 
 
+def test_create_key_error_payload_too_large(client, app):
+    """Testa o endpoint de criação de chave com payload acima do limite."""
+    app.config["MAX_CONTENT_LENGTH"] = 64
+    oversized_payload = deepcopy(payload_create_key)
+    oversized_payload["key"] = "1" * 128
+
+    response = client.post("/create_key", json=oversized_payload)
+
+    assert response.status_code == 413
+    assert response.json == {"status": 413, "message": "Requisição excede o tamanho máximo permitido"}
+
+
+def test_create_transference_error_payload_too_large(client, app):
+    """Testa que a transferencia com payload acima do limite responde 413 e não 400."""
+    app.config["MAX_CONTENT_LENGTH"] = 64
+    oversized_payload = deepcopy(payload_transaction)
+    oversized_payload["receiver_key"] = "1" * 128
+
+    response = client.post("/transference", json=oversized_payload)
+
+    assert response.status_code == 413
+    assert response.json == {"status": 413, "message": "Requisição excede o tamanho máximo permitido"}
+    assert len(list(Transaction.find())) == 0
+
+
+def test_unknown_route_keeps_http_status(client):
+    """Testa que erros HTTP do Flask não são convertidos em 400 pelo tratamento genérico."""
+    response = client.get("/rota_inexistente")
+
+    assert response.status_code == 404
+
+
 def test_get_user_keys_success(client):
     """Testa o endpoint de buscar chaves do usuário pelo id de usuário."""
     with freeze_time("2024-01-01"):
@@ -100,8 +138,8 @@ def test_get_user_keys_generic_error(client, mocker):
 
     assert response.status_code == 200
 
-    mocker.patch(
-        "controllers.transference_controller.TransferenceController.get_user_keys", side_effect=Exception("Erro ao buscar chaves")
+    patch_controller(
+        mocker, "get_user_keys", side_effect=Exception("Erro ao buscar chaves")
     )
 
     user_id = payload_create_key["user_id"]
@@ -153,8 +191,8 @@ def test_get_key_by_id_generic_error(client, mocker):
     assert match is not None
     key_id = match.group(1)
 
-    mocker.patch(
-        "controllers.transference_controller.TransferenceController.get_key_by_id", side_effect=Exception("Erro ao buscar chave")
+    patch_controller(
+        mocker, "get_key_by_id", side_effect=Exception("Erro ao buscar chave")
     )
 
     response = client.get(f"/key/{key_id}")
@@ -205,8 +243,8 @@ def test_get_key_by_value_generic_error(client, mocker):
 
     key = payload_create_key["key"]
 
-    mocker.patch(
-        "controllers.transference_controller.TransferenceController.get_user_by_key", side_effect=Exception("Erro ao buscar chave")
+    patch_controller(
+        mocker, "get_user_by_key", side_effect=Exception("Erro ao buscar chave")
     )
 
     response = client.get(f"/user_keys/{key}")
@@ -245,7 +283,7 @@ def test_create_transference_success_same_currency(
         mock_get_conversion.assert_not_called()
         mock_get_key_by_user.assert_called_once()
         mock_get_user_balance.assert_called()
-        mock_updated_balance.assert_called()
+        mock_updated_balance.assert_not_called()
         mock_get_user_by_id.call_count == 2
         mock_send_sms.call_count == 2
 
@@ -282,7 +320,7 @@ def test_create_transference_success_sender_n_desired_same_currency(
         mock_get_conversion.assert_called_once()
         mock_get_key_by_user.assert_called_once()
         mock_get_user_balance.assert_called()
-        mock_updated_balance.assert_called()
+        mock_updated_balance.assert_not_called()
         mock_get_user_by_id.call_count == 2
         mock_send_sms.call_count == 2
 
@@ -319,11 +357,56 @@ def test_create_transference_success_different_currency(
         mock_get_conversion.assert_called_once()
         mock_get_key_by_user.assert_called_once()
         mock_get_user_balance.assert_called()
-        mock_updated_balance.assert_called()
+        mock_updated_balance.assert_not_called()
         mock_get_user_by_id_different_currencies.call_count == 2
         mock_send_sms.call_count == 2
 
 
+def test_create_transference_single_write(
+        client,
+        mock_get_key_by_user,
+        mock_get_user_balance,
+        mock_updated_balance,
+        mock_get_user_by_id,
+        mock_get_conversion,
+        mock_send_sms,
+        mocker
+    ):
+    """Testa que as duas pernas da transferencia são gravadas juntas e sem releitura."""
+    find_by_id = mocker.spy(Transaction, "find_by_id")
+    save = mocker.spy(Transaction, "save")
+
+    response = client.post("/transference", json=payload_transaction)
+
+    assert response.status_code == 200
+    find_by_id.assert_not_called()
+    save.assert_not_called()
+
+    sended, received = sorted(Transaction.find(), key=lambda transaction: transaction["type"], reverse=True)
+    assert str(sended["_id"]) == response.json["_id"]
+    assert received["type"] == "received"
+    assert sended["created_at"] == received["created_at"] == sended["updated_at"]
+
+
+def test_create_transference_enqueues_sms(
+        client,
+        mock_get_key_by_user,
+        mock_get_user_balance,
+        mock_updated_balance,
+        mock_get_user_by_id,
+        mock_get_conversion,
+        mock_send_sms
+    ):
+    """Testa que a transferencia registra os SMS no outbox sem enviá-los na requisição."""
+    response = client.post("/transference", json=payload_transaction)
+
+    assert response.status_code == 200
+    mock_send_sms.assert_not_called()
+
+    notifications = list(Notification.find_by_status(Notification.PENDING))
+    assert sorted(notification["number"] for notification in notifications) == ["11999888155", "11999888156"]
+
+
 def test_create_transference_error_invalid_payload(client):
     """Testa o endpoint de transferencia com payload inválido."""
     invalid_payload_create_transaction = deepcopy(payload_transaction)
@@ -339,8 +422,8 @@ def test_create_transference_error_invalid_payload(client):
 def test_create_transference_error_other_exeception(client, mocker):
     """Testa o endpoint de transferencia com payload exceção generica."""
 
-    mocker.patch(
-        "controllers.transference_controller.TransferenceController.transaction", side_effect=Exception("Erro ao realizar transferencia")
+    patch_controller(
+        mocker, "transaction", side_effect=Exception("Erro ao realizar transferencia")
     )
 
     response = client.post("/transference", json=payload_transaction)
@@ -389,8 +472,8 @@ def test_create_transference_balance_not_found_error(
     """Testa o endpoint de transferencia com saldo não encontrado."""
     with freeze_time("2024-01-01"):
 
-        mocker.patch(
-            "controllers.transference_controller.TransferenceController.get_user_balance", side_effect=BalanceNotFound("Saldo indisponível")
+        patch_controller(
+            mocker, "get_user_balance", side_effect=BalanceNotFound("Saldo indisponível")
         )
 
         response = client.post("/transference", json=payload_transaction)
@@ -400,7 +483,6 @@ def test_create_transference_balance_not_found_error(
         mock_get_conversion.assert_not_called()
         mock_get_key_by_user.assert_called()
         mock_updated_balance.assert_not_called()
-        mock_get_user_by_id.assert_not_called()
         mock_send_sms.assert_not_called()
 
 
@@ -416,8 +498,8 @@ def test_create_transference_user_serivce_unavailable_error(
     """Testa o endpoint de transferencia com serviço de usuário indisponível."""
     with freeze_time("2024-01-01"):
 
-        mocker.patch(
-            "controllers.transference_controller.TransferenceController.get_user_balance", side_effect=UserServiceError("Serviço de usuário indisponível")
+        patch_controller(
+            mocker, "get_user_balance", side_effect=UserServiceError("Serviço de usuário indisponível")
         )
 
         response = client.post("/transference", json=payload_transaction)
@@ -427,10 +509,46 @@ def test_create_transference_user_serivce_unavailable_error(
         mock_get_conversion.assert_not_called()
         mock_get_key_by_user.assert_called()
         mock_updated_balance.assert_not_called()
-        mock_get_user_by_id.assert_not_called()
         mock_send_sms.assert_not_called()
 
 
+def test_create_transference_upstream_lookups_in_parallel(
+        app,
+        mock_get_key_by_user,
+        mock_updated_balance,
+        mock_get_conversion,
+        mock_send_sms,
+        mocker
+    ):
+    """Testa que saldos e perfis dos usuários são buscados em paralelo na transferencia."""
+    barrier = threading.Barrier(4, timeout=5)
+    users = {
+        "665e0069183ce834954a2f44": {"_id": "665e0069183ce834954a2f44", "name": "Teste2"},
+        "665dff9c183ce834954a2f42": {"_id": "665dff9c183ce834954a2f42", "name": "Teste1"},
+    }
+
+    def get_user_balance(user_id):
+        barrier.wait()
+        return {"balance": 100.0, "currency": "BRL"}
+
+    def get_user_by_id(user_id):
+        barrier.wait()
+        return users[user_id]
+
+    patch_controller(
+        mocker, "get_user_balance", side_effect=get_user_balance
+    )
+    patch_controller(
+        mocker, "get_user_by_id", side_effect=get_user_by_id
+    )
+
+    response = app.test_client().post("/transference", json=payload_transaction)
+
+    assert response.status_code == 200
+    assert response.json["from"]["name"] == "Teste1"
+    assert response.json["to"]["name"] == "Teste2"
+
+
 def test_create_transference_insuficient_balance(
         client, 
         mock_get_key_by_user, 
@@ -454,6 +572,104 @@ def test_create_transference_insuficient_balance(
         mock_send_sms.assert_not_called()
 
 
+def test_create_batch_transference_success(
+        client,
+        mock_get_user_balance,
+        mock_updated_balance,
+        mock_get_user_by_id,
+        mock_get_conversion,
+        mock_send_sms,
+        mocker
+    ):
+    """Testa o endpoint de transferencias em lote com uma chave inexistente."""
+    PixKey(**payload_create_key).save()
+    find_by_keys = spy_model(mocker, "PixKey", "find_by_keys")
+
+    with freeze_time("2024-01-01"):
+        response = client.post("/transferences/batch", json=payload_batch_transaction)
+
+    assert response.status_code == 200
+    first, missing, second = response.json["result"]
+    expected_response = deepcopy(response_transaction)
+    expected_response["_id"] = first["_id"]
+    assert first == {"status": 200, **expected_response}
+    assert missing == {"status": 404, "message": "Usuário não encontrado para chave 99999999"}
+    assert second["value"] == 20.0
+
+    find_by_keys.assert_called_once_with(["11999888156", "99999999"])
+    assert mock_get_user_balance.call_count == 2
+    balances = Balance.find_many(["665e0069183ce834954a2f44", "665dff9c183ce834954a2f42"])
+    assert balances["665e0069183ce834954a2f44"]["balance"] == 135.0
+    assert balances["665dff9c183ce834954a2f42"]["balance"] == 65.0
+    mock_updated_balance.assert_not_called()
+    assert len(list(Transaction.find())) == 4
+    mock_send_sms.assert_not_called()
+
+
+def test_create_batch_transference_item_failures(client, mocker, mock_get_user_balance, mock_send_sms):
+    """Testa que falhas de conversão e de perfil de um destinatário ficam só no item correspondente do lote."""
+    PixKey(**payload_create_key).save()
+    PixKey(type="telefone", key="11999888157", user_id="665e0069183ce834954a2f45").save()
+    profiles = {
+        "665dff9c183ce834954a2f42": {"_id": "665dff9c183ce834954a2f42", "name": "Teste1", "cellphone": "11999888155"},
+        "665e0069183ce834954a2f44": {"_id": "665e0069183ce834954a2f44", "name": "Teste2", "cellphone": "11999888156"},
+    }
+
+    def get_user_by_id(user_id):
+        if user_id not in profiles:
+            raise UserNotFound("Usuário não encontrado")
+        return profiles[user_id]
+
+    patch_controller(mocker, "get_user_by_id", side_effect=get_user_by_id)
+    patch_controller(mocker, "get_conversion", side_effect=ConversionNotFound("Conversão não encontrada"))
+    sender_id = payload_transaction["sender_id"]
+    payload = {"transferences": [
+        {"sender_id": sender_id, "receiver_key": "11999888156", "currency": "BRL", "value": 15.0},
+        {"sender_id": sender_id, "receiver_key": "11999888156", "currency": "USD", "value": 10.0},
+        {"sender_id": sender_id, "receiver_key": "11999888157", "currency": "BRL", "value": 5.0},
+    ]}
+
+    response = client.post("/transferences/batch", json=payload)
+
+    assert response.status_code == 200
+    transferred, unconverted, unknown_receiver = response.json["result"]
+    assert transferred["status"] == 200
+    assert unconverted == {"status": 404, "message": "Conversão não encontrada"}
+    assert unknown_receiver == {"status": 404, "message": "Usuário não encontrado"}
+    assert Balance.find_many([sender_id])[sender_id]["balance"] == 85.0
+    assert len(list(Transaction.find())) == 2
+
+
+def test_create_batch_transference_insuficient_balance(
+        client,
+        mock_get_user_balance,
+        mock_updated_balance,
+        mock_get_user_by_id,
+        mock_send_sms
+    ):
+    """Testa o endpoint de transferencias em lote quando o total excede o saldo."""
+    PixKey(**payload_create_key).save()
+    payload = {"transferences": [payload_transaction] * 7}
+
+    response = client.post("/transferences/batch", json=payload)
+
+    assert response.status_code == 400
+    assert response.json == {"status": 400, "message": "Usuário não possui saldo suficiente"}
+    mock_updated_balance.assert_not_called()
+    assert len(list(Transaction.find())) == 0
+
+
+def test_create_batch_transference_multiple_senders(client):
+    """Testa o endpoint de transferencias em lote com remetentes diferentes."""
+    other_sender = deepcopy(payload_transaction)
+    other_sender["sender_id"] = "665e0069183ce834954a2f44"
+
+    response = client.post("/transferences/batch", json={"transferences": [payload_transaction, other_sender]})
+
+    assert response.status_code == 422
+    assert response.json["message"] == "{'transferences': ['Todas as transferências devem ter o mesmo remetente']}"
+
+
 def test_get_transaction_by_user_id_success(
         client, 
         mock_get_key_by_user, 
@@ -480,7 +696,7 @@ def test_get_transaction_by_user_id_success(
         mock_get_conversion.assert_not_called()
         mock_get_key_by_user.assert_called_once()
         mock_get_user_balance.assert_called()
-        mock_updated_balance.assert_called()
+        mock_updated_balance.assert_not_called()
         mock_get_user_by_id.call_count == 2
         mock_send_sms.call_count == 2
 
@@ -511,11 +727,46 @@ def test_get_transaction_not_found(
         assert response.json == {"status": 404, "message": "Sem nenhuma transação realizada"}
 
 
+def test_get_transaction_pagination(client):
+    """Testa a paginação por cursor das transferencias do usuário."""
+    sender_id = payload_transaction["sender_id"]
+    base = datetime(2024, 1, 1)
+    db.transactions.insert_many([
+        {"user_id": sender_id, "value": float(i), "created_at": base + timedelta(minutes=i // 2)}
+        for i in range(5)
+    ])
+
+    values = []
+    cursor = None
+    for _ in range(3):
+        query = f"?limit=2&cursor={cursor}" if cursor else "?limit=2"
+        response = client.get(f"/my_transferences/{sender_id}{query}")
+        assert response.status_code == 200
+        values.extend(transaction["value"] for transaction in response.json["result"])
+        cursor = response.json["next_cursor"]
+
+    assert sorted(values) == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert values[0] == 4.0
+    assert cursor is None
+
+
+def test_get_transaction_invalid_pagination(client):
+    """Testa a paginação das transferencias com cursor e limite inválidos."""
+    sender_id = payload_transaction["sender_id"]
+
+    response = client.get(f"/my_transferences/{sender_id}?cursor=invalido")
+    assert response.status_code == 422
+    assert response.json == {"status": 422, "message": "Cursor inválido"}
+
+    response = client.get(f"/my_transferences/{sender_id}?limit=0")
+    assert response.status_code == 422
+
+
 def test_get_transaction_generic_error(client, mocker):
     """Testa o endpoint de buscar transferencia com exceção generica."""
 
-    mocker.patch(
-        "controllers.transference_controller.TransferenceController.get_user_transactions", side_effect=Exception("Erro ao buscar transferencia")
+    patch_controller(
+        mocker, "get_user_transactions", side_effect=Exception("Erro ao buscar transferencia")
     )
 
     sender_id = payload_transaction["sender_id"]
@@ -551,7 +802,7 @@ def test_get_transaction_by_id_success(
         mock_get_conversion.assert_not_called()
         mock_get_key_by_user.assert_called_once()
         mock_get_user_balance.assert_called()
-        mock_updated_balance.assert_called()
+        mock_updated_balance.assert_not_called()
         mock_get_user_by_id.call_count == 2
         mock_send_sms.call_count == 2
 
@@ -574,10 +825,64 @@ def test_get_transaction_by_id_not_found(
 def test_get_transaction_by_id_generic_error(client, mocker):
     """Testa o endpoint de buscar transferencia com exceção generica."""
 
-    mocker.patch(
-        "controllers.transference_controller.TransferenceController.get_transaction_by_id", side_effect=Exception("Erro ao buscar transferencia")
+    patch_controller(
+        mocker, "get_transaction_by_id", side_effect=Exception("Erro ao buscar transferencia")
     )
 
     response = client.get("/transferences/664e9b2da3835b65a119b35d")
     assert response.status_code == 400
-    assert response.json == {"status": 400, "message": "Erro ao buscar transferencia"}
\ No newline at end of file
+    assert response.json == {"status": 400, "message": "Erro ao buscar transferencia"}
+
+def test_export_transactions(client, monkeypatch):
+    """Testa a exportação em NDJSON do histórico completo do usuário em lotes."""
+    sender_id = payload_transaction["sender_id"]
+    base = datetime(2024, 1, 1)
+    db.transactions.insert_many([
+        {"user_id": sender_id, "value": float(i), "type": "sended", "created_at": base + timedelta(days=i)}
+        for i in range(5)
+    ])
+    db.transactions.insert_one({"user_id": "outro", "value": 99.0, "created_at": base})
+
+    response = client.get(f"/my_transferences/{sender_id}/export")
+    lines = [json.loads(line) for line in response.data.splitlines()]
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert [line["value"] for line in lines] == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+    response = client.get(f"/my_transferences/{sender_id}/export?from=2024-01-02T00:00:00&to=2024-01-04T00:00:00&fields=value,type")
+    lines = [json.loads(line) for line in response.data.splitlines()]
+
+    assert lines == [{"value": 1.0, "type": "sended"}, {"value": 2.0, "type": "sended"}, {"value": 3.0, "type": "sended"}]
+
+    chunks = list(TransferenceController.export_user_transactions(sender_id, projection=["value"], batch_size=2))
+    assert chunks == [b'{"value":0.0}\n{"value":1.0}\n', b'{"value":2.0}\n{"value":3.0}\n', b'{"value":4.0}\n']
+
+
+def test_export_transactions_database_error(client, mocker):
+    """Testa que uma falha ao abrir o cursor da exportação vira erro antes de a resposta começar."""
+    cursor = mocker.MagicMock()
+    cursor.__iter__.side_effect = OperationFailure("Consulta interrompida")
+    mocker.patch("controllers.transference_controller.Transaction.export_cursor", return_value=cursor)
+
+    response = client.get(f"/my_transferences/{payload_transaction['sender_id']}/export")
+
+    assert response.status_code == 400
+    assert response.json == {"status": 400, "message": "Consulta interrompida"}
+    cursor.close.assert_called_once()
+
+
+def test_export_transactions_invalid_params(client):
+    """Testa a exportação com campos e intervalo de datas inválidos."""
+    sender_id = payload_transaction["sender_id"]
+
+    response = client.get(f"/my_transferences/{sender_id}/export?fields=value,cpf")
+    assert response.status_code == 422
+    assert "cpf" in response.json["message"]
+
+    response = client.get(f"/my_transferences/{sender_id}/export?from=2024-02-01T00:00:00&to=2024-01-01T00:00:00")
+    assert response.status_code == 422
+
+    response = client.get(f"/my_transferences/{sender_id}/export")
+    assert response.status_code == 200
+    assert response.data == b""
@@ -0,0 +1,184 @@
+import asyncio
+import time
+
+import pytest
+
+from clients.async_upstream import AsyncUpstreamClient
+from clients.upstream import UpstreamClient
+from settings import settings
+from utils.circuit_breaker import breakers
+from utils.exceptions import GeoLocServiceError, UserServiceError
+
+
+@pytest.fixture
+def breaker_settings(monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_RETRIES", 0)
+    monkeypatch.setattr(settings, "HTTP_READ_TIMEOUT", 0.5)
+    monkeypatch.setattr(settings, "BREAKER_MIN_CALLS", 4)
+    monkeypatch.setattr(settings, "BREAKER_ERROR_RATE", 0.5)
+    monkeypatch.setattr(settings, "BREAKER_SLOW_CALL_SECONDS", 0.1)
+    monkeypatch.setattr(settings, "BREAKER_SLOW_CALL_RATE", 0.5)
+    monkeypatch.setattr(settings, "BREAKER_OPEN_SECONDS", 0.2)
+    monkeypatch.setattr(settings, "BREAKER_HALF_OPEN_CALLS", 2)
+
+
+@pytest.fixture
+def upstream_client(stub_upstream, breaker_settings):
+    client = UpstreamClient(stub_upstream.url, UserServiceError, "Serviço de usuário indisponível")
+    yield client
+    client.close()
+
+
+def call(client, path="/user/1"):
+    try:
+        return client.get(path, "user_profile").status_code
+    except UserServiceError:
+        return "erro"
+
+
+def test_errors_open_breaker_and_fail_fast(upstream_client, stub_upstream):
+    """Testa que erros acima do limite abrem o circuito e as chamadas seguintes falham sem chegar ao serviço."""
+    stub_upstream.default = (503, {}, 0)
+
+    assert [call(upstream_client) for _ in range(4)] == [503] * 4
+    assert breakers.stats()["user_profile"]["state"] == "open"
+
+    start = time.perf_counter()
+    with pytest.raises(UserServiceError, match="Serviço de usuário indisponível"):
+        upstream_client.get("/user/1", "user_profile")
+
+    assert time.perf_counter() - start < 0.01
+    assert len(stub_upstream.requests) == 4
+    assert breakers.stats()["user_profile"]["rejected"] == 1
+
+
+def test_not_found_does_not_open_breaker(upstream_client, stub_upstream):
+    """Testa que respostas 4xx do serviço não contam como falha."""
+    stub_upstream.default = (404, {}, 0)
+
+    assert [call(upstream_client) for _ in range(6)] == [404] * 6
+    assert breakers.stats()["user_profile"]["state"] == "closed"
+
+
+def test_slow_calls_open_breaker(upstream_client, stub_upstream):
+    """Testa que a latência acima do limite abre o circuito mesmo sem erros."""
+    stub_upstream.default = (200, {}, 0.15)
+
+    assert [call(upstream_client) for _ in range(4)] == [200] * 4
+    stats = breakers.stats()["user_profile"]
+
+    assert stats["state"] == "open"
+    assert call(upstream_client) == "erro"
+
+
+def test_timeouts_open_breaker(upstream_client, stub_upstream, monkeypatch):
+    """Testa que timeouts contam como falha e abrem o circuito."""
+    monkeypatch.setattr(settings, "HTTP_READ_TIMEOUT", 0.05)
+    stub_upstream.default = (200, {}, 0.2)
+
+    assert [call(upstream_client) for _ in range(5)] == ["erro"] * 5
+    assert len(stub_upstream.requests) == 4
+
+
+def test_half_open_probes(upstream_client, stub_upstream):
+    """Testa que, após o tempo aberto, chamadas de teste reabrem ou fecham o circuito."""
+    stub_upstream.default = (503, {}, 0)
+    [call(upstream_client) for _ in range(4)]
+
+    time.sleep(0.25)
+    assert call(upstream_client) == 503
+    assert breakers.stats()["user_profile"]["state"] == "open"
+    assert call(upstream_client) == "erro"
+
+    stub_upstream.default = (200, {}, 0)
+    time.sleep(0.25)
+    assert [call(upstream_client) for _ in range(2)] == [200, 200]
+    assert breakers.stats()["user_profile"]["state"] == "closed"
+
+
+def test_breakers_are_per_endpoint(upstream_client, stub_upstream):
+    """Testa que cada endpoint externo tem o seu próprio circuito."""
+    stub_upstream.default = (503, {}, 0)
+    [call(upstream_client) for _ in range(4)]
+
+    stub_upstream.default = (200, {"balance": 1.0}, 0)
+    response = upstream_client.get("/balance/1", "user_balance_get")
+
+    assert response.status_code == 200
+    assert breakers.stats()["user_balance_get"]["state"] == "closed"
+
+
+def test_async_client_shares_breaker(stub_upstream, breaker_settings):
+    """Testa que o cliente assíncrono usa o mesmo circuito e falha rápido quando aberto."""
+    client = AsyncUpstreamClient(stub_upstream.url, GeoLocServiceError, "Serviço de geolocalização indisponível")
+    stub_upstream.default = (500, {}, 0)
+
+    async def scenario():
+        statuses = [(await client.post("/tax_coords", "geoloc_tax", json={})).status_code for _ in range(4)]
+        with pytest.raises(GeoLocServiceError):
+            await client.post("/tax_coords", "geoloc_tax", json={})
+        await client.close()
+        return statuses
+
+    assert asyncio.run(scenario()) == [500] * 4
+    assert len(stub_upstream.requests) == 4
+
+
+def test_breaker_state_endpoint(client, stub_upstream, breaker_settings, monkeypatch):
+    """Testa o endpoint com o estado dos circuit breakers."""
+    from clients.upstream import user_client
+    monkeypatch.setattr(user_client, "base_url", stub_upstream.url)
+    stub_upstream.default = (503, {}, 0)
+    [call(user_client) for _ in range(4)]
+
+    response = client.get("/circuit_breakers")
+
+    assert response.status_code == 200
+    assert response.json["user_profile"]["state"] == "open"
+    assert response.json["user_profile"]["failures"] == 0
+    assert 0 < response.json["user_profile"]["retry_in"] <= 0.2
+    assert 'upstream_circuit_state{upstream="user_profile",state="open"} 1' in client.get("/metrics").get_data(as_text=True)
+
+
+def test_cancelled_probe_releases_slot(stub_upstream, breaker_settings):
+    """Testa que uma chamada de teste cancelada libera a vaga para as próximas no estado semiaberto."""
+    client = AsyncUpstreamClient(stub_upstream.url, GeoLocServiceError, "Serviço de geolocalização indisponível")
+    stub_upstream.default = (500, {}, 0)
+
+    async def scenario():
+        [await client.post("/tax_coords", "geoloc_tax", json={}) for _ in range(4)]
+        await asyncio.sleep(0.25)
+
+        stub_upstream.default = (200, {}, 0.3)
+        probe = asyncio.create_task(client.post("/tax_coords", "geoloc_tax", json={}))
+        await asyncio.sleep(0.05)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        stub_upstream.default = (200, {}, 0)
+        statuses = [(await client.post("/tax_coords", "geoloc_tax", json={})).status_code for _ in range(2)]
+        await client.close()
+        return statuses
+
+    assert asyncio.run(scenario()) == [200, 200]
+    assert breakers.stats()["geoloc_tax"]["state"] == "closed"
+
+
+def test_unexpected_probe_error_releases_slot(upstream_client, stub_upstream, monkeypatch):
+    """Testa que uma exceção inesperada durante a chamada de teste não prende a vaga no estado semiaberto."""
+    stub_upstream.default = (503, {}, 0)
+    [call(upstream_client) for _ in range(4)]
+    time.sleep(0.25)
+
+    def interrupted(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(upstream_client, "send", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        upstream_client.get("/user/1", "user_profile")
+    monkeypatch.delattr(upstream_client, "send")
+
+    stub_upstream.default = (200, {}, 0)
+    assert [call(upstream_client) for _ in range(2)] == [200, 200]
+    assert breakers.stats()["user_profile"]["state"] == "closed"
@@ -0,0 +1,53 @@
+import pytest
+
+from clients.upstream import UpstreamClient
+from settings import settings
+from utils.exceptions import UserServiceError
+
+
+@pytest.fixture
+def upstream_client(stub_upstream, monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_BACKOFF_FACTOR", 0)
+    monkeypatch.setattr(settings, "HTTP_READ_TIMEOUT", 0.2)
+    client = UpstreamClient(stub_upstream.url, UserServiceError, "Serviço de usuário indisponível")
+    yield client
+    client.close()
+
+
+def test_get_retries_on_unavailable(upstream_client, stub_upstream):
+    """Testa que GETs são repetidos quando o serviço responde indisponível."""
+    stub_upstream.enqueue(503)
+    stub_upstream.enqueue(200, {"balance": 10.0})
+
+    response = upstream_client.get("/balance/1", "user_balance_get")
+
+    assert response.status_code == 200
+    assert response.json() == {"balance": 10.0}
+    assert len(stub_upstream.requests) == 2
+
+
+def test_patch_is_not_retried(upstream_client, stub_upstream):
+    """Testa que chamadas não idempotentes não são repetidas."""
+    stub_upstream.enqueue(503)
+
+    response = upstream_client.patch("/balance/1", "user_balance_patch", json={"balance": 5.0})
+
+    assert response.status_code == 503
+    assert stub_upstream.requests == [("PATCH", "/balance/1", {"balance": 5.0})]
+
+
+def test_read_timeout_raises_service_error(upstream_client, stub_upstream):
+    """Testa que um serviço travado gera erro do serviço em vez de prender o worker."""
+    stub_upstream.default = (200, {}, 1)
+
+    with pytest.raises(UserServiceError, match="Serviço de usuário indisponível"):
+        upstream_client.post("/tax_coords", "geoloc_tax", json={})
+
+
+def test_connections_are_reused(upstream_client, stub_upstream):
+    """Testa que as chamadas reaproveitam a mesma conexão do pool."""
+    upstream_client.get("/user/1", "user_profile")
+    upstream_client.get("/user/2", "user_profile")
+
+    assert len(stub_upstream.peers) == 2
+    assert len(set(stub_upstream.peers)) == 1
@@ -1,13 +1,26 @@
 import pytest
 from flask import Flask
 from pymongo import MongoClient
+from controllers.conversion_controller import matrix_cache
+from controllers.transference_common import key_cache, profile_cache, tax_cache, tax_cell_caches
+from database import models
 from main import create_app
 from settings import settings
+from tests.stub_upstream import StubUpstream
+from utils.circuit_breaker import breakers
+
+
+def users_by_id(users):
+    """Responde pelo id, já que os perfis são buscados em paralelo."""
+    users = {user["_id"]: user for user in users}
+    return lambda user_id: users[user_id]
+
 
 @pytest.fixture
 def app():
     """Fixture para criar uma instância do aplicativo Flask para os testes."""
     app = create_app()
+    models.create_indexes()
 
     app.config["TESTING"] = True
     app.config["MONGO_DATABASE_URI"] = settings.MONGO_DATABASE_URI
@@ -18,24 +31,138 @@ def app():
         db = client[app.config["MONGO_DATABASE_NAME"]]
         db.keys.delete_many({})
         db.transactions.delete_many({})
+        db.notifications.delete_many({})
+        db.balances.delete_many({})
+        db.idempotency_keys.delete_many({})
+        db.statement_rollups.delete_many({})
+        db.profile_invalidations.delete_many({})
+        key_cache.clear()
+        profile_cache.clear()
+        matrix_cache.clear()
+        tax_cache.clear()
+        for cache in tax_cell_caches.values():
+            cache.clear()
+        breakers.clear()
 
         yield app
 
         db.keys.delete_many({})
         db.transactions.delete_many({})
+        db.notifications.delete_many({})
+        db.balances.delete_many({})
+        db.idempotency_keys.delete_many({})
+        db.statement_rollups.delete_many({})
+        db.profile_invalidations.delete_many({})
         client.close()
 
 
+class AsgiResponse:
+    """Expõe a resposta do cliente ASGI com a mesma interface da resposta de teste do Flask."""
+
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.data = response.content
+        self.content_type = response.headers.get("content-type")
+        self.mimetype = self.content_type.split(";")[0] if self.content_type else None
+        self.json = response.json() if self.mimetype == "application/json" else None
+
+    def get_data(self, as_text=False):
+        return self.data.decode() if as_text else self.data
+
+
+class AsgiClient:
+    """Adapta o cliente da aplicação ASGI à interface do cliente de teste do Flask."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def open(self, method, path, json=None, headers=None):
+        return AsgiResponse(self.client.request(method, path, json=json, headers=headers))
+
+    def get(self, path, **kwargs):
+        return self.open("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.open("POST", path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.open("PATCH", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.open("DELETE", path, **kwargs)
+
+
+def patch_controller(mocker, method, **kwargs):
+    """Substitui o método nos dois controladores; as chamadas do assíncrono caem no mesmo mock."""
+    from controllers.async_transference_controller import AsyncTransferenceController
+
+    mock = mocker.patch(f"controllers.transference_controller.TransferenceController.{method}", **kwargs)
+
+    async def call(*args, **kwargs):
+        return mock(*args, **kwargs)
+
+    if hasattr(AsyncTransferenceController, method):
+        mocker.patch.object(AsyncTransferenceController, method, side_effect=call)
+    return mock
+
+
+def spy_model(mocker, model, method):
+    """Espiona a consulta no modelo síncrono e no assíncrono com um único mock."""
+    from database import async_models
+
+    spy = mocker.MagicMock()
+    sync_model = getattr(models, model)
+    async_model = getattr(async_models, model)
+    sync_method = getattr(sync_model, method)
+    async_method = getattr(async_model, method)
+
+    def sync_call(*args):
+        spy(*args)
+        return sync_method(*args)
+
+    async def async_call(*args):
+        spy(*args)
+        return await async_method(*args)
+
+    mocker.patch.object(sync_model, method, side_effect=sync_call)
+    mocker.patch.object(async_model, method, side_effect=async_call)
+    return spy
+
+
+@pytest.fixture(params=["wsgi", "asgi"])
+def client(request, app):
+    """Fixture para criar um cliente de teste, executando cada teste no Flask e na aplicação ASGI."""
+    if request.param == "wsgi":
+        yield app.test_client()
+        return
+    yield AsgiClient(request.getfixturevalue("asgi_client"))
+
+
+@pytest.fixture
+def asgi_client(app):
+    """Fixture para criar um cliente de teste para a aplicação ASGI."""
+    pytest.importorskip("motor")
+    testclient = pytest.importorskip("starlette.testclient")
+    from views.async_api import create_asgi_app
+
+    with testclient.TestClient(create_asgi_app(app)) as client:
+        yield client
+
+
 @pytest.fixture
-def client(app):
-    """Fixture para criar um cliente de teste para o aplicativo Flask."""
-    return app.test_client()
+def stub_upstream():
+    """Fixture para subir um servidor local no lugar dos serviços externos."""
+    stub = StubUpstream().start()
+    breakers.clear()
+    yield stub
+    stub.stop()
 
 
 @pytest.fixture
 def mock_get_key_by_user(mocker):
-    mock_get_key_by_user = mocker.patch(
-        "controllers.transference_controller.TransferenceController.get_user_by_key",
+    mock_get_key_by_user = patch_controller(
+        mocker, "get_user_by_key",
         return_value={
             "created_at": "Mon, 01 Jan 2024 03:00:00 GMT",
             "key": "11999888156",
@@ -50,8 +177,8 @@ def mock_get_key_by_user(mocker):
 
 @pytest.fixture
 def mock_get_user_balance(mocker):
-    mock_get_user_balance = mocker.patch(
-        "controllers.transference_controller.TransferenceController.get_user_balance", 
+    mock_get_user_balance = patch_controller(
+        mocker, "get_user_balance",
         return_value={
             "balance": 100.0,
             "currency": "BRL"
@@ -63,8 +190,8 @@ def mock_get_user_balance(mocker):
 
 @pytest.fixture
 def mock_get_user_insuficient_balance(mocker):
-    mock_get_user_insuficient_balance = mocker.patch(
-        "controllers.transference_controller.TransferenceController.get_user_balance", 
+    mock_get_user_insuficient_balance = patch_controller(
+        mocker, "get_user_balance",
         return_value={
             "balance": 5.0,
             "currency": "BRL"
@@ -85,9 +212,9 @@ def mock_updated_balance(mocker):
 
 @pytest.fixture
 def mock_get_user_by_id(mocker):
-    mock_get_user_by_id = mocker.patch(
-        "controllers.transference_controller.TransferenceController.get_user_by_id",
-        side_effect=[
+    mock_get_user_by_id = patch_controller(
+        mocker, "get_user_by_id",
+        side_effect=users_by_id([
             {
                 "_id": "665e0069183ce834954a2f44",
                 "name": "Teste2",
@@ -110,7 +237,7 @@ def mock_get_user_by_id(mocker):
                 "balance": 100.0,
                 "cellphone": "11999888155"
             }
-        ]
+        ])
     )
 
     return mock_get_user_by_id
@@ -118,9 +245,9 @@ def mock_get_user_by_id(mocker):
 
 @pytest.fixture
 def mock_get_user_by_id_different_currencies(mocker):
-    mock_get_user_by_id_different_currencies = mocker.patch(
-        "controllers.transference_controller.TransferenceController.get_user_by_id",
-        side_effect=[
+    mock_get_user_by_id_different_currencies = patch_controller(
+        mocker, "get_user_by_id",
+        side_effect=users_by_id([
             {
                 "_id": "665e0069183ce834954a2f44",
                 "name": "Teste2",
@@ -143,7 +270,7 @@ def mock_get_user_by_id_different_currencies(mocker):
                 "balance": 100.0,
                 "cellphone": "11999888155"
             }
-        ]
+        ])
     )
 
     return mock_get_user_by_id_different_currencies
@@ -151,8 +278,8 @@ def mock_get_user_by_id_different_currencies(mocker):
 
 @pytest.fixture
 def mock_get_conversion(mocker):
-    mock_get_conversion = mocker.patch(
-        "controllers.transference_controller.TransferenceController.get_conversion", 
+    mock_get_conversion = patch_controller(
+        mocker, "get_conversion",
         return_value={
             "result": 30.0
         }
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from clients.upstream import geoloc_client
+from controllers.transference_common import rate_cache
+from controllers.transference_controller import TransferenceController
+from utils.exceptions import GeoLocServiceError
+
+
+@pytest.fixture
+def geoloc_stub(stub_upstream, monkeypatch):
+    monkeypatch.setattr(geoloc_client, "base_url", stub_upstream.url)
+    rate_cache.clear()
+    yield stub_upstream
+    rate_cache.clear()
+
+
+def test_conversion_uses_cached_rate(geoloc_stub):
+    """Testa que a taxa é buscada uma vez e a conversão é calculada localmente."""
+    geoloc_stub.enqueue(200, {"result": 5.0})
+
+    assert TransferenceController.get_conversion("USD", "BRL", 10.0) == {"result": 50.0}
+    assert TransferenceController.get_conversion("USD", "BRL", 3.0) == {"result": 15.0}
+
+    assert geoloc_stub.requests == [
+        ("POST", "/conversion", {"sender_currency": "USD", "receiver_currency": "BRL", "value": 1})
+    ]
+
+
+def test_stale_rate_is_served_while_refreshing(geoloc_stub):
+    """Testa que a taxa expirada é usada enquanto é atualizada em segundo plano."""
+    rate_cache.set(("USD", "BRL"), 5.0, ttl=0)
+    geoloc_stub.enqueue(200, {"result": 6.0})
+
+    assert TransferenceController.get_conversion("USD", "BRL", 1.0) == {"result": 5.0}
+
+    for _ in range(50):
+        if rate_cache.lookup(("USD", "BRL")) == (6.0, "hit"):
+            break
+        time.sleep(0.01)
+    assert TransferenceController.get_conversion("USD", "BRL", 1.0) == {"result": 6.0}
+    assert len(geoloc_stub.requests) == 1
+
+
+def test_conversion_falls_back_to_local_table(geoloc_stub):
+    """Testa que a tabela local é usada quando o serviço está fora e o cache vazio."""
+    geoloc_stub.default = (503, {}, 0)
+
+    assert TransferenceController.get_conversion("BRL", "USD", 100.0) == {"result": pytest.approx(19.08)}
+    assert rate_cache.stats()["fallbacks"] == 1
+
+
+def test_fallback_rate_depends_on_both_currencies(geoloc_stub):
+    """Testa que a tabela local usa a taxa do par remetente/destinatário nos dois sentidos."""
+    geoloc_stub.default = (503, {}, 0)
+
+    assert TransferenceController.get_conversion("USD", "BRL", 10.0) == {"result": pytest.approx(52.4)}
+    assert TransferenceController.get_conversion("dolar americano", "real", 10.0) == {"result": pytest.approx(52.4)}
+    with pytest.raises(GeoLocServiceError):
+        TransferenceController.get_conversion("EUR", "BRL", 10.0)
+    assert rate_cache.stats()["fallbacks"] == 2
+
+
+def test_cache_stats(client, geoloc_stub):
+    """Testa o endpoint de estatísticas dos caches."""
+    geoloc_stub.enqueue(200, {"result": 5.0})
+    TransferenceController.get_conversion("USD", "BRL", 1.0)
+    TransferenceController.get_conversion("USD", "BRL", 1.0)
+
+    response = client.get("/cache_stats")
+
+    assert response.status_code == 200
+    stats = response.json["conversion_rates"]
+    assert stats["hit"] == 1
+    assert stats["miss"] == 1
+    assert stats["hit_ratio"] == 0.5
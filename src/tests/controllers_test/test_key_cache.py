@@ -0,0 +1,72 @@
+import json
+
+from controllers.transference_common import key_cache
+from controllers.transference_controller import TransferenceController
+from database.models import PixKey
+from tests.conftest import spy_model
+from tests.payloads import payload_create_key
+
+
+def test_hot_key_skips_database(client, mocker):
+    """Testa que a chave já resolvida é servida do cache sem consultar o MongoDB."""
+    client.post("/create_key", json=payload_create_key)
+    find_by_key = spy_model(mocker, "PixKey", "find_by_key")
+
+    for _ in range(3):
+        response = client.get(f"/user_keys/{payload_create_key['key']}")
+        assert response.status_code == 200
+        assert response.json["user_id"] == payload_create_key["user_id"]
+
+    find_by_key.assert_called_once_with(payload_create_key["key"])
+    stats = key_cache.stats()
+    assert stats["hit"] == 2
+    assert stats["miss"] == 1
+
+
+def test_cached_key_is_not_shared(client):
+    """Testa que alterar o documento retornado não altera a entrada do cache."""
+    client.post("/create_key", json=payload_create_key)
+
+    user = TransferenceController.get_user_by_key(payload_create_key["key"])
+    user["user_id"] = "outro"
+
+    assert TransferenceController.get_user_by_key(payload_create_key["key"])["user_id"] == payload_create_key["user_id"]
+
+
+def test_missing_key_is_cached_until_created(client, mocker):
+    """Testa o cache negativo de chaves inexistentes e a invalidação ao criar a chave."""
+    find_by_key = spy_model(mocker, "PixKey", "find_by_key")
+
+    for _ in range(2):
+        response = client.get(f"/user_keys/{payload_create_key['key']}")
+        assert response.status_code == 404
+    assert find_by_key.call_count == 1
+
+    client.post("/create_key", json=payload_create_key)
+    response = client.get(f"/user_keys/{payload_create_key['key']}")
+
+    assert response.status_code == 200
+    assert find_by_key.call_count == 2
+
+
+def test_negative_entries_expire(client, monkeypatch):
+    """Testa que o resultado negativo expira após o TTL curto."""
+    monkeypatch.setattr("settings.settings.KEY_CACHE_NEGATIVE_TTL", 0)
+
+    response = client.get(f"/user_keys/{payload_create_key['key']}")
+    assert response.status_code == 404
+
+    PixKey(**payload_create_key).save()
+    response = client.get(f"/user_keys/{payload_create_key['key']}")
+
+    assert response.status_code == 200
+
+
+def test_key_cache_stats_endpoint(client):
+    """Testa que as estatísticas do cache de chaves aparecem em /cache_stats."""
+    client.get(f"/user_keys/{payload_create_key['key']}")
+
+    data = json.loads(client.get("/cache_stats").data)
+
+    assert data["pix_keys"]["miss"] == 1
+    assert data["pix_keys"]["size"] == 1
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from clients.upstream import user_client
+from controllers.transference_common import profile_cache
+from controllers.transference_controller import TransferenceController
+from database.models import ProfileInvalidation
+from tests.conftest import patch_controller
+from tests.payloads import payload_transaction
+
+USER = {
+    "_id": "665dff9c183ce834954a2f42",
+    "name": "Teste1",
+    "cpf": "284.438.920-13",
+    "institution": "001",
+    "agency": "0001",
+    "account": "000",
+    "currency": "BRL",
+    "balance": 100.0,
+    "cellphone": "11999888155"
+}
+
+
+@pytest.fixture
+def user_stub(client, stub_upstream, monkeypatch):
+    monkeypatch.setattr(user_client, "base_url", stub_upstream.url)
+    stub_upstream.default = (200, USER, 0)
+    return stub_upstream
+
+
+def test_profile_is_fetched_once(user_stub):
+    """Testa que o perfil é buscado uma vez e guardado só com os campos usados."""
+    first = TransferenceController.get_user_by_id(USER["_id"])
+    second = TransferenceController.get_user_by_id(USER["_id"])
+
+    assert first == second
+    assert "balance" not in first
+    assert first["cellphone"] == USER["cellphone"]
+    assert user_stub.requests == [("GET", f"/user/{USER['_id']}", None)]
+    assert profile_cache.stats()["hit"] == 1
+
+
+def test_profile_invalidation_endpoint(client, user_stub):
+    """Testa que o endpoint de invalidação força uma nova busca do perfil."""
+    TransferenceController.get_user_by_id(USER["_id"])
+
+    response = client.delete(f"/cache/users/{USER['_id']}")
+    TransferenceController.get_user_by_id(USER["_id"])
+
+    assert response.status_code == 200
+    assert json.loads(response.data)["status"] == "success"
+    assert len(user_stub.requests) == 2
+
+
+def test_profile_invalidation_reaches_other_workers(client, user_stub):
+    """Testa que a invalidação feita por outro processo descarta o perfil em cache deste."""
+    TransferenceController.get_user_by_id(USER["_id"])
+
+    ProfileInvalidation.bump(USER["_id"])
+    TransferenceController.get_user_by_id(USER["_id"])
+    TransferenceController.get_user_by_id(USER["_id"])
+
+    assert len(user_stub.requests) == 2
+
+
+def test_self_transference_fetches_profile_once(client, mocker, mock_get_user_balance, mock_updated_balance, mock_send_sms):
+    """Testa que o mesmo usuário não é buscado duas vezes na mesma transferencia."""
+    patch_controller(
+        mocker, "get_user_by_key", return_value={"user_id": USER["_id"], "key": payload_transaction["receiver_key"]}
+    )
+    get_user_by_id = patch_controller(
+        mocker, "get_user_by_id", return_value=USER
+    )
+
+    response = client.post("/transference", json=payload_transaction)
+
+    assert response.status_code == 200
+    get_user_by_id.assert_called_once_with(USER["_id"])
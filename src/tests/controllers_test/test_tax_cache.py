@@ -0,0 +1,86 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from clients import async_upstream
+from clients.upstream import geoloc_client
+from controllers.async_transference_controller import AsyncTransferenceController
+from controllers.transference_controller import TransferenceController
+from settings import settings
+from utils.exceptions import TaxNotFound
+
+TAX = {"tax": 0.015, "currency": "BRL"}
+
+
+@pytest.fixture
+def geoloc_stub(client, stub_upstream, monkeypatch):
+    monkeypatch.setattr(geoloc_client, "base_url", stub_upstream.url)
+    monkeypatch.setattr(settings, "TAX_CACHE_PRECISION", 3)
+    stub_upstream.default = (200, TAX, 0)
+    return stub_upstream
+
+
+def test_nearby_coordinates_share_cell(geoloc_stub):
+    """Testa que coordenadas na mesma célula usam a taxa em cache e outra moeda faz nova consulta."""
+    first = TransferenceController.get_tax(-23.561414, -46.655881, "BRL")
+    second = TransferenceController.get_tax(-23.561397, -46.656102, "BRL")
+    TransferenceController.get_tax(-23.561414, -46.655881, "USD")
+
+    assert first == second == TAX
+    assert geoloc_stub.requests == [
+        ("POST", "/tax_coords", {"latitude": -23.561, "longitude": -46.656, "sender_currency": "BRL"}),
+        ("POST", "/tax_coords", {"latitude": -23.561, "longitude": -46.656, "sender_currency": "USD"}),
+    ]
+
+
+def test_concurrent_misses_collapse(geoloc_stub):
+    """Testa que consultas simultâneas da mesma célula geram uma única chamada ao serviço."""
+    geoloc_stub.default = (200, TAX, 0.2)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda i: TransferenceController.get_tax(-23.5614 + i * 1e-5, -46.6559, "BRL"), range(8)))
+
+    assert results == [TAX] * 8
+    assert len(geoloc_stub.requests) == 1
+
+
+def test_errors_are_not_cached(geoloc_stub):
+    """Testa que uma taxa não encontrada não fica em cache."""
+    geoloc_stub.enqueue(200, {})
+
+    with pytest.raises(TaxNotFound):
+        TransferenceController.get_tax(-23.5614, -46.6559, "BRL")
+
+    assert TransferenceController.get_tax(-23.5614, -46.6559, "BRL") == TAX
+    assert len(geoloc_stub.requests) == 2
+
+
+def test_hit_ratio_per_precision(geoloc_stub, client):
+    """Testa que as estatísticas mostram a taxa de acerto que cada precisão teria."""
+    for offset in (0.0, 0.0004, 0.003):
+        TransferenceController.get_tax(-23.5611 + offset, -46.6551, "BRL")
+
+    stats = client.get("/cache_stats").json
+
+    assert stats["tax_cells_p2"]["hit"] == 2
+    assert stats["tax_cells_p3"]["hit"] == 1
+    assert stats["tax_cells_p4"]["hit"] == 0
+    assert stats["tax"]["hit"] == 1
+    assert len(geoloc_stub.requests) == 2
+
+
+def test_async_concurrent_misses_collapse(geoloc_stub, monkeypatch):
+    """Testa que consultas assíncronas simultâneas da mesma célula geram uma única chamada."""
+    monkeypatch.setattr(async_upstream.geoloc_client, "base_url", geoloc_stub.url)
+    geoloc_stub.default = (200, TAX, 0.2)
+
+    async def scenario():
+        results = await asyncio.gather(*[
+            AsyncTransferenceController.get_tax(-23.5614 + i * 1e-5, -46.6559, "BRL") for i in range(8)
+        ])
+        await async_upstream.geoloc_client.close()
+        return results
+
+    assert asyncio.run(scenario()) == [TAX] * 8
+    assert len(geoloc_stub.requests) == 1
@@ -0,0 +1,60 @@
+import pytest
+
+from database.db import LazyDatabase, MongoDBManager
+from settings import settings
+
+
+@pytest.fixture
+def mongo_client(mocker):
+    mongo_client = mocker.patch("database.db.MongoClient")
+    mongo_client.return_value.list_database_names.return_value = [settings.MONGO_DATABASE_NAME]
+    return mongo_client
+
+
+def test_connects_lazily_with_pool_settings(mongo_client):
+    """Testa que o cliente só é criado no primeiro uso e com as opções de pool do settings."""
+    manager = MongoDBManager("mongodb://localhost:27017")
+    db = LazyDatabase(manager)
+
+    mongo_client.assert_not_called()
+
+    db.transactions
+    db.keys
+
+    mongo_client.assert_called_once()
+    kwargs = mongo_client.call_args.kwargs
+    assert kwargs["connect"] is False
+    assert kwargs["maxPoolSize"] == settings.MONGO_MAX_POOL_SIZE
+    assert kwargs["minPoolSize"] == settings.MONGO_MIN_POOL_SIZE
+    assert kwargs["waitQueueTimeoutMS"] == settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    assert kwargs["serverSelectionTimeoutMS"] == settings.MONGO_SERVER_SELECTION_TIMEOUT_MS
+
+
+def test_duplicated_db_name_checked_once(mongo_client):
+    """Testa que a verificação de nomes de banco duplicados roda uma vez por processo."""
+    manager = MongoDBManager("mongodb://localhost:27017")
+
+    manager.get_database()
+    manager.get_database()
+
+    mongo_client.return_value.list_database_names.assert_called_once()
+
+
+def test_duplicated_db_name_raises(mongo_client):
+    """Testa que um banco com o mesmo nome em outra caixa é rejeitado."""
+    mongo_client.return_value.list_database_names.return_value = [settings.MONGO_DATABASE_NAME.upper()]
+
+    with pytest.raises(Exception, match="duplicated"):
+        MongoDBManager("mongodb://localhost:27017").get_database()
+
+
+def test_client_is_recreated_after_fork(mongo_client, monkeypatch):
+    """Testa que um processo filho cria o próprio cliente em vez de reutilizar o do pai."""
+    manager = MongoDBManager("mongodb://localhost:27017")
+    manager.get_database()
+
+    monkeypatch.setattr("database.db.os.getpid", lambda: -1)
+    manager.get_database()
+
+    assert mongo_client.call_count == 2
+    assert mongo_client.return_value.list_database_names.call_count == 2
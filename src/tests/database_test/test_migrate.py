@@ -0,0 +1,19 @@
+from database.migrate import migrate
+from database.models import db
+
+
+def test_migrate_removes_duplicated_keys_before_indexing(app):
+    """Testa que a migração mantém a chave mais antiga de cada par tipo/chave e cria o índice único."""
+    db.keys.drop_index("type_key_unique")
+    db.keys.insert_many([
+        {"type": "telefone", "key": "11999888156", "user_id": "665e0069183ce834954a2f44"},
+        {"type": "telefone", "key": "11999888156", "user_id": "665dff9c183ce834954a2f42"},
+        {"type": "email", "key": "loja@swiftpix.com", "user_id": "665dff9c183ce834954a2f42"},
+    ])
+
+    assert migrate(dry_run=True) == 0
+    assert db.keys.count_documents({}) == 3
+
+    assert migrate() == 1
+    assert [key["user_id"] for key in db.keys.find({"key": "11999888156"})] == ["665e0069183ce834954a2f44"]
+    assert "type_key_unique" in db.keys.index_information()
@@ -18,6 +18,14 @@ payload_transaction_other_currency = {
     "value": 15.0
 }
 
+payload_batch_transaction = {
+    "transferences": [
+        {"sender_id": "665dff9c183ce834954a2f42", "receiver_key": "11999888156", "currency": "BRL", "value": 15.0},
+        {"sender_id": "665dff9c183ce834954a2f42", "receiver_key": "99999999", "currency": "BRL", "value": 10.0},
+        {"sender_id": "665dff9c183ce834954a2f42", "receiver_key": "11999888156", "currency": "BRL", "value": 20.0}
+    ]
+}
+
 response_transaction = {
     "currency": "BRL",
     "date": "Mon, 01 Jan 2024 03:00:00 GMT",
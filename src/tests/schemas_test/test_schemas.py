@@ -0,0 +1,42 @@
+import pytest
+from marshmallow import ValidationError
+
+from schemas import BatchTransactionSchema, TransactionSchema, batch_transaction_schema
+
+TRANSFERENCE = {"sender_id": "665dff9c183ce834954a2f42", "receiver_key": "11999888156", "currency": "BRL", "value": 15}
+
+
+@pytest.mark.parametrize("item", [
+    TRANSFERENCE,
+    dict(TRANSFERENCE, value="15.5"),
+    dict(TRANSFERENCE, value=True),
+    dict(TRANSFERENCE, value=float("nan")),
+    dict(TRANSFERENCE, value=10 ** 400),
+    dict(TRANSFERENCE, currency=1),
+    dict(TRANSFERENCE, extra="x"),
+    {"sender_id": TRANSFERENCE["sender_id"]},
+    "transferencia",
+])
+def test_batch_fast_path_matches_schema(item):
+    """Testa que a validação compilada do lote produz o mesmo resultado e os mesmos erros do marshmallow."""
+    payload = {"transferences": [TRANSFERENCE, item]}
+    reference = BatchTransactionSchema()
+    reference.fields["transferences"].inner.loader = None
+
+    def load(schema):
+        try:
+            return schema.load(payload)
+        except ValidationError as e:
+            return e.messages
+
+    assert load(batch_transaction_schema) == load(reference)
+
+
+def test_batch_fast_path_is_used(mocker):
+    """Testa que itens bem formados do lote não passam pela validação completa do marshmallow."""
+    load = mocker.spy(TransactionSchema, "load")
+
+    result = batch_transaction_schema.load({"transferences": [TRANSFERENCE] * 3})
+
+    assert result["transferences"] == [dict(TRANSFERENCE, value=15.0)] * 3
+    load.assert_not_called()
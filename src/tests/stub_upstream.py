@@ -0,0 +1,69 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass
+
+
+class StubUpstream:
+    """Servidor HTTP local que responde com as respostas enfileiradas pelo teste."""
+
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+        self.peers = []
+        self.default = (200, {}, 0)
+        self._lock = threading.Lock()
+        self.server = QuietHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def enqueue(self, status=200, body=None, delay=0):
+        with self._lock:
+            self.responses.append((status, body if body is not None else {}, delay))
+
+    def next_response(self, peer, method, path, body):
+        with self._lock:
+            self.peers.append(peer)
+            self.requests.append((method, path, body))
+            if self.responses:
+                return self.responses.pop(0)
+            return self.default
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                status, body, delay = stub.next_response(self.client_address, self.command, self.path, json.loads(raw) if raw else None)
+                if delay:
+                    time.sleep(delay)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+import json
+
+import pytest
+from bson.objectid import ObjectId
+
+from database.models import PixKey
+from tests.payloads import payload_create_key
+
+
+def test_encodes_mongo_types(app):
+    """Testa que ObjectId, datetime e Decimal são serializados sem conversão prévia."""
+    object_id = ObjectId()
+    document = {
+        "_id": object_id,
+        "created_at": datetime(2024, 1, 1, 3, tzinfo=timezone.utc),
+        "naive": datetime(2024, 1, 1, 3),
+        "value": Decimal("15.50"),
+    }
+
+    data = json.loads(app.json.dumps(document))
+
+    assert data == {
+        "_id": str(object_id),
+        "created_at": "Mon, 01 Jan 2024 03:00:00 GMT",
+        "naive": "Mon, 01 Jan 2024 03:00:00 GMT",
+        "value": "15.50",
+    }
+
+
+def test_rejects_unknown_types(app):
+    """Testa que tipos desconhecidos continuam gerando erro de serialização."""
+    with pytest.raises(TypeError):
+        app.json.dumps({"value": object()})
+
+
+def test_endpoint_returns_raw_document(client):
+    """Testa que o endpoint devolve o documento do MongoDB com _id como texto."""
+    key_id = PixKey(**payload_create_key).save()
+
+    response = client.get(f"/key/{key_id}")
+
+    assert response.status_code == 200
+    assert response.content_type == "application/json"
+    assert response.json["_id"] == str(key_id)
+    assert response.json["created_at"].endswith("GMT")
@@ -0,0 +1,21 @@
+import math
+
+import numpy as np
+
+from utils.rate_matrix import RateMatrix
+
+
+def test_convert_array_of_values():
+    """Testa a conversão vetorizada de vários valores e moedas de uma vez."""
+    matrix = RateMatrix(["BRL", "USD", "EUR"], [[1.0, 0.2, 0.18], [5.0, 1.0, 0.9], [5.5, 1.1, 1.0]], {"real": "BRL"})
+    size = 1000
+    values = np.arange(size, dtype=float)
+    currencies = ["real", "USD", "EUR", "BRL"] * (size // 4)
+    wanted = ["USD", "EUR", "BRL", "BRL"] * (size // 4)
+
+    converted = matrix.convert(values, currencies, wanted)
+
+    assert converted.shape == (size,)
+    assert converted[:4].tolist() == [0.0, 0.9, 11.0, 3.0]
+    assert matrix.rate("EUR", "USD") == 1.1
+    assert math.isnan(matrix.rate("BRL", "GBP"))
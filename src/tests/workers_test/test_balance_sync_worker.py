@@ -0,0 +1,178 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from database.models import Balance, Transaction
+from settings import settings
+from utils.exceptions import UserServiceError
+from workers.balance_sync_worker import BalanceSyncWorker
+
+SENDER = "665dff9c183ce834954a2f42"
+RECEIVER = "665e0069183ce834954a2f44"
+
+
+def transfer(value):
+    legs = Transaction.transfer_legs(SENDER, RECEIVER, "11999888156", "Teste1", "BRL", "BRL", value, value)
+    return Balance.transfer(SENDER, value, {RECEIVER: value}, legs)
+
+
+def test_transfer_moves_balance_atomically(app):
+    """Testa que débito e crédito são aplicados juntos e o débito respeita o saldo."""
+    Balance.seed(SENDER, 100.0, "BRL")
+    Balance.seed(RECEIVER, 0.0, "BRL")
+
+    assert len(transfer(60.0)) == 2
+    assert transfer(60.0) is None
+
+    balances = Balance.find_many([SENDER, RECEIVER])
+    assert balances[SENDER]["balance"] == 40.0
+    assert balances[RECEIVER]["balance"] == 60.0
+    assert len(list(Transaction.find())) == 2
+
+
+def test_concurrent_debits_never_overdraw(app):
+    """Testa que débitos concorrentes na mesma conta não deixam o saldo negativo."""
+    Balance.seed(SENDER, 100.0, "BRL")
+    Balance.seed(RECEIVER, 0.0, "BRL")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(transfer, [10.0] * 20))
+
+    assert sum(result is not None for result in results) == 10
+    assert Balance.find_many([SENDER])[SENDER]["balance"] == 0.0
+
+
+def test_seed_keeps_existing_balance(app):
+    """Testa que a carga inicial do saldo não sobrescreve o livro local."""
+    Balance.seed(SENDER, 100.0, "BRL")
+    Balance.seed(RECEIVER, 0.0, "BRL")
+    transfer(30.0)
+
+    assert Balance.seed(SENDER, 100.0, "BRL")["balance"] == 70.0
+
+
+def upstream_balances(mocker, balances):
+    return mocker.patch(
+        "controllers.transference_controller.TransferenceController.get_user_balance",
+        side_effect=lambda user_id: {"balance": balances[user_id], "currency": "BRL"}
+    )
+
+
+def test_worker_propagates_balance_changes(app, mocker):
+    """Testa que o worker envia ao serviço de usuário o saldo com as alterações do livro, uma vez por alteração."""
+    upstream_balances(mocker, {SENDER: 100.0, RECEIVER: 0.0})
+    updated_balance = mocker.patch(
+        "controllers.transference_controller.TransferenceController.updated_balance", return_value="OK"
+    )
+    Balance.seed(SENDER, 100.0, "BRL")
+    Balance.seed(RECEIVER, 0.0, "BRL")
+    transfer(10.0)
+    transfer(15.0)
+
+    assert sorted(BalanceSyncWorker().run_once()) == [True, True]
+    updated_balance.assert_any_call(SENDER, 75.0, mocker.ANY)
+    updated_balance.assert_any_call(RECEIVER, 25.0, mocker.ANY)
+    assert BalanceSyncWorker().run_once() == []
+
+
+def test_worker_keeps_changes_made_in_user_service(app, mocker):
+    """Testa que um depósito feito no serviço de usuário não é sobrescrito e passa a valer no livro local."""
+    Balance.seed(SENDER, 100.0, "BRL")
+    Balance.seed(RECEIVER, 0.0, "BRL")
+    transfer(10.0)
+    upstream_balances(mocker, {SENDER: 150.0, RECEIVER: 0.0})
+    updated_balance = mocker.patch(
+        "controllers.transference_controller.TransferenceController.updated_balance", return_value="OK"
+    )
+
+    assert sorted(BalanceSyncWorker().run_once()) == [True, True]
+    updated_balance.assert_any_call(SENDER, 140.0, mocker.ANY)
+    updated_balance.assert_any_call(RECEIVER, 10.0, mocker.ANY)
+    balances = Balance.find_many([SENDER, RECEIVER])
+    assert balances[SENDER]["balance"] == balances[SENDER]["synced_balance"] == 140.0
+    assert balances[RECEIVER]["balance"] == balances[RECEIVER]["synced_balance"] == 10.0
+
+
+def test_worker_does_not_repeat_a_sync_that_already_landed(app, mocker):
+    """Testa que, se o worker cair depois de atualizar o serviço de usuário, a diferença não é aplicada duas vezes."""
+    Balance.seed(SENDER, 100.0, "BRL")
+    Balance.seed(RECEIVER, 0.0, "BRL")
+    transfer(10.0)
+    Balance.begin_sync(SENDER, 90.0, -10.0, 0.0, "sync-1")
+    upstream_balances(mocker, {SENDER: 90.0, RECEIVER: 0.0})
+    updated_balance = mocker.patch(
+        "controllers.transference_controller.TransferenceController.updated_balance", return_value="OK"
+    )
+
+    BalanceSyncWorker().run_once()
+    BalanceSyncWorker().run_once()
+
+    balance = Balance.find_many([SENDER])[SENDER]
+    assert balance["balance"] == balance["synced_balance"] == 90.0
+    assert not balance["dirty"]
+    assert all(call.args[:2] == (SENDER, 90.0) for call in updated_balance.call_args_list if call.args[0] == SENDER)
+
+
+def test_worker_recognizes_landed_sync_after_upstream_moved(app, mocker):
+    """Testa que uma escrita já aplicada é reconhecida pela operação mesmo que o saldo tenha mudado depois no serviço de usuário."""
+    Balance.seed(SENDER, 100.0, "BRL")
+    Balance.seed(RECEIVER, 0.0, "BRL")
+    transfer(10.0)
+    Balance.begin_sync(SENDER, 90.0, -10.0, 0.0, "sync-1")
+    upstream = {SENDER: {"balance": 140.0, "sync_operation": "sync-1"}, RECEIVER: {"balance": 0.0}}
+    mocker.patch(
+        "controllers.transference_controller.TransferenceController.get_user_balance",
+        side_effect=lambda user_id: {**upstream[user_id], "currency": "BRL"}
+    )
+    updated_balance = mocker.patch(
+        "controllers.transference_controller.TransferenceController.updated_balance", return_value="OK"
+    )
+
+    BalanceSyncWorker().run_once()
+    BalanceSyncWorker().run_once()
+
+    balance = Balance.find_many([SENDER])[SENDER]
+    assert balance["balance"] == balance["synced_balance"] == 140.0
+    assert not balance["dirty"]
+    assert [call for call in updated_balance.call_args_list if call.args[0] == SENDER] == []
+
+
+def test_worker_pulls_upstream_changes_into_clean_accounts(app, mocker, monkeypatch):
+    """Testa que um saque no serviço de usuário chega ao livro de uma conta já sincronizada e barra a transferência seguinte."""
+    Balance.seed(SENDER, 100.0, "BRL")
+    Balance.seed(RECEIVER, 0.0, "BRL")
+    transfer(10.0)
+    upstream_balances(mocker, {SENDER: 100.0, RECEIVER: 0.0})
+    updated_balance = mocker.patch(
+        "controllers.transference_controller.TransferenceController.updated_balance", return_value="OK"
+    )
+    assert BalanceSyncWorker().run_once() == [True, True]
+    assert BalanceSyncWorker().run_once() == []
+    updated_balance.reset_mock()
+
+    monkeypatch.setattr(settings, "BALANCE_SYNC_RECONCILE_SECONDS", 0)
+    upstream_balances(mocker, {SENDER: 20.0, RECEIVER: 10.0})
+    assert BalanceSyncWorker().run_once() == [True, True]
+
+    updated_balance.assert_not_called()
+    balance = Balance.find_many([SENDER])[SENDER]
+    assert balance["balance"] == balance["synced_balance"] == 20.0
+    assert not balance["dirty"]
+    assert transfer(60.0) is None
+
+
+def test_worker_retries_failed_sync(app, mocker, monkeypatch):
+    """Testa que uma falha no serviço de usuário mantém o saldo pendente de sincronização."""
+    monkeypatch.setattr(settings, "BALANCE_SYNC_RETRY_BACKOFF", 0)
+    Balance.seed(SENDER, 100.0, "BRL")
+    Balance.seed(RECEIVER, 0.0, "BRL")
+    transfer(10.0)
+    upstream_balances(mocker, {SENDER: 100.0, RECEIVER: 0.0})
+
+    mocker.patch(
+        "controllers.transference_controller.TransferenceController.updated_balance",
+        side_effect=UserServiceError("Serviço de usuário indisponível")
+    )
+    assert BalanceSyncWorker().run_once() == [False, False]
+
+    mocker.patch("controllers.transference_controller.TransferenceController.updated_balance", return_value="OK")
+    assert BalanceSyncWorker().run_once() == [True, True]
+    assert Balance.find_many([SENDER])[SENDER]["synced_balance"] == 90.0
@@ -0,0 +1,59 @@
+import pytest
+
+from controllers.push_controller import LocalTransport, PushController
+from database.models import Notification
+from settings import settings
+from workers.notification_worker import NotificationWorker
+
+
+class FailingTransport(LocalTransport):
+    def send(self, number, message):
+        raise Exception("SMS indisponível")
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_RETRY_BACKOFF", 0)
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 3)
+
+
+def test_worker_delivers_pending_notifications(app):
+    """Testa que o worker entrega as mensagens pendentes do outbox."""
+    transport = LocalTransport()
+    PushController.enqueue_sms([("11999888155", "Mensagem 1"), ("11999888156", "Mensagem 2")])
+
+    results = NotificationWorker(PushController(transport)).run_once()
+
+    assert results == [True, True]
+    assert sorted(sms["number"] for sms in transport.sent) == ["11999888155", "11999888156"]
+    assert len(list(Notification.find_by_status(Notification.SENT))) == 2
+    assert NotificationWorker(PushController(transport)).run_once() == []
+
+
+def test_worker_retries_failed_notifications(app, no_backoff):
+    """Testa que o worker tenta novamente uma mensagem que falhou."""
+    PushController.enqueue_sms([("11999888155", "Mensagem")])
+
+    assert NotificationWorker(PushController(FailingTransport())).run_once() == [False]
+
+    transport = LocalTransport()
+    assert NotificationWorker(PushController(transport)).run_once() == [True]
+
+    notification = next(Notification.find_by_status(Notification.SENT))
+    assert notification["attempts"] == 1
+    assert transport.sent == [{"number": "11999888155", "message": "Mensagem"}]
+
+
+def test_worker_dead_letters_after_max_attempts(app, no_backoff):
+    """Testa que a mensagem vai para dead letter após esgotar as tentativas."""
+    PushController.enqueue_sms([("11999888155", "Mensagem")])
+    worker = NotificationWorker(PushController(FailingTransport()))
+
+    for _ in range(settings.OUTBOX_MAX_ATTEMPTS):
+        assert worker.run_once() == [False]
+
+    assert worker.run_once() == []
+    dead = list(Notification.find_by_status(Notification.DEAD))
+    assert len(dead) == 1
+    assert dead[0]["attempts"] == settings.OUTBOX_MAX_ATTEMPTS
+    assert dead[0]["last_error"] == "SMS indisponível"
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+
+HIT = "hit"
+STALE = "stale"
+MISS = "miss"
+
+
+def empty_counters():
+    return {HIT: 0, STALE: 0, MISS: 0, "evictions": 0}
+
+
+class TTLCache:
+    def __init__(self, ttl, maxsize=None, stale_ttl=0):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = empty_counters()
+
+    def lookup(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters[MISS] += 1
+                return None, MISS
+            value, expires_at, stale_until = entry
+            if now < expires_at:
+                self._entries.move_to_end(key)
+                self._counters[HIT] += 1
+                return value, HIT
+            if now < stale_until:
+                self._entries.move_to_end(key)
+                self._counters[STALE] += 1
+                return value, STALE
+            del self._entries[key]
+            self._counters[MISS] += 1
+            return None, MISS
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at, expires_at + self.stale_ttl)
+            self._entries.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self._counters["evictions"] += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters = empty_counters()
+
+    def count(self, name):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._entries)
+        lookups = stats[HIT] + stats[STALE] + stats[MISS]
+        stats["hit_ratio"] = (stats[HIT] + stats[STALE]) / lookups if lookups else 0.0
+        return stats
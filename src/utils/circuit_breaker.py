@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import deque
+
+from settings import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self):
+        self.window = settings.BREAKER_WINDOW_SECONDS
+        self.min_calls = settings.BREAKER_MIN_CALLS
+        self.error_rate = settings.BREAKER_ERROR_RATE
+        self.slow_call_seconds = settings.BREAKER_SLOW_CALL_SECONDS
+        self.slow_call_rate = settings.BREAKER_SLOW_CALL_RATE
+        self.open_seconds = settings.BREAKER_OPEN_SECONDS
+        self.half_open_calls = settings.BREAKER_HALF_OPEN_CALLS
+        self.state = CLOSED
+        self._calls = deque()
+        self._failures = 0
+        self._slow = 0
+        self._opened_at = 0
+        self._probes = 0
+        self._probe_successes = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        now = time.monotonic()
+        with self._lock:
+            if self.state == OPEN:
+                if now - self._opened_at < self.open_seconds:
+                    self._rejected += 1
+                    return False
+                self.state = HALF_OPEN
+                self._probes = 0
+                self._probe_successes = 0
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_calls:
+                    self._rejected += 1
+                    return False
+                self._probes += 1
+            return True
+
+    def record(self, elapsed, failed):
+        now = time.monotonic()
+        slow = elapsed >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if failed or slow:
+                    self._open(now)
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_calls:
+                    self._reset()
+                return
+            if self.state == OPEN:
+                return
+
+            self._calls.append((now, failed, slow))
+            self._failures += failed
+            self._slow += slow
+            self._expire(now)
+            calls = len(self._calls)
+            if calls >= self.min_calls and (
+                self._failures / calls >= self.error_rate or self._slow / calls >= self.slow_call_rate
+            ):
+                self._open(now)
+
+    def release(self):
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > self._probe_successes:
+                self._probes -= 1
+
+    def _expire(self, now):
+        while self._calls and now - self._calls[0][0] > self.window:
+            _, failed, slow = self._calls.popleft()
+            self._failures -= failed
+            self._slow -= slow
+
+    def _open(self, now):
+        self.state = OPEN
+        self._opened_at = now
+        self._calls.clear()
+        self._failures = 0
+        self._slow = 0
+
+    def _reset(self):
+        self.state = CLOSED
+        self._calls.clear()
+        self._failures = 0
+        self._slow = 0
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            stats = {
+                "state": self.state,
+                "calls": len(self._calls),
+                "failures": self._failures,
+                "slow_calls": self._slow,
+                "rejected": self._rejected,
+            }
+            if self.state == OPEN:
+                stats["retry_in"] = max(0.0, round(self.open_seconds - (now - self._opened_at), 3))
+            return stats
+
+
+class CircuitBreakers:
+    def __init__(self):
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(name, CircuitBreaker())
+        return breaker
+
+    def stats(self):
+        return {name: breaker.stats() for name, breaker in sorted(self._breakers.items())}
+
+    def clear(self):
+        with self._lock:
+            self._breakers.clear()
+
+
+breakers = CircuitBreakers()
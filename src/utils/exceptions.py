@@ -26,4 +26,10 @@ class TaxNotFound(Exception):
     pass
 
 class ConversionNotFound(Exception):
+    pass
+
+class InvalidCursor(Exception):
+    pass
+
+class IdempotencyConflict(Exception):
     pass
\ No newline at end of file
@@ -1,10 +1,46 @@
+import base64
+import binascii
+import hashlib
+import json
 from datetime import datetime, timezone
 
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from utils.exceptions import ConversionNotFound, InvalidCursor
+
 def default_datetime():
     return datetime.now().astimezone(timezone.utc)
 
+def conversion_plan(transference_currency, sender_currency, receiver_currency):
+    if receiver_currency == sender_currency and transference_currency == sender_currency:
+        return None
+    if receiver_currency == sender_currency:
+        return transference_currency, sender_currency, True, True
+    if transference_currency == receiver_currency:
+        return transference_currency, sender_currency, True, False
+    if transference_currency == sender_currency:
+        return transference_currency, receiver_currency, False, True
+    raise ConversionNotFound("Conversão não encontrada")
+
+def apply_conversion(plan, value, converted):
+    _, _, convert_sender, convert_receiver = plan
+    return (converted if convert_sender else value), (converted if convert_receiver else value)
+
+def encode_cursor(document):
+    raw = f"{document['created_at'].isoformat()}|{document['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        created_at, document_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), ObjectId(document_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, InvalidId):
+        raise InvalidCursor("Cursor inválido")
+
+def request_fingerprint(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
 def transaction_to_payload(transaction, sender, receiver):
-    transaction["_id"] = str(transaction["_id"])
     result = {
         "_id": transaction["_id"],
         "value": transaction["value"],
@@ -0,0 +1,23 @@
+import numpy as np
+
+
+class RateMatrix:
+    def __init__(self, codes, rates, aliases=None):
+        self.codes = list(codes)
+        self.rates = np.asarray(rates, dtype=float)
+        self.indexes = {code: index for index, code in enumerate(self.codes)}
+        for alias, code in (aliases or {}).items():
+            self.indexes[alias] = self.indexes[code]
+
+    def index(self, currencies):
+        return np.fromiter((self.indexes.get(currency, -1) for currency in currencies), dtype=np.intp, count=len(currencies))
+
+    def rate(self, currency, wanted_currency):
+        return float(self.convert([1.0], [currency], [wanted_currency])[0])
+
+    def convert(self, values, currencies, wanted_currencies):
+        sources = self.index(currencies)
+        targets = self.index(wanted_currencies)
+        known = (sources >= 0) & (targets >= 0)
+        rates = np.where(known, self.rates[sources, targets], np.nan)
+        return np.asarray(values, dtype=float) * rates
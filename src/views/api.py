@@ -1,24 +1,52 @@
 import logging
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from marshmallow import ValidationError
-from schemas import PixKeySchema, TransactionSchema
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
+from schemas import batch_transaction_schema, bulk_pix_key_schema, convert_balance_batch_schema, convert_balance_schema, export_schema, pagination_schema, pix_key_schema, resolve_keys_schema, statement_schema, transaction_schema
+from controllers.conversion_controller import ConversionController
+from controllers.idempotency_controller import IdempotencyController
 from controllers.transference_controller import TransferenceController
-from utils.exceptions import BalanceInsuficient, BalanceNotFound, KeyAlreadyExistsException, KeyNotFound, TransactionNotFound, UserNotFound, UserServiceError
+from utils.circuit_breaker import breakers
+from utils.exceptions import BalanceInsuficient, BalanceNotFound, IdempotencyConflict, ConversionNotFound, InvalidCursor, KeyAlreadyExistsException, KeyNotFound, TransactionNotFound, UserNotFound, UserServiceError
 
 bp = Blueprint("transference", __name__)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+@bp.app_errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    return jsonify({"status": 413, "message": "Requisição excede o tamanho máximo permitido"}), 413
+
+@bp.app_errorhandler(Exception)
+def unexpected_error(e):
+    if isinstance(e, HTTPException):
+        return e
+    logger.error(f"Error: {str(e)}")
+    return jsonify({"status": 400, "message": str(e)}), 400
+
 @bp.route("/health", methods=["GET"])
 def health_check():
     return {"status":"ok", "message":"Service is healthy"}
 
+@bp.route("/cache_stats", methods=["GET"])
+def cache_stats():
+    return TransferenceController.cache_stats()
+
+@bp.route("/circuit_breakers", methods=["GET"])
+def circuit_breakers():
+    return breakers.stats()
+
+@bp.route("/cache/users/<user_id>", methods=["DELETE"])
+def invalidate_user(user_id):
+    TransferenceController.invalidate_user(user_id)
+    return jsonify({"status": "success", "message": f"Cache do usuário {user_id} removido"})
+
 @bp.route("/create_key", methods=["POST"])
 def create_key():
     try:
         payload = request.get_json()
-        validated_key = PixKeySchema().load(payload)
+        validated_key = pix_key_schema.load(payload)
         id = TransferenceController.create_key(validated_key)
 
         return jsonify({"status": "success", "message": f"Chave criada com sucesso. ID: {id}"})
@@ -28,10 +56,18 @@ def create_key():
     except ValidationError as e:
         logger.error(f"Error: {str(e)}")
         return jsonify({"status": 422, "message": str(e)}), 422
-    except Exception as e:
-        logger.error(f"Error: {str(e)}")
-        return jsonify({"status": 400, "message": str(e)}), 400
     
+@bp.route("/keys/bulk", methods=["POST"])
+def create_keys():
+    try:
+        payload = request.get_json()
+        validated_keys = bulk_pix_key_schema.load(payload)
+        results = TransferenceController.create_keys(validated_keys["keys"])
+        return {"result": results}
+    except ValidationError as e:
+        logger.error(f"Error: {str(e)}")
+        return jsonify({"status": 422, "message": str(e)}), 422
+
 @bp.route("/my_keys/<user_id>", methods=["GET"])
 def get_user_keys(user_id):
     try:
@@ -40,9 +76,6 @@ def get_user_keys(user_id):
     except KeyNotFound as e:
         logger.error(f"Error: {str(e)}")
         return jsonify({"status": 404, "message": str(e)}), 404
-    except Exception as e:
-        logger.error(f"Error: {str(e)}")
-        return jsonify({"status": 400, "message": str(e)}), 400
     
 @bp.route("/key/<key_id>", methods=["GET"])
 def get_key_by_id(key_id):
@@ -52,9 +85,6 @@ def get_key_by_id(key_id):
     except KeyNotFound as e:
         logger.error(f"Error: {str(e)}")
         return jsonify({"status": 404, "message": str(e)}), 404
-    except Exception as e:
-        logger.error(f"Error: {str(e)}")
-        return jsonify({"status": 400, "message": str(e)}), 400
     
 @bp.route("/user_keys/<key>", methods=["GET"])
 def get_user_by_key(key):
@@ -64,39 +94,120 @@ def get_user_by_key(key):
     except UserNotFound as e:
         logger.error(f"Error: {str(e)}")
         return jsonify({"status": 404, "message": str(e)}), 404
-    except Exception as e:
+    
+@bp.route("/user_keys/resolve", methods=["POST"])
+def resolve_keys():
+    try:
+        payload = request.get_json()
+        validated_keys = resolve_keys_schema.load(payload)
+        results = TransferenceController.resolve_keys(validated_keys["keys"])
+        return {"result": results}
+    except ValidationError as e:
         logger.error(f"Error: {str(e)}")
-        return jsonify({"status": 400, "message": str(e)}), 400
+        return jsonify({"status": 422, "message": str(e)}), 422
     
+def transference_response(payload, idempotency_key=None):
+    try:
+        validated_transference = transaction_schema.load(payload)
+        transaction = TransferenceController.transaction(validated_transference, idempotency_key)
+        return transaction, 200
+    except IdempotencyConflict as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 409, "message": str(e)}, 409
+    except (UserNotFound, BalanceNotFound) as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 404, "message": str(e)}, 404
+    except ValidationError as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 422, "message": str(e)}, 422
+    except (BalanceInsuficient, UserServiceError, Exception) as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 400, "message": str(e)}, 400
+
 @bp.route("/transference", methods=["POST"])
 def create_transference():
+    payload = request.get_json()
+    idempotency_key = request.headers.get("Idempotency-Key")
+    if idempotency_key:
+        response, status_code = IdempotencyController.execute(idempotency_key, payload, transference_response)
+    else:
+        response, status_code = transference_response(payload)
+    return jsonify(response), status_code
+    
+@bp.route("/transferences/batch", methods=["POST"])
+def create_batch_transference():
     try:
         payload = request.get_json()
-        validated_transference = TransactionSchema().load(payload)
-        transaction = TransferenceController.transaction(validated_transference)
-        return transaction
+        validated_batch = batch_transaction_schema.load(payload)
+        results = TransferenceController.batch_transaction(validated_batch["transferences"])
+        return {"result": results}
     except (UserNotFound, BalanceNotFound) as e:
         logger.error(f"Error: {str(e)}")
         return jsonify({"status": 404, "message": str(e)}), 404
     except ValidationError as e:
         logger.error(f"Error: {str(e)}")
         return jsonify({"status": 422, "message": str(e)}), 422
-    except (BalanceInsuficient, UserServiceError, Exception) as e:
+    except (BalanceInsuficient, UserServiceError) as e:
         logger.error(f"Error: {str(e)}")
         return jsonify({"status": 400, "message": str(e)}), 400
     
+@bp.route("/convert_balance", methods=["POST"])
+def convert_balance():
+    try:
+        payload = request.get_json()
+        validated_conversion = convert_balance_schema.load(payload)
+        return ConversionController.convert(validated_conversion)
+    except ConversionNotFound as e:
+        logger.error(f"Error: {str(e)}")
+        return jsonify({"status": 404, "message": str(e)}), 404
+    except ValidationError as e:
+        logger.error(f"Error: {str(e)}")
+        return jsonify({"status": 422, "message": str(e)}), 422
+
+@bp.route("/convert_balance/batch", methods=["POST"])
+def convert_balance_batch():
+    try:
+        payload = request.get_json()
+        validated_batch = convert_balance_batch_schema.load(payload)
+        results = ConversionController.convert_batch(validated_batch["conversions"])
+        return {"result": results}
+    except ValidationError as e:
+        logger.error(f"Error: {str(e)}")
+        return jsonify({"status": 422, "message": str(e)}), 422
+
 @bp.route("/my_transferences/<user_id>", methods=["GET"])
 def get_user_transactions(user_id):
     try:
-        transactions = TransferenceController.get_user_transactions(user_id)
-        return {"result": transactions}
+        page = pagination_schema.load(request.args)
+        transactions, next_cursor = TransferenceController.get_user_transactions(user_id, page["limit"], page["cursor"])
+        return {"result": transactions, "next_cursor": next_cursor}
     except TransactionNotFound as e:
         logger.error(f"Error: {str(e)}")
         return jsonify({"status": 404, "message": str(e)}), 404
-    except Exception as e:
+    except (ValidationError, InvalidCursor) as e:
         logger.error(f"Error: {str(e)}")
-        return jsonify({"status": 400, "message": str(e)}), 400
+        return jsonify({"status": 422, "message": str(e)}), 422
     
+@bp.route("/my_transferences/<user_id>/export", methods=["GET"])
+def export_user_transactions(user_id):
+    try:
+        export = export_schema.load(request.args)
+        lines = TransferenceController.export_user_transactions(user_id, export["start"], export["end"], export["projection"])
+        return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+    except ValidationError as e:
+        logger.error(f"Error: {str(e)}")
+        return jsonify({"status": 422, "message": str(e)}), 422
+
+@bp.route("/statement/<user_id>", methods=["GET"])
+def get_statement(user_id):
+    try:
+        period = statement_schema.load(request.args)
+        statement = TransferenceController.get_statement(user_id, period["start"], period["end"])
+        return {"result": statement}
+    except ValidationError as e:
+        logger.error(f"Error: {str(e)}")
+        return jsonify({"status": 422, "message": str(e)}), 422
+
 @bp.route("/transferences/<transaction_id>", methods=["GET"])
 def get_transaction_by_id(transaction_id):
     try:
@@ -105,6 +216,3 @@ def get_transaction_by_id(transaction_id):
     except TransactionNotFound as e:
         logger.error(f"Error: {str(e)}")
         return jsonify({"status": 404, "message": str(e)}), 404
-    except Exception as e:
-        logger.error(f"Error: {str(e)}")
-        return jsonify({"status": 400, "message": str(e)}), 400
\ No newline at end of file
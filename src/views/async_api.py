@@ -0,0 +1,223 @@
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from marshmallow import ValidationError
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from clients import async_upstream
+from controllers.async_idempotency_controller import AsyncIdempotencyController
+from controllers.async_transference_controller import AsyncTransferenceController
+from database import async_models
+from schemas import batch_transaction_schema, pagination_schema, pix_key_schema, resolve_keys_schema, transaction_schema
+from utils.exceptions import BalanceInsuficient, BalanceNotFound, IdempotencyConflict, InvalidCursor, KeyAlreadyExistsException, KeyNotFound, TransactionNotFound, UserNotFound, UserServiceError
+from utils.metrics import http_latency, http_requests
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+ROUTES = []
+
+
+def route(rule, methods):
+    def decorator(handler):
+        ROUTES.append((rule, methods, handler))
+        return handler
+    return decorator
+
+
+def starlette_path(rule):
+    return re.sub(r"<(?:[^:>]+:)?([^>]+)>", r"{\1}", rule)
+
+
+@route("/health", ["GET"])
+async def health_check(request):
+    return {"status":"ok", "message":"Service is healthy"}, 200
+
+@route("/create_key", ["POST"])
+async def create_key(request):
+    try:
+        payload = await request.json()
+        validated_key = pix_key_schema.load(payload)
+        id = await AsyncTransferenceController.create_key(validated_key)
+
+        return {"status": "success", "message": f"Chave criada com sucesso. ID: {id}"}, 200
+    except KeyAlreadyExistsException as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 409, "message": str(e)}, 409
+    except ValidationError as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 422, "message": str(e)}, 422
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 400, "message": str(e)}, 400
+
+@route("/my_keys/<user_id>", ["GET"])
+async def get_user_keys(request):
+    try:
+        keys = await AsyncTransferenceController.get_user_keys(request.path_params["user_id"])
+        return {"result": keys}, 200
+    except KeyNotFound as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 404, "message": str(e)}, 404
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 400, "message": str(e)}, 400
+
+@route("/key/<key_id>", ["GET"])
+async def get_key_by_id(request):
+    try:
+        key = await AsyncTransferenceController.get_key_by_id(request.path_params["key_id"])
+        return key, 200
+    except KeyNotFound as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 404, "message": str(e)}, 404
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 400, "message": str(e)}, 400
+
+@route("/user_keys/resolve", ["POST"])
+async def resolve_keys(request):
+    try:
+        payload = await request.json()
+        validated_keys = resolve_keys_schema.load(payload)
+        results = await AsyncTransferenceController.resolve_keys(validated_keys["keys"])
+        return {"result": results}, 200
+    except ValidationError as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 422, "message": str(e)}, 422
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 400, "message": str(e)}, 400
+
+@route("/user_keys/<key>", ["GET"])
+async def get_user_by_key(request):
+    try:
+        key = await AsyncTransferenceController.get_user_by_key(request.path_params["key"])
+        return key, 200
+    except UserNotFound as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 404, "message": str(e)}, 404
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 400, "message": str(e)}, 400
+
+async def transference_response(payload, idempotency_key=None):
+    try:
+        validated_transference = transaction_schema.load(payload)
+        transaction = await AsyncTransferenceController.transaction(validated_transference, idempotency_key)
+        return transaction, 200
+    except IdempotencyConflict as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 409, "message": str(e)}, 409
+    except (UserNotFound, BalanceNotFound) as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 404, "message": str(e)}, 404
+    except ValidationError as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 422, "message": str(e)}, 422
+    except (BalanceInsuficient, UserServiceError, Exception) as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 400, "message": str(e)}, 400
+
+@route("/transference", ["POST"])
+async def create_transference(request):
+    try:
+        payload = await request.json()
+        idempotency_key = request.headers.get("Idempotency-Key")
+        if idempotency_key:
+            return await AsyncIdempotencyController.execute(idempotency_key, payload, transference_response)
+        return await transference_response(payload)
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 400, "message": str(e)}, 400
+
+@route("/transferences/batch", ["POST"])
+async def create_batch_transference(request):
+    try:
+        payload = await request.json()
+        validated_batch = batch_transaction_schema.load(payload)
+        results = await AsyncTransferenceController.batch_transaction(validated_batch["transferences"])
+        return {"result": results}, 200
+    except (UserNotFound, BalanceNotFound) as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 404, "message": str(e)}, 404
+    except ValidationError as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 422, "message": str(e)}, 422
+    except (BalanceInsuficient, UserServiceError, Exception) as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 400, "message": str(e)}, 400
+
+@route("/my_transferences/<user_id>", ["GET"])
+async def get_user_transactions(request):
+    try:
+        page = pagination_schema.load(dict(request.query_params))
+        transactions, next_cursor = await AsyncTransferenceController.get_user_transactions(
+            request.path_params["user_id"], page["limit"], page["cursor"]
+        )
+        return {"result": transactions, "next_cursor": next_cursor}, 200
+    except TransactionNotFound as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 404, "message": str(e)}, 404
+    except (ValidationError, InvalidCursor) as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 422, "message": str(e)}, 422
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 400, "message": str(e)}, 400
+
+@route("/transferences/<transaction_id>", ["GET"])
+async def get_transaction_by_id(request):
+    try:
+        transaction = await AsyncTransferenceController.get_transaction_by_id(request.path_params["transaction_id"])
+        return transaction, 200
+    except TransactionNotFound as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 404, "message": str(e)}, 404
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        return {"status": 400, "message": str(e)}, 400
+
+
+def instrumented(flask_app, rule, handler):
+    async def endpoint(request):
+        start = time.perf_counter()
+        max_length = flask_app.config.get("MAX_CONTENT_LENGTH")
+        content_length = int(request.headers.get("content-length") or 0)
+        if max_length and content_length > max_length:
+            payload, status = {"status": 413, "message": "Requisição excede o tamanho máximo permitido"}, 413
+        else:
+            payload, status = await handler(request)
+        response = Response(flask_app.json.dumps(payload), status_code=status, media_type="application/json")
+        http_latency.observe(time.perf_counter() - start, request.method, rule)
+        http_requests.inc(request.method, rule, status)
+        return response
+
+    return endpoint
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await async_upstream.user_client.close()
+    await async_upstream.geoloc_client.close()
+    async_models.close()
+
+
+def create_asgi_app(flask_app):
+    routes = [
+        Route(starlette_path(rule), instrumented(flask_app, rule, handler), methods=methods)
+        for rule, methods, handler in ROUTES
+    ]
+    routes.append(Mount("/", WSGIMiddleware(flask_app)))
+    return Starlette(
+        routes=routes,
+        middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+        lifespan=lifespan,
+    )
@@ -0,0 +1,46 @@
+import time
+
+from flask import Blueprint, Response, g, request
+from controllers.transference_controller import TransferenceController
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, breakers
+from utils.metrics import http_latency, http_requests, registry
+
+bp = Blueprint("metrics", __name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def cache_stats():
+    for cache, stats in TransferenceController.cache_stats().items():
+        for stat, value in stats.items():
+            yield (cache, stat), value
+
+
+def breaker_states():
+    for name, stats in breakers.stats().items():
+        for state in (CLOSED, OPEN, HALF_OPEN):
+            yield (name, state), int(stats["state"] == state)
+
+
+registry.gauge("transference_cache", "Estatísticas dos caches em memória", ("cache", "stat"), cache_stats)
+registry.gauge("upstream_circuit_state", "Estado do circuit breaker de cada serviço externo", ("upstream", "state"), breaker_states)
+
+
+@bp.before_app_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+
+@bp.after_app_request
+def record_request(response):
+    start = g.pop("request_start", None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        http_latency.observe(time.perf_counter() - start, request.method, route)
+        http_requests.inc(request.method, route, response.status_code)
+    return response
+
+
+@bp.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(registry.render(), content_type=CONTENT_TYPE)
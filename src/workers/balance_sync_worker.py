@@ -0,0 +1,72 @@
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from controllers.transference_controller import TransferenceController
+from database.models import Balance
+from settings import settings
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class BalanceSyncWorker:
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=settings.BALANCE_SYNC_CONCURRENCY, thread_name_prefix="balance-sync")
+
+    def claim_batch(self):
+        batch = []
+        while len(batch) < settings.BALANCE_SYNC_BATCH_SIZE:
+            balance = Balance.claim_sync(settings.BALANCE_SYNC_LEASE_SECONDS, settings.BALANCE_SYNC_RECONCILE_SECONDS)
+            if not balance:
+                break
+            batch.append(balance)
+        return batch
+
+    def landed(self, intent, upstream):
+        operation = intent.get("operation")
+        if operation and upstream.get("sync_operation") == operation:
+            return True
+        return upstream["balance"] == intent["target"]
+
+    def sync(self, balance):
+        user_id = balance["_id"]
+        try:
+            upstream = TransferenceController.get_user_balance(user_id)
+            intent = balance.get("sync_intent")
+            if intent and self.landed(intent, upstream):
+                Balance.mark_synced(user_id, None, intent["pushed"], intent["pulled"])
+                return True
+            synced = balance.get("synced_balance", upstream["balance"])
+            pushed = balance["balance"] - synced
+            pulled = upstream["balance"] - synced
+            if pushed:
+                target = upstream["balance"] + pushed
+                operation = str(uuid.uuid4())
+                Balance.begin_sync(user_id, target, pushed, pulled, operation)
+                TransferenceController.updated_balance(user_id, target, operation)
+        except Exception as e:
+            logger.error(f"Não foi possível sincronizar saldo do usuário {user_id}, nova tentativa em {settings.BALANCE_SYNC_RETRY_BACKOFF}s: {e}")
+            Balance.mark_failed(user_id, settings.BALANCE_SYNC_RETRY_BACKOFF)
+            return False
+        Balance.mark_synced(user_id, balance["version"], pushed, pulled)
+        return True
+
+    def run_once(self):
+        batch = self.claim_batch()
+        return list(self.executor.map(self.sync, batch))
+
+    def run_forever(self):
+        logger.info("Worker de sincronização de saldos iniciado")
+        while True:
+            if not self.run_once():
+                time.sleep(settings.BALANCE_SYNC_POLL_INTERVAL)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if settings.WORKER_METRICS_PORT:
+        metrics.serve(metrics.registry, settings.WORKER_METRICS_PORT)
+    BalanceSyncWorker().run_forever()
@@ -0,0 +1,59 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from controllers.push_controller import PushController
+from database.models import Notification
+from settings import settings
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class NotificationWorker:
+    def __init__(self, push_controller=None):
+        self.push_controller = push_controller or PushController()
+        self.executor = ThreadPoolExecutor(max_workers=settings.OUTBOX_CONCURRENCY, thread_name_prefix="outbox")
+
+    def claim_batch(self):
+        batch = []
+        while len(batch) < settings.OUTBOX_BATCH_SIZE:
+            notification = Notification.claim(settings.OUTBOX_LEASE_SECONDS)
+            if not notification:
+                break
+            batch.append(notification)
+        return batch
+
+    def deliver(self, notification):
+        try:
+            sid = self.push_controller.send_sms(notification["number"], notification["message"])
+        except Exception as e:
+            attempts = notification.get("attempts", 0) + 1
+            if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                logger.error(f"Mensagem {notification['_id']} descartada após {attempts} tentativas: {e}")
+                Notification.mark_failed(notification["_id"], str(e))
+            else:
+                retry_in = settings.OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1)
+                logger.error(f"Não foi possível enviar mensagem {notification['_id']}, nova tentativa em {retry_in}s: {e}")
+                Notification.mark_failed(notification["_id"], str(e), retry_in)
+            return False
+        Notification.mark_sent(notification["_id"], sid)
+        return True
+
+    def run_once(self):
+        batch = self.claim_batch()
+        return list(self.executor.map(self.deliver, batch))
+
+    def run_forever(self):
+        logger.info("Worker de notificações iniciado")
+        while True:
+            if not self.run_once():
+                time.sleep(settings.OUTBOX_POLL_INTERVAL)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if settings.WORKER_METRICS_PORT:
+        metrics.serve(metrics.registry, settings.WORKER_METRICS_PORT)
+    NotificationWorker().run_forever()